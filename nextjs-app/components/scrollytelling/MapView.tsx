@@ -3,6 +3,7 @@
 import { useRef, useEffect, useState, useCallback } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import type { MapLocation } from './storyData';
+import { fetchGeoLayer, hasGeoLayer } from '@/lib/geoBinary';
 
 // Extended Map type with layer methods
 interface ExtendedMap {
@@ -85,6 +86,59 @@ const ppStatusColors: Record<string, string> = {
     anticipated: '#8bbaa0',    // Softest green - anticipated
 };
 
+// Data center capacity pre-aggregated into hexagons (scripts/bin_data_centers.py),
+// drawn under the markers; coarser cells when zoomed out
+const DC_HEX_LAYERS = [
+    { size: 100, minzoom: 0, maxzoom: 4.5 },
+    { size: 50, minzoom: 4.5, maxzoom: 5.5 },
+    { size: 25, minzoom: 5.5, maxzoom: 7 },
+];
+
+// Per-zoom point clusters (scripts/cluster_points.py, CLUSTER_ZOOMS in build.py);
+// raw points are drawn above the last clustered zoom
+const CLUSTER_MIN_ZOOM = 3;
+const CLUSTER_MAX_ZOOM = 9;
+
+// Marker size: summed MW for clusters, the site's own capacity otherwise
+const POINT_MW = ['coalesce', ['get', 'mw'], ['get', 'capacity']];
+
+interface PointLayerPiece {
+    suffix: string;
+    data: GeoJSON.FeatureCollection;
+    minzoom: number;
+    maxzoom: number;
+}
+
+/**
+ * A point layer split by zoom range: one piece per clustered zoom when the build
+ * wrote every cluster layer, then the raw points; only the raw points otherwise
+ */
+async function loadPointLayer(name: string): Promise<PointLayerPiece[]> {
+    const zooms: number[] = [];
+    for (let zoom = CLUSTER_MIN_ZOOM; zoom <= CLUSTER_MAX_ZOOM; zoom++) {
+        zooms.push(zoom);
+    }
+    const rawRequest = fetchGeoLayer(name);
+    const listed = await Promise.all(zooms.map(zoom => hasGeoLayer(`clusters/${name}_z${zoom}`)));
+    if (listed.every(Boolean)) {
+        try {
+            const clusters = await Promise.all(zooms.map(zoom => fetchGeoLayer(`clusters/${name}_z${zoom}`)));
+            return [
+                ...clusters.map((data, i) => ({
+                    suffix: `-z${zooms[i]}`,
+                    data,
+                    minzoom: i === 0 ? 0 : zooms[i],
+                    maxzoom: zooms[i] + 1,
+                })),
+                { suffix: '', data: await rawRequest, minzoom: CLUSTER_MAX_ZOOM + 1, maxzoom: 24 },
+            ];
+        } catch (err) {
+            console.error(`Failed to load clusters for ${name}, drawing raw points:`, err);
+        }
+    }
+    return [{ suffix: '', data: await rawRequest, minzoom: 0, maxzoom: 24 }];
+}
+
 /**
  * MapView - Enhanced Mapbox GL visualization with real GeoJSON data
  */
@@ -101,38 +155,40 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
         try {
             console.log('Adding infrastructure layers...');
 
-            // Load ISO regions GeoJSON
-            const isoResponse = await fetch('/geojson/iso_regions.geojson');
-            if (!isoResponse.ok) {
-                console.error('Failed to load ISO regions:', isoResponse.status);
+            // Load ISO regions (.geobin when built, GeoJSON otherwise)
+            let isoData: GeoJSON.FeatureCollection;
+            try {
+                isoData = await fetchGeoLayer('iso_regions');
+            } catch (err) {
+                console.error('Failed to load ISO regions:', err);
                 return;
             }
-            const isoData = await isoResponse.json();
             console.log('ISO regions loaded:', isoData.features?.length, 'features');
 
-            // Load transmission lines GeoJSON (230kV+)
-            const transResponse = await fetch('/geojson/transmission_230kv_plus.geojson');
-            if (!transResponse.ok) {
-                console.error('Failed to load transmission lines:', transResponse.status);
+            // Load transmission lines (230kV+), cleaned by the build when it has run
+            // Non-feature members (e.g. metadata.styles) survive the .geobin round trip
+            let transData: GeoJSON.FeatureCollection & {
+                metadata?: { styles?: { iso_colors?: Record<string, string> } };
+            };
+            try {
+                const transLayer = await hasGeoLayer('transmission_clean') ? 'transmission_clean' : 'transmission_230kv_plus';
+                transData = await fetchGeoLayer(transLayer);
+            } catch (err) {
+                console.error('Failed to load transmission lines:', err);
                 return;
             }
-            const transData = await transResponse.json();
             console.log('Transmission lines loaded:', transData.features?.length, 'features');
 
-            // Load data centers GeoJSON (comprehensive with status)
-            const dcResponse = await fetch('/geojson/data_centers.geojson');
-            let dcData = null;
-            if (dcResponse.ok) {
-                dcData = await dcResponse.json();
-                console.log('Data centers loaded:', dcData.features?.length, 'features');
+            // Load data centers (comprehensive with status), clustered per zoom when built
+            const dcPieces = await loadPointLayer('data_centers').catch(() => []);
+            if (dcPieces.length) {
+                console.log('Data centers loaded:', dcPieces.map(p => p.data.features?.length).join('/'), 'features by zoom range');
             }
 
-            // Load new power plants GeoJSON
-            const ppResponse = await fetch('/geojson/power_plants_new.geojson');
-            let ppData = null;
-            if (ppResponse.ok) {
-                ppData = await ppResponse.json();
-                console.log('New power plants loaded:', ppData.features?.length, 'features');
+            // Load new power plants, clustered per zoom when built
+            const ppPieces = await loadPointLayer('power_plants_new').catch(() => []);
+            if (ppPieces.length) {
+                console.log('New power plants loaded:', ppPieces.map(p => p.data.features?.length).join('/'), 'features by zoom range');
             }
 
             // Add ISO regions - only for data, transmission lines will show ISO colors
@@ -144,6 +200,13 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                 // No fill overlay - ISO is identified by transmission line colors only
             }
 
+            // Cleaned layers (clean_transmission_lines.py) keep ISO colors in metadata
+            // instead of on every feature; older files still carry a color property
+            const isoColors: Record<string, string> | undefined = transData.metadata?.styles?.iso_colors;
+            const transLineColor = isoColors && Object.keys(isoColors).length > 0
+                ? ['match', ['get', 'iso'], ...Object.entries(isoColors).flat(), '#6B7280']
+                : ['get', 'color'];
+
             // Add transmission lines (230kV+) colored by ISO region
             if (!map.getSource('transmission-lines')) {
                 map.addSource('transmission-lines', {
@@ -157,7 +220,7 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                     type: 'line',
                     source: 'transmission-lines',
                     paint: {
-                        'line-color': ['get', 'color'],
+                        'line-color': transLineColor,
                         'line-width': [
                             'interpolate', ['linear'], ['zoom'],
                             3, ['interpolate', ['linear'], ['get', 'v'], 230, 2, 500, 5, 765, 8],
@@ -175,7 +238,7 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                     type: 'line',
                     source: 'transmission-lines',
                     paint: {
-                        'line-color': ['get', 'color'],
+                        'line-color': transLineColor,
                         'line-width': [
                             'interpolate', ['linear'], ['zoom'],
                             3, ['interpolate', ['linear'], ['get', 'v'], 230, 0.5, 500, 1.5, 765, 2.5],
@@ -187,24 +250,67 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                 });
             }
 
+            // Add data center capacity hexagons (only the layers the build has written)
+            const hexLayers = await Promise.all(DC_HEX_LAYERS.map(async (hex) => {
+                const name = `data_centers_hex_${hex.size}km`;
+                if (!(await hasGeoLayer(name))) return null;
+                const data = await fetchGeoLayer(name).catch(() => null);
+                return data ? { ...hex, name, data: data as GeoJSON.FeatureCollection & { metadata?: { max_mw?: number } } } : null;
+            }));
+            for (const hex of hexLayers) {
+                if (!hex || map.getSource(hex.name)) continue;
+                map.addSource(hex.name, {
+                    type: 'geojson',
+                    data: hex.data
+                });
+
+                // Square-root scale so a few very large cells do not wash out the rest
+                const maxMw = Math.max(hex.data.metadata?.max_mw ?? 0, 1);
+                map.addLayer({
+                    id: `${hex.name}-fill`,
+                    type: 'fill',
+                    source: hex.name,
+                    minzoom: hex.minzoom,
+                    maxzoom: hex.maxzoom,
+                    paint: {
+                        'fill-color': [
+                            'interpolate', ['linear'], ['sqrt', ['get', 'mw']],
+                            0, dcStatusColors.anticipated,
+                            Math.sqrt(maxMw), dcStatusColors.operational
+                        ],
+                        'fill-opacity': [
+                            'interpolate', ['linear'], ['sqrt', ['get', 'mw']],
+                            0, 0.15,
+                            Math.sqrt(maxMw), 0.6
+                        ],
+                        'fill-outline-color': 'rgba(240, 235, 227, 0.25)'
+                    }
+                });
+            }
+
             // Add data center markers from GeoJSON with status-based styling
-            if (!map.getSource('data-centers') && dcData) {
-                map.addSource('data-centers', {
+            for (const piece of dcPieces) {
+                const source = `data-centers${piece.suffix}`;
+                if (map.getSource(source)) continue;
+
+                map.addSource(source, {
                     type: 'geojson',
-                    data: dcData
+                    data: piece.data
                 });
 
                 // Glow effect - blue shades by status
                 map.addLayer({
-                    id: 'data-centers-glow',
+                    id: `data-centers-glow${piece.suffix}`,
                     type: 'circle',
-                    source: 'data-centers',
+                    source,
+                    minzoom: piece.minzoom,
+                    maxzoom: piece.maxzoom,
                     paint: {
                         'circle-radius': [
                             'interpolate', ['linear'], ['zoom'],
-                            3, ['interpolate', ['linear'], ['get', 'capacity'], 500, 6, 1500, 14],
-                            8, ['interpolate', ['linear'], ['get', 'capacity'], 500, 12, 1500, 28],
-                            12, ['interpolate', ['linear'], ['get', 'capacity'], 500, 18, 1500, 40]
+                            3, ['interpolate', ['linear'], POINT_MW, 500, 6, 1500, 14],
+                            8, ['interpolate', ['linear'], POINT_MW, 500, 12, 1500, 28],
+                            12, ['interpolate', ['linear'], POINT_MW, 500, 18, 1500, 40]
                         ],
                         'circle-color': [
                             'match', ['get', 'status'],
@@ -231,16 +337,18 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                 // Core marker - solid for operational, ring for planned/announced
                 // Stroke uses warm off-white instead of pure white
                 map.addLayer({
-                    id: 'data-centers-core',
+                    id: `data-centers-core${piece.suffix}`,
                     type: 'circle',
-                    source: 'data-centers',
-                    filter: ['in', ['get', 'status'], ['literal', ['operational', 'construction']]],
+                    source,
+                    minzoom: piece.minzoom,
+                    maxzoom: piece.maxzoom,
+                    filter: ['any', ['has', 'cluster'], ['in', ['get', 'status'], ['literal', ['operational', 'construction']]]],
                     paint: {
                         'circle-radius': [
                             'interpolate', ['linear'], ['zoom'],
-                            3, ['interpolate', ['linear'], ['get', 'capacity'], 500, 3, 1500, 7],
-                            8, ['interpolate', ['linear'], ['get', 'capacity'], 500, 5, 1500, 12],
-                            12, ['interpolate', ['linear'], ['get', 'capacity'], 500, 8, 1500, 18]
+                            3, ['interpolate', ['linear'], POINT_MW, 500, 3, 1500, 7],
+                            8, ['interpolate', ['linear'], POINT_MW, 500, 5, 1500, 12],
+                            12, ['interpolate', ['linear'], POINT_MW, 500, 8, 1500, 18]
                         ],
                         'circle-color': [
                             'match', ['get', 'status'],
@@ -255,16 +363,18 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
 
                 // Planned/announced/anticipated markers - hollow ring style (blue shades)
                 map.addLayer({
-                    id: 'data-centers-planned',
+                    id: `data-centers-planned${piece.suffix}`,
                     type: 'circle',
-                    source: 'data-centers',
+                    source,
+                    minzoom: piece.minzoom,
+                    maxzoom: piece.maxzoom,
                     filter: ['in', ['get', 'status'], ['literal', ['planned', 'announced', 'anticipated']]],
                     paint: {
                         'circle-radius': [
                             'interpolate', ['linear'], ['zoom'],
-                            3, ['interpolate', ['linear'], ['get', 'capacity'], 500, 3, 1500, 7],
-                            8, ['interpolate', ['linear'], ['get', 'capacity'], 500, 5, 1500, 12],
-                            12, ['interpolate', ['linear'], ['get', 'capacity'], 500, 8, 1500, 18]
+                            3, ['interpolate', ['linear'], POINT_MW, 500, 3, 1500, 7],
+                            8, ['interpolate', ['linear'], POINT_MW, 500, 5, 1500, 12],
+                            12, ['interpolate', ['linear'], POINT_MW, 500, 8, 1500, 18]
                         ],
                         'circle-color': 'transparent',
                         'circle-stroke-width': [
@@ -290,26 +400,51 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                         ]
                     }
                 });
+
+                if (piece.suffix) {
+                    // Site count on clusters
+                    map.addLayer({
+                        id: `data-centers-count${piece.suffix}`,
+                        type: 'symbol',
+                        source,
+                        minzoom: piece.minzoom,
+                        maxzoom: piece.maxzoom,
+                        filter: ['has', 'cluster'],
+                        layout: {
+                            'text-field': ['to-string', ['get', 'count']],
+                            'text-size': 11,
+                            'text-allow-overlap': true
+                        },
+                        paint: {
+                            'text-color': '#f0ebe3'
+                        }
+                    });
+                }
             }
 
             // Add power plant markers - ALL GREEN shades based on status only
-            if (!map.getSource('power-plants') && ppData) {
-                map.addSource('power-plants', {
+            for (const piece of ppPieces) {
+                const source = `power-plants${piece.suffix}`;
+                if (map.getSource(source)) continue;
+
+                map.addSource(source, {
                     type: 'geojson',
-                    data: ppData
+                    data: piece.data
                 });
 
                 // Glow effect for power plants - muted GREEN shades by status
                 map.addLayer({
-                    id: 'power-plants-glow',
+                    id: `power-plants-glow${piece.suffix}`,
                     type: 'circle',
-                    source: 'power-plants',
+                    source,
+                    minzoom: piece.minzoom,
+                    maxzoom: piece.maxzoom,
                     paint: {
                         'circle-radius': [
                             'interpolate', ['linear'], ['zoom'],
-                            3, ['interpolate', ['linear'], ['get', 'capacity'], 150, 5, 1500, 12],
-                            8, ['interpolate', ['linear'], ['get', 'capacity'], 150, 10, 1500, 22],
-                            12, ['interpolate', ['linear'], ['get', 'capacity'], 150, 14, 1500, 30]
+                            3, ['interpolate', ['linear'], POINT_MW, 150, 5, 1500, 12],
+                            8, ['interpolate', ['linear'], POINT_MW, 150, 10, 1500, 22],
+                            12, ['interpolate', ['linear'], POINT_MW, 150, 14, 1500, 30]
                         ],
                         'circle-color': [
                             'match', ['get', 'status'],
@@ -327,15 +462,17 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
 
                 // Core marker - muted GREEN shades by status with warm off-white border
                 map.addLayer({
-                    id: 'power-plants-icon',
+                    id: `power-plants-icon${piece.suffix}`,
                     type: 'circle',
-                    source: 'power-plants',
+                    source,
+                    minzoom: piece.minzoom,
+                    maxzoom: piece.maxzoom,
                     paint: {
                         'circle-radius': [
                             'interpolate', ['linear'], ['zoom'],
-                            3, ['interpolate', ['linear'], ['get', 'capacity'], 150, 3, 1500, 6],
-                            8, ['interpolate', ['linear'], ['get', 'capacity'], 150, 5, 1500, 10],
-                            12, ['interpolate', ['linear'], ['get', 'capacity'], 150, 7, 1500, 14]
+                            3, ['interpolate', ['linear'], POINT_MW, 150, 3, 1500, 6],
+                            8, ['interpolate', ['linear'], POINT_MW, 150, 5, 1500, 10],
+                            12, ['interpolate', ['linear'], POINT_MW, 150, 7, 1500, 14]
                         ],
                         'circle-color': [
                             'match', ['get', 'status'],
@@ -350,6 +487,26 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
                         'circle-stroke-color': '#f0ebe3'
                     }
                 });
+
+                if (piece.suffix) {
+                    // Plant count on clusters
+                    map.addLayer({
+                        id: `power-plants-count${piece.suffix}`,
+                        type: 'symbol',
+                        source,
+                        minzoom: piece.minzoom,
+                        maxzoom: piece.maxzoom,
+                        filter: ['has', 'cluster'],
+                        layout: {
+                            'text-field': ['to-string', ['get', 'count']],
+                            'text-size': 11,
+                            'text-allow-overlap': true
+                        },
+                        paint: {
+                            'text-color': '#f0ebe3'
+                        }
+                    });
+                }
             }
 
             console.log('Infrastructure layers added successfully');
@@ -493,19 +650,20 @@ export default function MapView({ location, layerColor = '#EF4444', stepId, regi
             // Transmission lines are colored by ISO region (from GeoJSON 'color' property)
             // No fill overlay - ISO identification is through transmission line colors only
 
-            // Adjust data center visibility - all layers including planned
-            if (map.getLayer('data-centers-core')) {
-                map.setLayoutProperty('data-centers-core', 'visibility', 'visible');
-                map.setLayoutProperty('data-centers-glow', 'visibility', 'visible');
+            // Adjust data center and power plant visibility - all layers including planned,
+            // for the raw points and every clustered zoom
+            const suffixes = [''];
+            for (let zoom = CLUSTER_MIN_ZOOM; zoom <= CLUSTER_MAX_ZOOM; zoom++) {
+                suffixes.push(`-z${zoom}`);
             }
-            if (map.getLayer('data-centers-planned')) {
-                map.setLayoutProperty('data-centers-planned', 'visibility', 'visible');
-            }
-
-            // Adjust power plant visibility
-            if (map.getLayer('power-plants-icon')) {
-                map.setLayoutProperty('power-plants-icon', 'visibility', 'visible');
-                map.setLayoutProperty('power-plants-glow', 'visibility', 'visible');
+            const pointLayers = ['data-centers-core', 'data-centers-glow', 'data-centers-planned',
+                'power-plants-icon', 'power-plants-glow'];
+            for (const suffix of suffixes) {
+                for (const id of pointLayers) {
+                    if (map.getLayer(`${id}${suffix}`)) {
+                        map.setLayoutProperty(`${id}${suffix}`, 'visibility', 'visible');
+                    }
+                }
             }
 
         } catch (err) {
@@ -8,9 +8,10 @@ import {
     ZoomableGroup,
 } from 'react-simple-maps';
 import { GENERATED_TARIFFS, type EnrichedTariff } from '@/lib/generatedTariffData';
+import { fetchGeoLayer } from '@/lib/geoBinary';
 
-// GeoJSON URLs
-const UTILITY_GEO_URL = '/geojson/utility_territories.geojson';
+// Utility territories layer (.geobin when built, GeoJSON otherwise)
+const UTILITY_GEO_LAYER = 'utility_territories';
 const STATE_GEO_URL = 'https://cdn.jsdelivr.net/npm/us-atlas@3/states-10m.json';
 
 // FIPS code to state abbreviation mapping (for state fallback)
@@ -91,8 +92,7 @@ function UtilityHeatmap({
 
     // Load utility territory GeoJSON
     useEffect(() => {
-        fetch(UTILITY_GEO_URL)
-            .then(res => res.json())
+        fetchGeoLayer(UTILITY_GEO_LAYER)
             .then(data => {
                 setUtilityGeoData(data);
                 setIsLoading(false);
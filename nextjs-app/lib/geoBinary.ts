@@ -0,0 +1,239 @@
+/**
+ * Decoder for the quantized binary geometry format (.geobin)
+ *
+ * Produced by scripts/encode_geo_binary.py. Coordinates are stored as
+ * zigzag-varint deltas of integer-quantized lon/lat, and property keys and
+ * values live in dictionary tables, so layers are several times smaller than
+ * GeoJSON and decode without JSON.parse on the full payload.
+ */
+
+const MAGIC = 'CEGB';
+const VERSION = 1;
+
+const GEOMETRY_TYPES = [
+    null,
+    'Point',
+    'MultiPoint',
+    'LineString',
+    'MultiLineString',
+    'Polygon',
+    'MultiPolygon',
+] as const;
+
+type PropertyValue = string | number | boolean | null | object;
+
+class Reader {
+    private pos = 0;
+    private readonly bytes: Uint8Array;
+    private readonly view: DataView;
+    private readonly text = new TextDecoder();
+
+    constructor(buffer: ArrayBuffer) {
+        this.bytes = new Uint8Array(buffer);
+        this.view = new DataView(buffer);
+    }
+
+    byte(): number {
+        return this.bytes[this.pos++];
+    }
+
+    // Unsigned LEB128; multiplication keeps values above 2^31 exact
+    varint(): number {
+        // Most deltas fit in one byte
+        const first = this.bytes[this.pos];
+        if (first < 0x80) {
+            this.pos++;
+            return first;
+        }
+        let result = 0;
+        let scale = 1;
+        let b: number;
+        do {
+            b = this.bytes[this.pos++];
+            result += (b & 0x7f) * scale;
+            scale *= 128;
+        } while (b >= 0x80);
+        return result;
+    }
+
+    zigzag(): number {
+        const n = this.varint();
+        return n % 2 === 0 ? n / 2 : -(n + 1) / 2;
+    }
+
+    float64(): number {
+        const value = this.view.getFloat64(this.pos, true);
+        this.pos += 8;
+        return value;
+    }
+
+    string(): string {
+        const n = this.varint();
+        const value = this.text.decode(this.bytes.subarray(this.pos, this.pos + n));
+        this.pos += n;
+        return value;
+    }
+}
+
+/**
+ * Decode a .geobin buffer into a GeoJSON FeatureCollection
+ */
+export function decodeGeoBinary(buffer: ArrayBuffer): GeoJSON.FeatureCollection {
+    const reader = new Reader(buffer);
+
+    const magic = String.fromCharCode(reader.byte(), reader.byte(), reader.byte(), reader.byte());
+    if (magic !== MAGIC) {
+        throw new Error('Not a .geobin file');
+    }
+    const version = reader.byte();
+    if (version !== VERSION) {
+        throw new Error(`Unsupported .geobin version: ${version}`);
+    }
+    const scale = Math.pow(10, reader.byte());
+
+    const metaJson = reader.string();
+    const collection: GeoJSON.FeatureCollection & Record<string, unknown> = {
+        ...(metaJson ? JSON.parse(metaJson) : {}),
+        type: 'FeatureCollection',
+        features: [],
+    };
+
+    const keyCount = reader.varint();
+    const keys: string[] = new Array(keyCount);
+    for (let i = 0; i < keyCount; i++) keys[i] = reader.string();
+
+    const valueCount = reader.varint();
+    const values: PropertyValue[] = new Array(valueCount);
+    for (let i = 0; i < valueCount; i++) {
+        const tag = reader.byte();
+        switch (tag) {
+            case 0: values[i] = null; break;
+            case 1: values[i] = false; break;
+            case 2: values[i] = true; break;
+            case 3: values[i] = reader.zigzag(); break;
+            case 4: values[i] = reader.float64(); break;
+            case 5: values[i] = reader.string(); break;
+            default: values[i] = JSON.parse(reader.string());
+        }
+    }
+
+    // Delta cursor runs across the whole file, matching the encoder
+    let x = 0;
+    let y = 0;
+    const point = (): GeoJSON.Position => {
+        x += reader.zigzag();
+        y += reader.zigzag();
+        return [x / scale, y / scale];
+    };
+    const line = (closed = false): GeoJSON.Position[] => {
+        const n = reader.varint();
+        const coords: GeoJSON.Position[] = new Array(n);
+        for (let i = 0; i < n; i++) coords[i] = point();
+        if (closed && n > 0) coords.push([coords[0][0], coords[0][1]]);
+        return coords;
+    };
+    const polygon = (): GeoJSON.Position[][] => {
+        const n = reader.varint();
+        const rings: GeoJSON.Position[][] = new Array(n);
+        for (let i = 0; i < n; i++) rings[i] = line(true);
+        return rings;
+    };
+
+    const featureCount = reader.varint();
+    for (let f = 0; f < featureCount; f++) {
+        const type = GEOMETRY_TYPES[reader.byte()];
+
+        const properties: Record<string, PropertyValue> = {};
+        const propCount = reader.varint();
+        for (let i = 0; i < propCount; i++) {
+            const key = keys[reader.varint()];
+            properties[key] = values[reader.varint()];
+        }
+
+        let geometry: GeoJSON.Geometry | null = null;
+        switch (type) {
+            case 'Point':
+                geometry = { type, coordinates: point() };
+                break;
+            case 'MultiPoint':
+            case 'LineString':
+                geometry = { type, coordinates: line() };
+                break;
+            case 'MultiLineString': {
+                const n = reader.varint();
+                const lines: GeoJSON.Position[][] = new Array(n);
+                for (let i = 0; i < n; i++) lines[i] = line();
+                geometry = { type, coordinates: lines };
+                break;
+            }
+            case 'Polygon':
+                geometry = { type, coordinates: polygon() };
+                break;
+            case 'MultiPolygon': {
+                const n = reader.varint();
+                const polygons: GeoJSON.Position[][][] = new Array(n);
+                for (let i = 0; i < n; i++) polygons[i] = polygon();
+                geometry = { type, coordinates: polygons };
+                break;
+            }
+        }
+
+        // GeoJSON types require a geometry object; null geometry is valid per RFC 7946
+        collection.features.push({
+            type: 'Feature',
+            properties,
+            geometry: geometry as GeoJSON.Geometry,
+        });
+    }
+
+    return collection;
+}
+
+/**
+ * Layers published by the build: scripts/encode_geo_binary.py writes
+ * /geojson/manifest.json with the file sizes of every layer, listing a
+ * .geobin only while it is current
+ */
+export interface GeoManifest {
+    layers: Record<string, { geojson?: number; geobin?: number }>;
+}
+
+let manifestRequest: Promise<GeoManifest | null> | null = null;
+
+/**
+ * Fetch the layer manifest once per page; null when the build has not written one
+ */
+export function fetchGeoManifest(): Promise<GeoManifest | null> {
+    if (!manifestRequest) {
+        manifestRequest = fetch('/geojson/manifest.json')
+            .then(response => (response.ok ? response.json() : null))
+            .catch(() => null);
+    }
+    return manifestRequest;
+}
+
+/**
+ * Whether the manifest lists a layer (false without a manifest)
+ */
+export async function hasGeoLayer(name: string): Promise<boolean> {
+    const manifest = await fetchGeoManifest();
+    return Boolean(manifest?.layers[name]);
+}
+
+/**
+ * Fetch a layer as .geobin when the manifest lists a current binary, as GeoJSON otherwise
+ */
+export async function fetchGeoLayer(name: string): Promise<GeoJSON.FeatureCollection> {
+    const manifest = await fetchGeoManifest();
+    if (manifest?.layers[name]?.geobin) {
+        const binResponse = await fetch(`/geojson/${name}.geobin`);
+        if (binResponse.ok) {
+            return decodeGeoBinary(await binResponse.arrayBuffer());
+        }
+    }
+    const jsonResponse = await fetch(`/geojson/${name}.geojson`);
+    if (!jsonResponse.ok) {
+        throw new Error(`Failed to load layer ${name}: ${jsonResponse.status}`);
+    }
+    return jsonResponse.json();
+}
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Simplify territories to a vertex budget instead of one global tolerance.
+
+simplify_geometry uses the same tolerance for every utility, so small
+utilities lose their shape while the largest IOUs still dominate the file.
+This module:
+1. Repairs each geometry once and counts its vertices, spooling the repaired
+   geometry (WKB) to a temporary file so raw features are never all in memory
+2. Splits a total vertex budget across features by water-filling: features
+   smaller than the fair share keep every vertex, the rest share what is left
+3. Binary-searches each feature's tolerance (on a log scale) for the most
+   detailed result that fits its budget, reading the repaired geometry back
+4. Runs features in parallel worker processes, a bounded window at a time
+
+Every feature keeps at least MIN_FEATURE_VERTICES, so a budget below
+MIN_FEATURE_VERTICES x feature count cannot be met; that is reported.
+Budgets can be given in vertices or in bytes (converted at BYTES_PER_VERTEX),
+both for the whole layer and for any single feature.
+
+Used by download_hifld_territories.py --vertex-budget / --size-budget-mb, or
+standalone on any layer (which can only remove detail, not restore it).
+
+Usage:
+    python scripts/adaptive_simplify.py --vertex-budget 40000
+    python scripts/adaptive_simplify.py --size-budget-mb 0.8 --output utility_territories_small
+    python scripts/adaptive_simplify.py --size-budget-mb 0.8 --max-feature-kb 40
+"""
+
+import argparse
+import math
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+from shapely.validation import make_valid
+
+from geo_layers import layer_path, read_layer, strip_extents, write_layer
+
+# Measured on utility_territories.geojson at 4 decimal places
+BYTES_PER_VERTEX = 21
+
+# Every feature keeps at least this many vertices (a legible outline)
+MIN_FEATURE_VERTICES = 32
+
+# Tolerance search range in degrees and number of bisection steps
+MIN_TOLERANCE = 1e-5
+MAX_TOLERANCE = 0.5
+SEARCH_STEPS = 14
+
+# In-flight jobs per worker process (bounds the geometries held in memory)
+JOBS_PER_WORKER = 4
+
+
+def repair(geometry):
+    """GeoJSON geometry -> valid shapely geometry (polygonal parts only)."""
+    geom = shape(geometry)
+    if not geom.is_valid:
+        geom = make_valid(geom)
+    if geom.geom_type == 'GeometryCollection':
+        polys = [p for p in shapely.get_parts(geom) if p.geom_type in ('Polygon', 'MultiPolygon')]
+        geom = shapely.union_all(polys) if polys else shapely.Polygon()
+    return geom
+
+
+def bytes_to_vertices(n_bytes):
+    """Approximate vertex count of n_bytes of GeoJSON coordinates."""
+    return int(n_bytes / BYTES_PER_VERTEX)
+
+
+def simplify_filtered(geom, tolerance, min_area):
+    """Simplify and drop polygons smaller than min_area."""
+    simplified = shapely.simplify(geom, tolerance, preserve_topology=True)
+    parts = shapely.get_parts(simplified)
+    parts = parts[shapely.area(parts) >= min_area]
+    if not len(parts):
+        return None
+    return parts[0] if len(parts) == 1 else shapely.multipolygons(parts)
+
+
+def allocate_vertex_budgets(vertex_counts, total_vertices, min_vertices=MIN_FEATURE_VERTICES):
+    """
+    Split a total vertex budget across features by water-filling.
+
+    Returns:
+        Array of per-feature budgets; features at or below the common cap keep
+        all their vertices
+    """
+    counts = np.asarray(vertex_counts, dtype=float)
+    if counts.sum() <= total_vertices:
+        return counts.astype(int)
+
+    # Largest cap such that sum(min(count, cap)) <= total
+    ordered = np.sort(counts)
+    below = np.concatenate([[0], np.cumsum(ordered)[:-1]])
+    remaining = len(ordered) - np.arange(len(ordered))
+    caps = (total_vertices - below) / remaining
+    fits = caps >= ordered
+    cap = caps[np.argmin(fits)] if not fits.all() else ordered[-1]
+
+    return np.maximum(np.minimum(counts, math.floor(cap)), min_vertices).astype(int)
+
+
+def simplify_to_vertex_budget(geom, max_vertices, min_area=0.001):
+    """
+    Find the smallest tolerance whose result has at most max_vertices.
+
+    Args:
+        geom: Repaired shapely geometry (see repair)
+
+    Returns:
+        (GeoJSON geometry dict or None, chosen tolerance, vertex count)
+    """
+    if geom.is_empty:
+        return None, None, 0
+
+    if shapely.get_num_coordinates(geom) <= max_vertices:
+        best = simplify_filtered(geom, 0.0, min_area)
+        best_tol = 0.0
+    else:
+        best, best_tol = None, MAX_TOLERANCE
+        # Smallest over-budget result, used if nothing fits the budget
+        fallback = None
+        lo, hi = math.log(MIN_TOLERANCE), math.log(MAX_TOLERANCE)
+        for _ in range(SEARCH_STEPS):
+            mid = (lo + hi) / 2
+            candidate = simplify_filtered(geom, math.exp(mid), min_area)
+            if candidate is None:
+                # Every part shrank below min_area: too coarse, not over budget
+                hi = mid
+                continue
+            n = shapely.get_num_coordinates(candidate)
+            if n <= max_vertices:
+                best, best_tol, hi = candidate, math.exp(mid), mid
+            else:
+                if fallback is None or n < fallback[2]:
+                    fallback = (candidate, math.exp(mid), n)
+                lo = mid
+        if best is None and fallback is not None:
+            best, best_tol, _ = fallback
+
+    if best is None:
+        if min_area > 0:
+            # Nothing survives the area filter (a small feature); keep it unfiltered rather than drop it
+            return simplify_to_vertex_budget(geom, max_vertices, 0.0)
+        return None, best_tol, 0
+
+    best = shapely.transform(best, lambda coords: np.round(coords, 4))
+    return mapping(best), best_tol, int(shapely.get_num_coordinates(best))
+
+
+def _repair_and_count(geometry):
+    geom = repair(geometry)
+    return int(shapely.get_num_coordinates(geom)), shapely.to_wkb(geom)
+
+
+def _simplify_job(args):
+    wkb, max_vertices, min_area = args
+    return simplify_to_vertex_budget(shapely.from_wkb(wkb), max_vertices, min_area)
+
+
+def _bounded_map(pool, fn, items, window):
+    """pool.map that keeps at most window jobs in flight (results in order)."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def simplify_stream_to_budget(features, total_vertices, max_feature_vertices=None,
+                              min_area=0.001, workers=None):
+    """
+    Simplify a stream of features so their combined vertex count fits the budget.
+
+    features is iterated once. Pass 1 repairs and counts each geometry and
+    spools the repaired WKB to a temporary file, keeping only the feature
+    dicts (geometry released) in memory; pass 2 reads the spool back and
+    simplifies each feature to its share of the budget.
+
+    Args:
+        features: Iterable of GeoJSON features with raw (or lightly simplified) geometry
+        total_vertices: Vertex budget for all features together
+        max_feature_vertices: Optional cap for any single feature
+        min_area: Minimum polygon area in square degrees to keep
+        workers: Worker processes (default: CPU count)
+
+    Returns:
+        (features with geometry, stats dict); each feature dict is updated in
+        place and its geometry is None when nothing survived simplification
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * JOBS_PER_WORKER
+    kept, counts, spans = [], [], []
+
+    def geometries():
+        for feature in features:
+            if feature.get('geometry'):
+                kept.append(feature)
+                geometry, feature['geometry'] = feature['geometry'], None
+                yield geometry
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, tempfile.TemporaryFile() as spool:
+        for count, wkb in _bounded_map(pool, _repair_and_count, geometries(), window):
+            counts.append(count)
+            spans.append((spool.tell(), len(wkb)))
+            spool.write(wkb)
+
+        budgets = allocate_vertex_budgets(counts, total_vertices)
+        if max_feature_vertices:
+            budgets = np.minimum(budgets, max_feature_vertices)
+
+        floor = int(np.minimum(counts, MIN_FEATURE_VERTICES).sum()) if counts else 0
+        if floor > total_vertices:
+            print(f"  Warning: budget {total_vertices:,} is below the {floor:,}-vertex minimum "
+                  f"({MIN_FEATURE_VERTICES} per feature x {len(counts):,} features); output will exceed it")
+
+        def jobs():
+            for (offset, length), budget in zip(spans, budgets):
+                spool.seek(offset)
+                yield spool.read(length), int(budget), min_area
+
+        vertices_out = 0
+        results = _bounded_map(pool, _simplify_job, jobs(), window)
+        for feature, (geometry, _, n) in zip(kept, results):
+            feature['geometry'] = geometry
+            strip_extents([feature])
+            vertices_out += n
+
+    return kept, {
+        'features': len(kept),
+        'vertices_in': int(sum(counts)),
+        'vertices_out': vertices_out,
+        'budget': total_vertices,
+        'floor': floor,
+        'max_feature_budget': int(budgets.max()) if len(budgets) else 0,
+    }
+
+
+def simplify_features_to_budget(features, total_vertices, max_feature_vertices=None,
+                                min_area=0.001, workers=None):
+    """
+    Simplify a list of features in place so their combined vertex count fits the budget.
+
+    Returns:
+        Stats dict (see simplify_stream_to_budget)
+    """
+    _, stats = simplify_stream_to_budget(features, total_vertices, max_feature_vertices, min_area, workers)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simplify a territory layer to a vertex or size budget')
+    parser.add_argument('--input', default='utility_territories', help='Input layer name')
+    parser.add_argument('--output', default=None, help='Output layer name (default: overwrite input)')
+    budget = parser.add_mutually_exclusive_group(required=True)
+    budget.add_argument('--vertex-budget', type=int, help='Total vertices for all features')
+    budget.add_argument('--size-budget-mb', type=float,
+                        help=f'Approximate output size (converted at {BYTES_PER_VERTEX} bytes per vertex)')
+    feature_cap = parser.add_mutually_exclusive_group()
+    feature_cap.add_argument('--max-feature-vertices', type=int, default=None, help='Cap for any single feature')
+    feature_cap.add_argument('--max-feature-kb', type=float, default=None,
+                             help='Cap for any single feature as an approximate size in KB')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    total = args.vertex_budget or bytes_to_vertices(args.size_budget_mb * 1024 * 1024)
+    max_feature = args.max_feature_vertices
+    if args.max_feature_kb:
+        max_feature = max(bytes_to_vertices(args.max_feature_kb * 1024), MIN_FEATURE_VERTICES)
+
+    collection = read_layer(args.input)
+    bytes_in = layer_path(args.input).stat().st_size
+    stats = simplify_features_to_budget(collection['features'], total, max_feature,
+                                        workers=args.workers)
+    collection['features'] = [f for f in collection['features'] if f.get('geometry')]
+
+    path = write_layer(args.output or args.input, collection)
+    print(f"Vertices: {stats['vertices_in']:,} -> {stats['vertices_out']:,} (budget {stats['budget']:,}, "
+          f"largest feature budget {stats['max_feature_budget']:,})")
+    print(f"Size: {bytes_in / 1024:.1f} KB -> {path.stat().st_size / 1024:.1f} KB")
+    print(f"\nOutput written to: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
-import openpyxl
-from openpyxl.utils import get_column_letter
+import sys
+from pathlib import Path
 
-# Load existing file
-wb = openpyxl.load_workbook('/sessions/laughing-peaceful-archimedes/mnt/power-insight/Large_Load_Tariff_Database_FINAL.xlsx')
-ws = wb['Tariff Database']
-ws_citations = wb['Document Citations']
+from migrate_tariff_excel_to_ts import create_tariff_id
+from tariff_journal import TariffJournal
+from xlsx_patch import XlsxPatcher
+
+WORKBOOK = Path(__file__).parent.parent / 'Large_Load_Tariff_Database_FINAL.xlsx'
+
+# Open existing file; only the sheets that get new rows are rewritten on save
+patcher = XlsxPatcher(WORKBOOK)
+ws = 'Tariff Database'
+ws_citations = 'Document Citations'
 
 # Additional utilities to add (to get to 80+)
 additional_utilities = [
@@ -109,13 +115,7 @@ additional_utilities = [
      "page": "Schedule LGS-SD", "docket": "SD PUC"},
     
     # Additional Southeast
-    {"row": 85, "utility": "Gulf Power (NextEra)", "state": "FL", "region": "Southeast", "iso": "None",
-     "tariff": "Large Demand Service", "schedule": "Schedule LDS-1", "date": "2025-01-30", "status": "Active",
-     "min_load": 1, "peak_demand": 12.85, "offpeak_demand": 6.43, "peak_energy": 0.0275, "offpeak_energy": 0.0208,
-     "fuel_adj": 0.032, "contract": 5, "ratchet": 80, "demand_ratchet": "Yes", "ciac": "Yes", "top": "No",
-     "exit_fee": "Yes", "credit": "Yes", "dc_specific": "No", "collateral": "No",
-     "doc": "Gulf Power Large Demand Service Tariff", "url": "https://www.gulfpower.com/rates",
-     "page": "Schedule LDS-1", "docket": "FL PSC"},
+    # Gulf Power merged into FPL in 2021, no longer separate utility
     
     {"row": 86, "utility": "Duke Energy Indiana", "state": "IN", "region": "Midwest", "iso": "MISO",
      "tariff": "Rate HLF", "schedule": "Schedule HLF", "date": "2025-01-30", "status": "Active",
@@ -142,106 +142,127 @@ additional_utilities = [
      "page": "Schedule DP", "docket": "OH PUCO"},
 ]
 
+# Skip utilities already in the sheet, so a rerun (e.g. build.py after a QA/QC
+# rerun) does not append them twice
+existing = {create_tariff_id(str(cells.get(2)), str(cells.get(3) or ''))
+            for r, cells in patcher.values(ws).items() if r > 2 and cells.get(2)}
+additional_utilities = [u for u in additional_utilities
+                        if create_tariff_id(u["utility"], u["state"]) not in existing]
+if not additional_utilities:
+    print("All additional utilities are already in the workbook; nothing to add")
+    sys.exit(0)
+
 # Add utilities to Tariff Database
-next_row = ws.max_row + 1
+next_row = patcher.max_row(ws) + 1
+added_rows = []
 for u in additional_utilities:
     r = next_row
-    ws.cell(r, 1, value=r-2)  # Row number
-    ws.cell(r, 2, value=u["utility"])
-    ws.cell(r, 3, value=u["state"])
-    ws.cell(r, 4, value=u["region"])
-    ws.cell(r, 5, value=u["iso"])
-    ws.cell(r, 6, value=u["tariff"])
-    ws.cell(r, 7, value=u["schedule"])
-    ws.cell(r, 8, value=u["date"])
-    ws.cell(r, 9, value=u["status"])
-    ws.cell(r, 10, value=u["min_load"])
-    ws.cell(r, 11, value=u["peak_demand"])
-    ws.cell(r, 12, value=u["offpeak_demand"])
-    ws.cell(r, 13, value=u["peak_energy"])
-    ws.cell(r, 14, value=u["offpeak_energy"])
-    ws.cell(r, 15, value=u["fuel_adj"])
-    ws.cell(r, 16, value=u["contract"])
-    ws.cell(r, 17, value=u["ratchet"])
-    ws.cell(r, 18, value=u["demand_ratchet"])
-    ws.cell(r, 19, value=u["ciac"])
-    ws.cell(r, 20, value=u["top"])
-    ws.cell(r, 21, value=u["exit_fee"])
-    ws.cell(r, 22, value=u["credit"])
-    ws.cell(r, 23, value=u["dc_specific"])
-    ws.cell(r, 24, value=u["collateral"])
+    added_rows.append(r)
+    patcher.set(ws, r, 1, r-2)  # Row number
+    patcher.set(ws, r, 2, u["utility"])
+    patcher.set(ws, r, 3, u["state"])
+    patcher.set(ws, r, 4, u["region"])
+    patcher.set(ws, r, 5, u["iso"])
+    patcher.set(ws, r, 6, u["tariff"])
+    patcher.set(ws, r, 7, u["schedule"])
+    patcher.set(ws, r, 8, u["date"])
+    patcher.set(ws, r, 9, u["status"])
+    patcher.set(ws, r, 10, u["min_load"])
+    patcher.set(ws, r, 11, u["peak_demand"])
+    patcher.set(ws, r, 12, u["offpeak_demand"])
+    patcher.set(ws, r, 13, u["peak_energy"])
+    patcher.set(ws, r, 14, u["offpeak_energy"])
+    patcher.set(ws, r, 15, u["fuel_adj"])
+    patcher.set(ws, r, 16, u["contract"])
+    patcher.set(ws, r, 17, u["ratchet"])
+    patcher.set(ws, r, 18, u["demand_ratchet"])
+    patcher.set(ws, r, 19, u["ciac"])
+    patcher.set(ws, r, 20, u["top"])
+    patcher.set(ws, r, 21, u["exit_fee"])
+    patcher.set(ws, r, 22, u["credit"])
+    patcher.set(ws, r, 23, u["dc_specific"])
+    patcher.set(ws, r, 24, u["collateral"])
     
     # Blended rate formula
-    ws.cell(r, 25, value=f'=((K{r}*600000)+(L{r}*600000*0.5)+((M{r}+O{r})*140160000)+((N{r}+O{r})*210240000)+500)/350400000')
+    patcher.set(ws, r, 25, f'=((K{r}*600000)+(L{r}*600000*0.5)+((M{r}+O{r})*140160000)+((N{r}+O{r})*210240000)+500)/350400000')
     # Annual cost
-    ws.cell(r, 26, value=f'=(Y{r}*350400000*12)/1000000')
+    patcher.set(ws, r, 26, f'=(Y{r}*350400000*12)/1000000')
     # Protection score formula
-    ws.cell(r, 27, value=f'=IF(Q{r}>=90,3,IF(Q{r}>=80,2,IF(Q{r}>=60,1,0)))+IF(P{r}>=15,3,IF(P{r}>=10,2,IF(P{r}>=5,1,0)))+IF(S{r}="Yes",2,0)+IF(T{r}="Yes",2,0)+IF(U{r}="Yes",2,0)+IF(R{r}="Yes",1,0)+IF(V{r}="Yes",1,0)+IF(W{r}="Yes",2,0)+IF(X{r}="Yes",1,0)+IF(J{r}>=50,1,0)')
+    patcher.set(ws, r, 27, f'=IF(Q{r}>=90,3,IF(Q{r}>=80,2,IF(Q{r}>=60,1,0)))+IF(P{r}>=15,3,IF(P{r}>=10,2,IF(P{r}>=5,1,0)))+IF(S{r}="Yes",2,0)+IF(T{r}="Yes",2,0)+IF(U{r}="Yes",2,0)+IF(R{r}="Yes",1,0)+IF(V{r}="Yes",1,0)+IF(W{r}="Yes",2,0)+IF(X{r}="Yes",1,0)+IF(J{r}>=50,1,0)')
     # Protection rating
-    ws.cell(r, 28, value=f'=IF(AA{r}>=14,"High",IF(AA{r}>=8,"Mid","Low"))')
-    ws.cell(r, 29, value="Base + Fuel Adj + Trans")
-    ws.cell(r, 30, value="")
+    patcher.set(ws, r, 28, f'=IF(AA{r}>=14,"High",IF(AA{r}>=8,"Mid","Low"))')
+    patcher.set(ws, r, 29, "Base + Fuel Adj + Trans")
+    patcher.set(ws, r, 30, "")
     
     # Add to Document Citations
-    cit_row = ws_citations.max_row + 1
-    ws_citations.cell(cit_row, 1, value=u["utility"])
-    ws_citations.cell(cit_row, 2, value=u["doc"])
-    ws_citations.cell(cit_row, 3, value=u["url"])
-    ws_citations.cell(cit_row, 4, value=u["page"])
-    ws_citations.cell(cit_row, 5, value=u["docket"])
+    cit_row = patcher.max_row(ws_citations) + 1
+    patcher.set(ws_citations, cit_row, 1, u["utility"])
+    patcher.set(ws_citations, cit_row, 2, u["doc"])
+    patcher.set(ws_citations, cit_row, 3, u["url"])
+    patcher.set(ws_citations, cit_row, 4, u["page"])
+    patcher.set(ws_citations, cit_row, 5, u["docket"])
     
     next_row += 1
 
 # Update Blended Rate Analysis and Protection Matrix tabs
-ws2 = wb['Blended Rate Analysis']
-ws3 = wb['Protection Matrix']
+ws2 = 'Blended Rate Analysis'
+ws3 = 'Protection Matrix'
 
 # Add new rows to Blended Rate Analysis (sorted by blended rate will need recalc)
-bra_row = ws2.max_row + 1
-for i, u in enumerate(additional_utilities):
-    src_row = 73 + i + 2  # Starting from row 75 in tariff database (row 73 + header offset)
-    ws2.cell(bra_row, 1, value=bra_row - 1)
-    ws2.cell(bra_row, 2, value=f"='Tariff Database'!B{src_row}")
-    ws2.cell(bra_row, 3, value=f"='Tariff Database'!C{src_row}")
-    ws2.cell(bra_row, 4, value=f"='Tariff Database'!D{src_row}")
-    ws2.cell(bra_row, 5, value=f"='Tariff Database'!E{src_row}")
-    ws2.cell(bra_row, 6, value=f"='Tariff Database'!K{src_row}")
-    ws2.cell(bra_row, 7, value=f"='Tariff Database'!L{src_row}")
-    ws2.cell(bra_row, 8, value=f"='Tariff Database'!M{src_row}")
-    ws2.cell(bra_row, 9, value=f"='Tariff Database'!N{src_row}")
-    ws2.cell(bra_row, 10, value=f"='Tariff Database'!O{src_row}")
-    ws2.cell(bra_row, 11, value=f"='Tariff Database'!Y{src_row}")
-    ws2.cell(bra_row, 12, value=f"='Tariff Database'!Z{src_row}")
-    ws2.cell(bra_row, 13, value=f"='Tariff Database'!AB{src_row}")
-    ws2.cell(bra_row, 14, value=f"='Tariff Database'!I{src_row}")
+bra_row = patcher.max_row(ws2) + 1
+for src_row in added_rows:
+    patcher.set(ws2, bra_row, 1, bra_row - 1)
+    patcher.set(ws2, bra_row, 2, f"='Tariff Database'!B{src_row}")
+    patcher.set(ws2, bra_row, 3, f"='Tariff Database'!C{src_row}")
+    patcher.set(ws2, bra_row, 4, f"='Tariff Database'!D{src_row}")
+    patcher.set(ws2, bra_row, 5, f"='Tariff Database'!E{src_row}")
+    patcher.set(ws2, bra_row, 6, f"='Tariff Database'!K{src_row}")
+    patcher.set(ws2, bra_row, 7, f"='Tariff Database'!L{src_row}")
+    patcher.set(ws2, bra_row, 8, f"='Tariff Database'!M{src_row}")
+    patcher.set(ws2, bra_row, 9, f"='Tariff Database'!N{src_row}")
+    patcher.set(ws2, bra_row, 10, f"='Tariff Database'!O{src_row}")
+    patcher.set(ws2, bra_row, 11, f"='Tariff Database'!Y{src_row}")
+    patcher.set(ws2, bra_row, 12, f"='Tariff Database'!Z{src_row}")
+    patcher.set(ws2, bra_row, 13, f"='Tariff Database'!AB{src_row}")
+    patcher.set(ws2, bra_row, 14, f"='Tariff Database'!I{src_row}")
     bra_row += 1
 
 # Add new rows to Protection Matrix
-pm_row = ws3.max_row + 1
-for i, u in enumerate(additional_utilities):
-    src_row = 73 + i + 2
-    ws3.cell(pm_row, 1, value=pm_row - 1)
-    ws3.cell(pm_row, 2, value=f"='Tariff Database'!B{src_row}")
-    ws3.cell(pm_row, 3, value=f"='Tariff Database'!C{src_row}")
-    ws3.cell(pm_row, 4, value=f"='Tariff Database'!J{src_row}")
-    ws3.cell(pm_row, 5, value=f"='Tariff Database'!Q{src_row}")
-    ws3.cell(pm_row, 6, value=f"='Tariff Database'!P{src_row}")
-    ws3.cell(pm_row, 7, value=f"='Tariff Database'!S{src_row}")
-    ws3.cell(pm_row, 8, value=f"='Tariff Database'!T{src_row}")
-    ws3.cell(pm_row, 9, value=f"='Tariff Database'!U{src_row}")
-    ws3.cell(pm_row, 10, value=f"='Tariff Database'!R{src_row}")
-    ws3.cell(pm_row, 11, value=f"='Tariff Database'!V{src_row}")
-    ws3.cell(pm_row, 12, value=f"='Tariff Database'!W{src_row}")
-    ws3.cell(pm_row, 13, value=f"='Tariff Database'!X{src_row}")
-    ws3.cell(pm_row, 14, value=f"='Tariff Database'!AA{src_row}")
-    ws3.cell(pm_row, 15, value=f"='Tariff Database'!AB{src_row}")
+pm_row = patcher.max_row(ws3) + 1
+for src_row in added_rows:
+    patcher.set(ws3, pm_row, 1, pm_row - 1)
+    patcher.set(ws3, pm_row, 2, f"='Tariff Database'!B{src_row}")
+    patcher.set(ws3, pm_row, 3, f"='Tariff Database'!C{src_row}")
+    patcher.set(ws3, pm_row, 4, f"='Tariff Database'!J{src_row}")
+    patcher.set(ws3, pm_row, 5, f"='Tariff Database'!Q{src_row}")
+    patcher.set(ws3, pm_row, 6, f"='Tariff Database'!P{src_row}")
+    patcher.set(ws3, pm_row, 7, f"='Tariff Database'!S{src_row}")
+    patcher.set(ws3, pm_row, 8, f"='Tariff Database'!T{src_row}")
+    patcher.set(ws3, pm_row, 9, f"='Tariff Database'!U{src_row}")
+    patcher.set(ws3, pm_row, 10, f"='Tariff Database'!R{src_row}")
+    patcher.set(ws3, pm_row, 11, f"='Tariff Database'!V{src_row}")
+    patcher.set(ws3, pm_row, 12, f"='Tariff Database'!W{src_row}")
+    patcher.set(ws3, pm_row, 13, f"='Tariff Database'!X{src_row}")
+    patcher.set(ws3, pm_row, 14, f"='Tariff Database'!AA{src_row}")
+    patcher.set(ws3, pm_row, 15, f"='Tariff Database'!AB{src_row}")
     pm_row += 1
 
-# Save
-output_path = '/sessions/laughing-peaceful-archimedes/mnt/power-insight/Large_Load_Tariff_Database_FINAL.xlsx'
-wb.save(output_path)
+# Baseline an empty journal from the unchanged workbook, then save
+journal = TariffJournal()
+journal.ensure_baseline(WORKBOOK)
+patcher.save()
+
+# Record the added rows in the change journal
+values = patcher.values(ws)
+headers = {col: str(v).strip() for col, v in values[2].items() if v is not None}
+entries = []
+for r, u in zip(added_rows, additional_utilities):
+    record = {name: values.get(r, {}).get(col) for col, name in headers.items()}
+    entries += journal.changes_for([record], reason='Added to expand database to 80+ utilities',
+                                   source=u["doc"], complete=False)
+print(f"Journaled {journal.append(entries)} field(s) for {len(additional_utilities)} added utilities")
 
-print(f"Updated file with {ws.max_row - 2} total utilities")
-print(f"Blended Rate Analysis: {ws2.max_row - 1} entries")
-print(f"Protection Matrix: {ws3.max_row - 1} entries")
-print(f"Document Citations: {ws_citations.max_row - 1} entries")
+print(f"Updated file with {patcher.max_row(ws) - 2} total utilities")
+print(f"Blended Rate Analysis: {patcher.max_row(ws2) - 1} entries")
+print(f"Protection Matrix: {patcher.max_row(ws3) - 1} entries")
+print(f"Document Citations: {patcher.max_row(ws_citations) - 1} entries")
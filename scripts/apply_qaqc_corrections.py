@@ -2,329 +2,149 @@
 QA/QC Corrections Script for Large Load Tariff Database
 Based on: "Spreadsheet Data QA_QC Request.docx" dated February 2026
 
-This script applies validated corrections from the regulatory audit while
-preserving all existing data, formulas, and tabs.
-
-Changes Applied:
-1. FPL (Row 14): CRITICAL - Add IGC charge, update status to Active
-2. Duke FL (Row 13): Change status to Suspended / Hearing Pending
-3. AEP Ohio (Row 22): Rename to Data Center Tariff (DCT)
-4. We Energies (Row 41): Update peak demand to $22.59/kW
-5. Black Hills SD (Row 50): Update rate schedule name
-6. ComEd (Row 30): Update deposit note for 600MW
-7. Dominion VA (Row 23): Add GS-5 migration note
-8. Consumers Energy (Row 39): Add Data Center Provision note
+Applies the validated corrections from the regulatory audit while preserving
+all existing data, formulas, and tabs. The corrections live in
+qaqc_corrections.json as keyed patches (tariff ID or citation utility, column,
+expected old value, new value, reason) and are applied as one batch by
+tariff_corrections.py: if any patch does not match the workbook, nothing is
+written. Re-running on an already corrected workbook changes nothing.
+
+The workbook is patched at the zip level (xlsx_patch.py): only the sheets
+with corrections are rewritten, every other part is copied unchanged, and the
+workbook is flagged for recalculation on open.
+
+Every applied tariff patch is recorded in the change journal
+(tariff_journal.py) with its reason and the audit's source document.
+
+Corrections (see qaqc_corrections.json):
+1. FPL: CRITICAL - Add IGC charge, update status to Active
+2. Duke FL: Change status to Suspended / Hearing Pending
+3. AEP Ohio: Rename to Data Center Tariff (DCT)
+4. We Energies: Update peak demand to $22.59/kW
+5. Black Hills SD: Update rate schedule name
+6. ComEd: Update deposit note for 600MW
+7. Dominion VA: Add GS-5 migration note
+8. Consumers Energy: Add Data Center Provision note
+9. Document Citations: FPL settlement and AEP Ohio DCT references
+
+Usage:
+    python scripts/apply_qaqc_corrections.py
+    python scripts/apply_qaqc_corrections.py --dry-run
+    python scripts/apply_qaqc_corrections.py --corrections my_patches.json
+
+To review what a run changed, diff the backup against the result:
+    python scripts/diff_tariff_db.py Large_Load_Tariff_Database_BACKUP_PRE_QAQC.xlsx Large_Load_Tariff_Database_FINAL.xlsx
 """
 
-import openpyxl
-from openpyxl.styles import PatternFill, Font
-from datetime import datetime
+import argparse
 import shutil
-
-# Backup original file
-input_file = '/sessions/laughing-peaceful-archimedes/mnt/power-insight/Large_Load_Tariff_Database_FINAL.xlsx'
-backup_file = '/sessions/laughing-peaceful-archimedes/mnt/power-insight/Large_Load_Tariff_Database_BACKUP_PRE_QAQC.xlsx'
-output_file = '/sessions/laughing-peaceful-archimedes/mnt/power-insight/Large_Load_Tariff_Database_FINAL.xlsx'
-
-print("=" * 70)
-print("QA/QC CORRECTION SCRIPT")
-print("=" * 70)
-
-# Create backup
-shutil.copy(input_file, backup_file)
-print(f"\n✓ Backup created: {backup_file}")
-
-# Load workbook
-wb = openpyxl.load_workbook(input_file)
-ws = wb['Tariff Database']
-ws_citations = wb['Document Citations']
-
-# Track all changes for audit trail
-changes_log = []
-
-def log_change(row, field, old_val, new_val, reason):
-    changes_log.append({
-        'row': row,
-        'field': field,
-        'old': old_val,
-        'new': new_val,
-        'reason': reason
-    })
-    print(f"  Row {row} - {field}: '{old_val}' → '{new_val}'")
-
-print("\n" + "=" * 70)
-print("APPLYING CORRECTIONS")
-print("=" * 70)
-
-# ==============================================================================
-# 1. FPL (Row 14) - CRITICAL CORRECTION
-# ==============================================================================
-print("\n[1] FLORIDA POWER & LIGHT (Row 14) - CRITICAL")
-print("-" * 50)
-
-row = 14
-# Status: Proposed → Active
-old = ws.cell(row, 9).value
-ws.cell(row, 9, value="Active")
-log_change(row, "Status", old, "Active", "FPSC approved settlement Nov 20, 2025")
-
-# Effective Date: TBD → 2026-01-01
-old = ws.cell(row, 8).value
-ws.cell(row, 8, value="2026-01-01")
-log_change(row, "Effective Date", old, "2026-01-01", "Per FPSC Docket 20250011-EI")
-
-# Peak Demand: $8.50 → $35.08 (includes IGC $28.07)
-old = ws.cell(row, 11).value
-ws.cell(row, 11, value=35.08)  # $7.01 Base + $28.07 IGC
-log_change(row, "Peak Demand ($/kW)", old, 35.08, "Base $7.01 + IGC $28.07 = $35.08")
-
-# Off-Peak Demand also needs update per IGC structure
-old = ws.cell(row, 12).value
-ws.cell(row, 12, value=14.04)  # Updated proportionally
-log_change(row, "Off-Peak Demand ($/kW)", old, 14.04, "Updated for IGC structure")
-
-# Rate Schedule: Update to reflect approved terms
-old = ws.cell(row, 7).value
-ws.cell(row, 7, value="Schedule LLCS-1 (Approved)")
-log_change(row, "Rate Schedule", old, "Schedule LLCS-1 (Approved)", "Settlement approved Nov 20, 2025")
-
-# Notes: Add IGC explanation
-old = ws.cell(row, 30).value
-new_note = "APPROVED: Includes Incremental Generation Charge (IGC) $28.07/kW + Base $7.01/kW. Marginal cost tariff - highest Southeast rate."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Per QA/QC - IGC omission was $191M/yr error")
-
-# ==============================================================================
-# 2. Duke Energy Florida (Row 13) - STATUS CHANGE
-# ==============================================================================
-print("\n[2] DUKE ENERGY FLORIDA (Row 13)")
-print("-" * 50)
-
-row = 13
-# Status: Proposed → Suspended
-old = ws.cell(row, 9).value
-ws.cell(row, 9, value="Suspended / Hearing Pending")
-log_change(row, "Status", old, "Suspended / Hearing Pending", "FPSC suspended Docket 20250113-EI Oct 2025")
-
-# Notes: Add hearing info
-old = ws.cell(row, 30).value
-new_note = "SUSPENDED: Docket 20250113-EI suspended Oct 2025. Final hearing scheduled April 2026. Rates are HYPOTHETICAL until approval."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Prevent reliance on unapproved rates")
-
-# ==============================================================================
-# 3. AEP Ohio (Row 22) - TARIFF NAME CHANGE
-# ==============================================================================
-print("\n[3] AEP OHIO (Row 22)")
-print("-" * 50)
-
-row = 22
-# Tariff Name: Large General Service → Data Center Tariff (DCT)
-old = ws.cell(row, 6).value
-ws.cell(row, 6, value="Data Center Tariff (DCT)")
-log_change(row, "Tariff Name", old, "Data Center Tariff (DCT)", "PUCO Case 24-508-EL-ATA approved July 9, 2025")
-
-# Rate Schedule: GS-4 → DCT
-old = ws.cell(row, 7).value
-ws.cell(row, 7, value="Schedule DCT")
-log_change(row, "Rate Schedule", old, "Schedule DCT", "New tariff for >25MW data centers")
-
-# Effective Date
-old = ws.cell(row, 8).value
-ws.cell(row, 8, value="2025-07-23")
-log_change(row, "Effective Date", old, "2025-07-23", "DCT effective date")
-
-# Notes: Add collateral requirement detail
-old = ws.cell(row, 30).value
-new_note = "DCT: Investment Grade OR Cash Collateral (10x for sub-IG). No parent guarantees for sub-IG. Two-step queue: Load Study (45d) → ESA (60d)."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Critical financing constraint per PUCO settlement")
-
-# ==============================================================================
-# 4. We Energies (Row 41) - RATE CORRECTION
-# ==============================================================================
-print("\n[4] WE ENERGIES (Row 41)")
-print("-" * 50)
-
-row = 41
-# Peak Demand: $21.62 → $22.59
-old = ws.cell(row, 11).value
-ws.cell(row, 11, value=22.59)  # Per 2025/2026 tariff book Cp-1
-log_change(row, "Peak Demand ($/kW)", old, 22.59, "Per 2025/2026 tariff book (Cp-1 summer on-peak)")
-
-# Update notes
-old = ws.cell(row, 30).value
-new_note = "CORRECTED: Peak demand updated to $22.587/kW per current tariff book. Impact: ~$500k/yr increase."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Rate validation per Docket 6630-FR-2024")
-
-# ==============================================================================
-# 5. Black Hills Energy SD (Row 50) - RATE SCHEDULE NAME
-# ==============================================================================
-print("\n[5] BLACK HILLS ENERGY SD (Row 50)")
-print("-" * 50)
-
-row = 50
-# Rate Schedule: EFL Tariff → BCIS / EFLS
-old = ws.cell(row, 7).value
-ws.cell(row, 7, value="BCIS Tariff (Docket EL25-019)")
-log_change(row, "Rate Schedule", old, "BCIS Tariff (Docket EL25-019)", "Blockchain Interruptible Service approved 1/28/2026")
-
-# Notes update
-old = ws.cell(row, 30).value
-new_note = "BCIS (Blockchain Interruptible Service) / EFLS approved 1/28/2026. 15-min curtailment notice. Energy-only rate."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Per SD PUC approval")
-
-# ==============================================================================
-# 6. ComEd (Row 30) - UPDATE DEPOSIT NOTE
-# ==============================================================================
-print("\n[6] COMED (Row 30)")
-print("-" * 50)
-
-row = 30
-# Notes: Update deposit calculation
-old = ws.cell(row, 30).value
-new_note = "TSA Required: Deposit = $1M (first 200MW) + $500k per 100MW above. For 600MW = $3,000,000. 28 GW pipeline; First TSAs signed Jan 6, 2026."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Precise deposit calculation per ComEd Supplemental Statement")
-
-# ==============================================================================
-# 7. Dominion Virginia (Row 23) - ADD GS-5 MIGRATION NOTE
-# ==============================================================================
-print("\n[7] DOMINION ENERGY VIRGINIA (Row 23)")
-print("-" * 50)
-
-row = 23
-# Notes: Add GS-5 future migration
-old = ws.cell(row, 30).value
-new_note = "GS-4 current; GS-5 effective Jan 1, 2027 for >25MW. Exit Fee = NPV of 85% T&D + 60% Gen for remaining term. 14-year contract required."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Per VA SCC November 2025 approval")
-
-# ==============================================================================
-# 8. Consumers Energy (Row 39) - ADD DATA CENTER PROVISION NOTE
-# ==============================================================================
-print("\n[8] CONSUMERS ENERGY (Row 39)")
-print("-" * 50)
-
-row = 39
-# Notes: Add Data Center Provision detail
-old = ws.cell(row, 30).value
-new_note = "Nov 2025 Data Center Provision: 100MW min threshold. 80% of CONTRACT CAPACITY ratchet (not peak). 15-year term. 4-year termination notice."
-ws.cell(row, 30, value=new_note)
-log_change(row, "Notes", old, new_note, "Per MPSC approval Nov 6, 2025")
-
-# ==============================================================================
-# UPDATE DOCUMENT CITATIONS TAB
-# ==============================================================================
-print("\n[9] UPDATING DOCUMENT CITATIONS")
-print("-" * 50)
-
-# Find and update FPL citation
-for row in range(2, ws_citations.max_row + 1):
-    util = ws_citations.cell(row, 1).value
-    if util and 'FPL' in str(util):
-        ws_citations.cell(row, 4, value="Order No. PSC-2025-XXXX; Settlement Nov 20, 2025")
-        print(f"  Updated FPL citation reference")
-        break
-
-# Find and update AEP Ohio citation
-for row in range(2, ws_citations.max_row + 1):
-    util = ws_citations.cell(row, 1).value
-    if util and 'AEP Ohio' in str(util):
-        ws_citations.cell(row, 2, value="AEP Ohio Data Center Tariff - PUCO Case 24-508-EL-ATA")
-        ws_citations.cell(row, 3, value="https://www.aepohio.com/company/about/rates/data-center-tariff/")
-        ws_citations.cell(row, 5, value="PUCO Case 24-508-EL-ATA")
-        print(f"  Updated AEP Ohio citation")
-        break
-
-# ==============================================================================
-# UPDATE QA-QC SUMMARY TAB
-# ==============================================================================
-print("\n[10] UPDATING QA-QC SUMMARY TAB")
-print("-" * 50)
-
-ws_qaqc = wb['QA-QC Summary']
-
-# Find next empty row
-next_row = ws_qaqc.max_row + 1
-
-# Add audit entry
-ws_qaqc.cell(next_row, 1, value="QA/QC Audit - Feb 2026")
-ws_qaqc.cell(next_row, 2, value=f"Applied {len(changes_log)} corrections")
-ws_qaqc.cell(next_row, 3, value=datetime.now().strftime("%Y-%m-%d %H:%M"))
-
-next_row += 1
-ws_qaqc.cell(next_row, 1, value="Critical Fix")
-ws_qaqc.cell(next_row, 2, value="FPL IGC charge added ($28.07/kW)")
-ws_qaqc.cell(next_row, 3, value="$191M/yr variance corrected")
-
-next_row += 1
-ws_qaqc.cell(next_row, 1, value="Status Updates")
-ws_qaqc.cell(next_row, 2, value="FPL→Active, Duke FL→Suspended")
-ws_qaqc.cell(next_row, 3, value="Regulatory latency correction")
-
-next_row += 1
-ws_qaqc.cell(next_row, 1, value="Tariff Rename")
-ws_qaqc.cell(next_row, 2, value="AEP Ohio GS-4→DCT")
-ws_qaqc.cell(next_row, 3, value="Per PUCO July 2025 order")
-
-next_row += 1
-ws_qaqc.cell(next_row, 1, value="Rate Correction")
-ws_qaqc.cell(next_row, 2, value="We Energies $21.62→$22.59/kW")
-ws_qaqc.cell(next_row, 3, value="Per current tariff book")
-
-print(f"  Added {5} audit entries to QA-QC Summary")
-
-# ==============================================================================
-# SAVE WORKBOOK
-# ==============================================================================
-print("\n" + "=" * 70)
-print("SAVING CORRECTED WORKBOOK")
-print("=" * 70)
-
-wb.save(output_file)
-print(f"\n✓ Saved: {output_file}")
-
-# ==============================================================================
-# VERIFICATION
-# ==============================================================================
-print("\n" + "=" * 70)
-print("VERIFICATION")
-print("=" * 70)
-
-# Reload and verify
-wb_verify = openpyxl.load_workbook(output_file)
-
-print("\nSheets preserved:")
-for sheet in wb_verify.sheetnames:
-    ws_v = wb_verify[sheet]
-    print(f"  ✓ {sheet}: {ws_v.max_row} rows x {ws_v.max_column} cols")
-
-# Verify key changes
-ws_v = wb_verify['Tariff Database']
-print("\nKey values verified:")
-print(f"  FPL Peak Demand: ${ws_v.cell(14, 11).value}/kW")
-print(f"  FPL Status: {ws_v.cell(14, 9).value}")
-print(f"  Duke FL Status: {ws_v.cell(13, 9).value}")
-print(f"  AEP Ohio Tariff: {ws_v.cell(22, 6).value}")
-print(f"  We Energies Peak: ${ws_v.cell(41, 11).value}/kW")
-
-# Verify formulas preserved
-print("\nFormulas preserved:")
-print(f"  FPL Blended Rate (Y14): {ws_v.cell(14, 25).value[:50]}...")
-print(f"  FPL Protection Score (AA14): {ws_v.cell(14, 27).value[:50]}...")
-
-print("\n" + "=" * 70)
-print("QA/QC CORRECTIONS COMPLETE")
-print(f"Total changes applied: {len(changes_log)}")
-print("=" * 70)
-
-# Print summary of all changes
-print("\n=== CHANGE LOG ===")
-for change in changes_log:
-    print(f"Row {change['row']}: {change['field']}")
-    print(f"  {change['old']} → {change['new']}")
-    print(f"  Reason: {change['reason']}")
-    print()
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from tariff_corrections import CORRECTIONS_FILE, CorrectionError, apply_patches, load_corrections, \
+    verify_patches, xlsx_tables
+from tariff_journal import JOURNAL_DIR, TariffJournal
+from xlsx_patch import XlsxPatcher
+
+# Workbook lives at the repository root (same location migrate_tariff_excel_to_ts.py reads)
+DATA_DIR = Path(__file__).parent.parent
+input_file = DATA_DIR / 'Large_Load_Tariff_Database_FINAL.xlsx'
+backup_file = DATA_DIR / 'Large_Load_Tariff_Database_BACKUP_PRE_QAQC.xlsx'
+output_file = DATA_DIR / 'Large_Load_Tariff_Database_FINAL.xlsx'
+
+
+def add_summary_entries(patcher, corrections, applied_count):
+    """Append the audit entry and summary lines to the QA-QC Summary tab."""
+    sheet = 'QA-QC Summary'
+    next_row = patcher.max_row(sheet) + 1
+    entries = [[corrections.get('audit', 'QA/QC Audit'), f"Applied {applied_count} corrections",
+                datetime.now().strftime("%Y-%m-%d %H:%M")]]
+    entries += corrections.get('summary', [])
+    for offset, entry in enumerate(entries):
+        for col, value in enumerate(entry, 1):
+            patcher.set(sheet, next_row + offset, col, value)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply keyed QA/QC corrections to the tariff workbook')
+    parser.add_argument('--corrections', default=str(CORRECTIONS_FILE), help='Correction set (JSON)')
+    parser.add_argument('--workbook', default=str(input_file), help='Workbook to correct in place')
+    parser.add_argument('--dry-run', action='store_true', help='Validate and list the changes without saving')
+    parser.add_argument('--journal', default=str(JOURNAL_DIR), help='Change journal directory')
+    parser.add_argument('--no-journal', action='store_true', help='Do not record the changes in the journal')
+    args = parser.parse_args()
+    workbook = Path(args.workbook)
+
+    print("=" * 70)
+    print("QA/QC CORRECTION SCRIPT")
+    print("=" * 70)
+
+    corrections = load_corrections(args.corrections)
+    patches = corrections['patches']
+    print(f"\n{len(patches)} patches from {Path(args.corrections).name}")
+
+    patcher = XlsxPatcher(workbook)
+    tables = xlsx_tables(patcher)
+
+    print("\n" + "=" * 70)
+    print("APPLYING CORRECTIONS")
+    print("=" * 70)
+
+    try:
+        result = apply_patches(tables, patches, dry_run=args.dry_run)
+    except CorrectionError as e:
+        print(f"\n✗ Nothing applied. {e}")
+        print("  (Regenerate the workbook with create_final_comprehensive_db.py, or fix the patches)")
+        sys.exit(1)
+
+    for patch, old, location in result['applied']:
+        print(f"  {location} {patch.key} - {patch.field}: '{old}' → '{patch.new}'")
+        print(f"      Reason: {patch.reason}")
+    if result['skipped']:
+        print(f"  {len(result['skipped'])} patch(es) already applied")
+
+    if args.dry_run:
+        print(f"\nDry run: {len(result['applied'])} change(s) would be applied")
+        return
+    if not result['applied']:
+        print("\n✓ Workbook already corrected; nothing to save")
+        return
+
+    count = add_summary_entries(patcher, corrections, len(result['applied']))
+    print(f"\n  Added {count} audit entries to QA-QC Summary")
+
+    # Verify in memory before writing anything
+    missing = verify_patches(tables, patches)
+    if missing:
+        print(f"\n✗ Verification failed, workbook not saved: {', '.join(missing)}")
+        sys.exit(1)
+
+    if not args.no_journal:
+        # The workbook on disk is still unpatched here
+        journal = TariffJournal(args.journal)
+        if journal.ensure_baseline(workbook):
+            print(f"\n✓ Journaled baseline of {workbook} to {args.journal}")
+
+    if workbook == input_file:
+        shutil.copy(input_file, backup_file)
+        print(f"\n✓ Backup created: {backup_file}")
+    parts = patcher.save()
+    print(f"✓ Saved: {workbook} (rewrote {', '.join(parts)})")
+
+    if not args.no_journal:
+        recorded = journal.append(
+            {'op': 'set', 'tariff_id': patch.key, 'field': patch.field, 'old': old, 'new': patch.new,
+             'reason': patch.reason, 'source': corrections.get('source', Path(args.corrections).name)}
+            for patch, old, _ in result['applied'] if patch.table == 'tariffs')
+        print(f"✓ Journaled {recorded} tariff change(s) to {args.journal}")
+
+    print("\n" + "=" * 70)
+    print("QA/QC CORRECTIONS COMPLETE")
+    print(f"Total changes applied: {len(result['applied'])}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hot paths of the tariff and territory pipeline at scale.
+
+Tariff benchmarks run at 88 (the real database), 1k, 10k and 100k tariffs;
+territory benchmarks at 100, 1k and 10k polygons. Larger tariff sets are the
+real UTILITIES entries filled up with seeded synthetic tariffs, and
+territories are the matching synthetic polygons (multipart for multi-state
+tariffs), a third of them renamed to match UTILITY_NAME_MAPPING; see
+synthetic_data.py. Data is generated before timing starts.
+
+Benchmarks:
+    calculate_blended_rate      per tariff
+    calculate_protection_score  per workbook row
+    row_to_tariff               convert_rows() over a sheet DataFrame
+    validate_tariffs            every data-quality check over a sheet DataFrame
+    tariff_to_typescript        per tariff object literal
+    render_typescript           the whole generatedTariffData.ts module
+    create_workbook             the six-sheet openpyxl workbook, saved to a temp dir
+    simplify_geometry           repair + simplify, no geometry cache
+    match_utility               every feature against every mapping entry
+    process_features            match + simplify + extents (download path)
+    write_geojson               json.dump of the processed layer to a temp dir
+
+Each benchmark keeps the fastest of --repeat runs (runs that take over
+LONG_RUN seconds are not repeated). Results are written as JSON; --compare
+checks them against a saved baseline and flags changes beyond --threshold.
+
+Usage:
+    python scripts/benchmark_pipeline.py
+    python scripts/benchmark_pipeline.py --tariff-sizes 88 1000 --territory-sizes 100 --save-baseline
+    python scripts/benchmark_pipeline.py --only simplify_geometry process_features --compare
+    python scripts/benchmark_pipeline.py --compare-files old.json new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import TariffModel, iter_tariffs, make_territory, tariff_record
+
+BENCH_DIR = Path(__file__).parent / '.cache' / 'benchmarks'
+LATEST_FILE = BENCH_DIR / 'latest.json'
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+
+TARIFF_SIZES = [88, 1000, 10000, 100000]
+TERRITORY_SIZES = [100, 1000, 10000]
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.10
+SEED = 42
+
+# A run longer than this is not repeated
+LONG_RUN = 5.0
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress prints of the code under test."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+_model = None
+
+
+def tariff_model():
+    """The synthetic_data.py model fitted to UTILITIES (fitted once per run)."""
+    global _model
+    if _model is None:
+        _model = TariffModel()
+    return _model
+
+
+# =============================================================================
+# SYNTHETIC DATA
+# =============================================================================
+
+def synthetic_utilities(n, seed=SEED):
+    """The real UTILITIES entries, filled up to n with seeded synthetic ones."""
+    return list(iter_tariffs(tariff_model(), n, seed, include_real=True))
+
+
+def synthetic_territories(n, seed=SEED):
+    """n synthetic territory features; about a third renamed to a mapped utility name."""
+    from download_hifld_territories import UTILITY_NAME_MAPPING
+
+    model = tariff_model()
+    rng = np.random.default_rng(seed)
+    patterns = [p for names in UTILITY_NAME_MAPPING.values() for p in names]
+    features = []
+    for i, t in enumerate(iter_tariffs(model, n, seed)):
+        feature = make_territory(model, t, i, seed)
+        # Matching (and process_features) work on the raw HIFLD properties only
+        props = feature['properties']
+        del props['tariff_utility']
+        if rng.random() < 0.33:
+            props['NAME'] = f"{rng.choice(patterns)} {rng.choice(['', 'INC', 'CO', 'LLC'])}".strip()
+        features.append(feature)
+    return features
+
+
+def copy_features(features):
+    """Fresh feature dicts (process_features tags and replaces geometries in place)."""
+    return [{**f, 'properties': dict(f['properties'])} for f in features]
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+# Each takes the prepared data for one size and returns a callable to time.
+
+def bench_blended_rate(data):
+    from migrate_tariff_excel_to_ts import calculate_blended_rate
+    args = [(t.get('peak_demand_charge', 0), t.get('off_peak_demand_charge', 0), t.get('energy_rate_peak', 0),
+             t.get('energy_rate_off_peak', 0), t.get('fuel_adjustment', 0)) for t in data['utilities']]
+    return lambda: [calculate_blended_rate(*a) for a in args]
+
+
+def bench_protection_score(data):
+    from migrate_tariff_excel_to_ts import calculate_protection_score
+    rows = data['rows']
+    return lambda: [calculate_protection_score(row) for row in rows]
+
+
+def bench_row_to_tariff(data):
+    from migrate_tariff_excel_to_ts import convert_rows
+    df = data['df']
+    return lambda: convert_rows(df)
+
+
+def bench_validate_tariffs(data):
+    from validate_tariffs import validate_tariffs
+    df = data['df']
+    return lambda: validate_tariffs(df)
+
+
+def bench_tariff_to_typescript(data):
+    from migrate_tariff_excel_to_ts import tariff_to_typescript
+    tariffs = data['tariffs']
+    return lambda: [tariff_to_typescript(t) for t in tariffs]
+
+
+def bench_render_typescript(data):
+    from migrate_tariff_excel_to_ts import render_typescript
+    tariffs = data['tariffs']
+    return lambda: render_typescript(tariffs)
+
+
+def bench_create_workbook(data):
+    with quiet():
+        from create_final_comprehensive_db import create_workbook
+    utilities, tmp = data['utilities'], data['tmp']
+
+    def run():
+        with quiet():
+            create_workbook(utilities, Path(tmp) / 'workbook.xlsx')
+    return run
+
+
+def bench_simplify_geometry(data):
+    from download_hifld_territories import simplify_geometry
+    geometries = [f['geometry'] for f in data['features']]
+
+    def run():
+        with quiet():
+            return [simplify_geometry(g) for g in geometries]
+    return run
+
+
+def bench_match_utility(data):
+    from download_hifld_territories import UTILITY_NAME_MAPPING, match_utility
+    features = data['features']
+    names = list(UTILITY_NAME_MAPPING)
+    return lambda: [next((name for name in names if match_utility(f, name)), None) for f in features]
+
+
+def bench_process_features(data):
+    from download_hifld_territories import process_features
+    features = data['features']
+
+    def run():
+        with quiet():
+            return process_features(copy_features(features))
+    return run
+
+
+def bench_write_geojson(data):
+    from download_hifld_territories import process_features
+    with quiet():
+        processed, _ = process_features(copy_features(data['features']))
+    layer = {'type': 'FeatureCollection', 'features': processed}
+    path = Path(data['tmp']) / 'territories.geojson'
+
+    def run():
+        with open(path, 'w') as f:
+            json.dump(layer, f)
+    return run
+
+
+TARIFF_BENCHMARKS = {
+    'calculate_blended_rate': bench_blended_rate,
+    'calculate_protection_score': bench_protection_score,
+    'row_to_tariff': bench_row_to_tariff,
+    'validate_tariffs': bench_validate_tariffs,
+    'tariff_to_typescript': bench_tariff_to_typescript,
+    'render_typescript': bench_render_typescript,
+    'create_workbook': bench_create_workbook,
+}
+
+TERRITORY_BENCHMARKS = {
+    'simplify_geometry': bench_simplify_geometry,
+    'match_utility': bench_match_utility,
+    'process_features': bench_process_features,
+    'write_geojson': bench_write_geojson,
+}
+
+
+def tariff_data(n, tmp):
+    from migrate_tariff_excel_to_ts import convert_rows
+    utilities = synthetic_utilities(n)
+    rows = [tariff_record(t) for t in utilities]
+    df = pd.DataFrame(rows)
+    return {'utilities': utilities, 'rows': rows, 'df': df, 'tariffs': convert_rows(df), 'tmp': tmp}
+
+
+def territory_data(n, tmp):
+    return {'features': synthetic_territories(n), 'tmp': tmp}
+
+
+def time_benchmark(run, repeat):
+    """Fastest and all run times of a callable, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        if times[-1] > LONG_RUN:
+            break
+    return min(times), times
+
+
+def run_suite(tariff_sizes, territory_sizes, only=None, repeat=DEFAULT_REPEAT):
+    """Run the selected benchmarks; returns the list of result dicts."""
+    groups = [(TARIFF_BENCHMARKS, tariff_sizes, tariff_data, 'tariffs'),
+              (TERRITORY_BENCHMARKS, territory_sizes, territory_data, 'polygons')]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for benchmarks, sizes, make_data, unit in groups:
+            selected = {k: v for k, v in benchmarks.items() if not only or k in only}
+            if not selected:
+                continue
+            for size in sizes:
+                data = make_data(size, tmp)
+                for name, bench in selected.items():
+                    best, times = time_benchmark(bench(data), repeat)
+                    results.append({
+                        'benchmark': name, 'size': size, 'unit': unit,
+                        'best_s': round(best, 6), 'runs_s': [round(t, 6) for t in times],
+                        'per_item_us': round(best / size * 1e6, 3),
+                    })
+                    print(f"  {name:<28} {size:>7,} {unit:<9} {best:>10.4f}s  {best / size * 1e6:>10.2f} us/item")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Print the change of each benchmark against a baseline run.
+
+    Returns:
+        Number of benchmarks slower than the baseline by more than threshold
+    """
+    before = {(r['benchmark'], r['size']): r for r in baseline['results']}
+    print(f"\nAgainst baseline {baseline.get('commit') or '?'} ({baseline.get('started_at', '?')}):")
+    regressions = 0
+    for r in current['results']:
+        old = before.get((r['benchmark'], r['size']))
+        if old is None or not old['best_s']:
+            print(f"  {r['benchmark']:<28} {r['size']:>7,}   (not in baseline)")
+            continue
+        change = r['best_s'] / old['best_s'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  SLOWER'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"  {r['benchmark']:<28} {r['size']:>7,}  {old['best_s']:>10.4f}s -> {r['best_s']:>10.4f}s "
+              f"({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the tariff and territory hot paths')
+    parser.add_argument('--tariff-sizes', type=int, nargs='*', default=TARIFF_SIZES, help='Tariff counts')
+    parser.add_argument('--territory-sizes', type=int, nargs='*', default=TERRITORY_SIZES, help='Polygon counts')
+    parser.add_argument('--only', nargs='+', default=None, metavar='BENCHMARK',
+                        help='Run only these benchmarks')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Runs per benchmark (fastest is kept)')
+    parser.add_argument('--output', default=str(LATEST_FILE), help='Where to write the results JSON')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Also save the results as {BASELINE_FILE.name}')
+    parser.add_argument('--compare', nargs='?', const=str(BASELINE_FILE), default=None, metavar='BASELINE',
+                        help='Compare against a baseline results file (default: the saved baseline)')
+    parser.add_argument('--compare-files', nargs=2, default=None, metavar=('BASELINE', 'RESULTS'),
+                        help='Compare two saved results files without running anything')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative change reported as slower/faster')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit with status 1 if any benchmark is slower than the threshold allows')
+    args = parser.parse_args()
+
+    if args.compare_files:
+        with open(args.compare_files[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare_files[1]) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+    known = set(TARIFF_BENCHMARKS) | set(TERRITORY_BENCHMARKS)
+    unknown = [b for b in args.only or [] if b not in known]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)} (choose from {', '.join(sorted(known))})")
+
+    print(f"Benchmarking (repeat={args.repeat})")
+    started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    results = run_suite(args.tariff_sizes, args.territory_sizes, args.only, args.repeat)
+    current = {
+        'started_at': started_at,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults written to: {output}")
+    if args.save_baseline:
+        BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to: {BASELINE_FILE}")
+
+    if args.compare:
+        baseline_path = Path(args.compare)
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}; save one with --save-baseline")
+            return
+        with open(baseline_path) as f:
+            regressions = compare(json.load(f), current, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
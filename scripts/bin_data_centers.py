@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregate data center capacity into hexagonal cells for the heat maps.
+
+Instead of binning every data center point on each render, the map draws
+these cells directly (MapView's DC_HEX_LAYERS picks a resolution per zoom
+range, for the sizes in build.py's HEX_SIZES_KM). This script:
+1. Projects data centers to Albers equal-area (km) so cells have equal area
+2. Assigns every point to a pointy-top hexagon at each resolution with one
+   vectorized axial-coordinate rounding pass
+3. Sums MW and counts per cell, split by status and by year
+4. Writes one compact layer per resolution (data_centers_hex_<size>km.geojson)
+
+Cell properties:
+    mw, count         totals for the cell
+    mw_<status>       MW per status (operational, construction, announced, anticipated)
+    mw_by_year        {year: MW}, usable with ['get', '2030', ['get', 'mw_by_year']]
+
+Usage:
+    python scripts/bin_data_centers.py
+    python scripts/bin_data_centers.py --sizes 40 80 --binary
+"""
+
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+from geo_layers import project_albers, read_layer, unproject_albers, write_layer
+
+# Hexagon circumradius in km, one output layer each
+DEFAULT_SIZES_KM = [25, 50, 100]
+
+STATUSES = ['operational', 'construction', 'announced', 'anticipated']
+
+SQRT3 = np.sqrt(3)
+
+
+def hex_cells(x, y, size):
+    """
+    Axial (q, r) hexagon coordinates of projected points.
+
+    Args:
+        x, y: Arrays of Albers km
+        size: Hexagon circumradius in km
+
+    Returns:
+        (q, r) integer arrays
+    """
+    qf = (SQRT3 / 3 * x - y / 3) / size
+    rf = (2 / 3 * y) / size
+    sf = -qf - rf
+
+    # Cube rounding: round all three and fix the component with the largest error
+    q, r, s = np.round(qf), np.round(rf), np.round(sf)
+    dq, dr, ds = np.abs(q - qf), np.abs(r - rf), np.abs(s - sf)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    q = np.where(fix_q, -r - s, q)
+    r = np.where(fix_r, -q - s, r)
+    return q.astype(np.int64), r.astype(np.int64)
+
+
+def hex_polygons(q, r, size):
+    """Lon/lat rings (N x 7 x 2) of the hexagons with axial coordinates q, r."""
+    cx = size * SQRT3 * (q + r / 2)
+    cy = size * 1.5 * r
+    angles = np.radians(30 + 60 * np.arange(7))
+    vx = cx[:, None] + size * np.cos(angles)[None, :]
+    vy = cy[:, None] + size * np.sin(angles)[None, :]
+    lon, lat = unproject_albers(vx, vy)
+    ring = np.round(np.stack([lon, lat], axis=-1), 3)
+    ring[:, -1] = ring[:, 0]
+    return ring
+
+
+def bin_capacity(x, y, capacity, statuses, years, size):
+    """
+    Aggregate capacity into hexagons of one size.
+
+    Returns:
+        List of GeoJSON features, one per occupied cell
+    """
+    q, r = hex_cells(x, y, size)
+    cells, cell_idx = np.unique(np.column_stack([q, r]), axis=0, return_inverse=True)
+    cell_idx = cell_idx.ravel()
+    n_cells = len(cells)
+
+    mw = np.bincount(cell_idx, weights=capacity, minlength=n_cells)
+    count = np.bincount(cell_idx, minlength=n_cells)
+    by_status = {
+        status: np.bincount(cell_idx, weights=capacity * (statuses == status), minlength=n_cells)
+        for status in STATUSES
+    }
+
+    by_year = defaultdict(dict)
+    valid_year = years > 0
+    keys, sums = np.unique(np.column_stack([cell_idx[valid_year], years[valid_year]]), axis=0,
+                           return_inverse=True)
+    year_mw = np.bincount(sums.ravel(), weights=capacity[valid_year], minlength=len(keys))
+    for (ci, year), total in zip(keys.tolist(), year_mw.tolist()):
+        by_year[ci][str(year)] = round(total, 1)
+
+    rings = hex_polygons(cells[:, 0], cells[:, 1], size)
+    features = []
+    for i in range(n_cells):
+        props = {'mw': round(float(mw[i]), 1), 'count': int(count[i])}
+        for status in STATUSES:
+            if by_status[status][i]:
+                props[f'mw_{status}'] = round(float(by_status[status][i]), 1)
+        props['mw_by_year'] = by_year.get(i, {})
+        features.append({
+            'type': 'Feature',
+            'properties': props,
+            'geometry': {'type': 'Polygon', 'coordinates': [rings[i].tolist()]},
+        })
+    return features
+
+
+def hex_layer_name(size):
+    """Layer file name for a resolution, e.g. data_centers_hex_25km.geojson or ..._37.5km.geojson."""
+    return f'data_centers_hex_{size:g}km.geojson'
+
+
+def build_hex_layers(data_centers, sizes_km=DEFAULT_SIZES_KM):
+    """
+    Bin data centers at each resolution.
+
+    Returns:
+        Dict of size -> FeatureCollection
+    """
+    features = [f for f in data_centers['features'] if f.get('geometry')]
+    coords = np.array([f['geometry']['coordinates'][:2] for f in features], dtype=float)
+    x, y = project_albers(coords[:, 0], coords[:, 1])
+    capacity = np.array([f['properties'].get('capacity') or 0 for f in features], dtype=float)
+    statuses = np.array([f['properties'].get('status') or '' for f in features], dtype=object)
+    years = np.array([f['properties'].get('year') or 0 for f in features], dtype=np.int64)
+
+    layers = {}
+    for size in sizes_km:
+        cells = bin_capacity(x, y, capacity, statuses, years, size)
+        layers[size] = {
+            'type': 'FeatureCollection',
+            'metadata': {
+                'source': 'data_centers.geojson',
+                'hex_radius_km': size,
+                'statuses': STATUSES,
+                'max_mw': max((c['properties']['mw'] for c in cells), default=0),
+            },
+            'features': cells,
+        }
+    return layers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bin data center capacity into hexagonal cells')
+    parser.add_argument('--input', default='data_centers', help='Data center layer name')
+    parser.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES_KM,
+                        help='Hexagon circumradius in km, one layer each')
+    parser.add_argument('--binary', action='store_true',
+                        help='Also write quantized .geobin copies (see encode_geo_binary.py)')
+    args = parser.parse_args()
+    sizes = [int(s) if float(s).is_integer() else s for s in args.sizes]
+
+    data_centers = read_layer(args.input)
+    layers = build_hex_layers(data_centers, sizes)
+
+    for size, layer in layers.items():
+        path = write_layer(hex_layer_name(size), layer)
+        print(f"{size:g} km: {len(layer['features'])} cells, max {layer['metadata']['max_mw']:,.0f} MW "
+              f"-> {path.name} ({path.stat().st_size / 1024:.1f} KB)")
+        if args.binary:
+            from encode_geo_binary import write_binary_layer
+            binary_path = write_binary_layer(layer, path, precision=3)
+            print(f"  Binary layer written to: {binary_path.name} ({binary_path.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()
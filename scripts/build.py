@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Run the data pipeline as a DAG of stages, skipping the ones that are up to date.
+
+Each stage is one of the existing scripts with its inputs, outputs and
+arguments declared below. A stage's fingerprint hashes its input files, its
+code (the script plus the local modules it imports at module level, and any
+modules listed in its code=) and its arguments; a stage
+runs only when that fingerprint changed since its last successful run or an
+output is missing. Dependencies follow from the file paths: a stage depends on
+the most recent earlier stage that writes one of its inputs. Independent
+stages (the tariff build and the geo build) run in parallel.
+
+Only the workbook stages (QA/QC corrections, added utilities) rewrite an input
+in place; they record the fingerprint taken after they run, so they do not
+re-trigger themselves. Geo stages write derived layers to their own files and
+leave their inputs unchanged.
+
+Usage:
+    python scripts/build.py                     # run every stale stage
+    python scripts/build.py tariff_ts iso_regions
+    python scripts/build.py --list
+    python scripts/build.py --dry-run
+    python scripts/build.py --force territories -j 4
+    python scripts/build.py --skip territories   # offline: keep the current territory layer
+    python scripts/build.py --force tariff_ts --report reports/run1 --trace-memory
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+ROOT = SCRIPTS_DIR.parent
+GEOJSON = ROOT / 'nextjs-app' / 'public' / 'geojson'
+STATE_FILE = SCRIPTS_DIR / '.cache' / 'build_state.json'
+
+WORKBOOK = ROOT / 'Large_Load_Tariff_Database_FINAL.xlsx'
+TARIFF_TS = ROOT / 'nextjs-app' / 'lib' / 'generatedTariffData.ts'
+VALIDATION_REPORT = SCRIPTS_DIR / '.cache' / 'tariff_validation.json'
+
+GEO_MANIFEST = GEOJSON / 'manifest.json'
+# Hand-made layers the map loads that no stage reads or writes
+STATIC_LAYERS = [GEOJSON / 'iso_regions.geojson']
+
+HEX_SIZES_KM = [25, 50, 100]
+CLUSTER_LAYERS = ['data_centers', 'power_plants_new']
+CLUSTER_ZOOMS = range(3, 10)
+
+
+class Stage:
+    """One pipeline step: a script, its arguments, and the files it reads and writes."""
+
+    def __init__(self, name, script, inputs=(), outputs=(), args=(), description='', code=()):
+        self.name = name
+        self.script = SCRIPTS_DIR / script
+        # Modules the script always imports inside functions (followed like module-level imports)
+        self.code = [SCRIPTS_DIR / c for c in code]
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.args = list(args)
+        self.description = description
+
+    def command(self, report_dir=None, trace_memory=False, profile=False):
+        """The stage's command line, run through instrumentation.py when report_dir is given."""
+        if report_dir is None:
+            return [sys.executable, str(self.script)] + self.args
+        report_dir = Path(report_dir)
+        wrapper = [sys.executable, str(SCRIPTS_DIR / 'instrumentation.py'),
+                   '--report', str(report_dir / f'{self.name}.json')]
+        if trace_memory:
+            wrapper.append('--trace-memory')
+        if profile:
+            wrapper += ['--profile', str(report_dir / f'{self.name}.prof'),
+                        '--flame', str(report_dir / f'{self.name}.folded')]
+        return wrapper + [str(self.script)] + self.args
+
+
+STAGES = [
+    # Tariff build
+    Stage('tariff_db', 'create_final_comprehensive_db.py',
+          outputs=[WORKBOOK],
+          description='Generate the tariff workbook'),
+    Stage('qaqc', 'apply_qaqc_corrections.py',
+          inputs=[WORKBOOK, SCRIPTS_DIR / 'qaqc_corrections.json'], outputs=[WORKBOOK],
+          description='Apply QA/QC corrections to the workbook'),
+    Stage('more_utilities', 'add_more_utilities.py',
+          inputs=[WORKBOOK], outputs=[WORKBOOK],
+          description='Append the utilities added after the base workbook'),
+    Stage('validate', 'validate_tariffs.py',
+          inputs=[WORKBOOK], outputs=[VALIDATION_REPORT],
+          args=['--json', str(VALIDATION_REPORT)],
+          description='Check the tariff sheet (schema, ranges, outliers, cross-field rules)'),
+    Stage('tariff_ts', 'migrate_tariff_excel_to_ts.py',
+          inputs=[WORKBOOK, VALIDATION_REPORT], outputs=[TARIFF_TS],
+          code=['validate_tariffs.py', 'tariff_journal.py'],
+          description='Generate generatedTariffData.ts'),
+
+    # Geo build
+    Stage('territories', 'download_hifld_territories.py',
+          outputs=[GEOJSON / 'utility_territories.geojson'],
+          description='Download and simplify HIFLD territories'),
+    Stage('transmission', 'clean_transmission_lines.py',
+          inputs=[GEOJSON / 'transmission_230kv_plus.geojson'],
+          outputs=[GEOJSON / 'transmission_clean.geojson'],
+          description='Merge and clean transmission lines'),
+    Stage('join_data_centers', 'join_data_centers.py',
+          inputs=[GEOJSON / 'data_centers.geojson', GEOJSON / 'utility_territories.geojson', TARIFF_TS],
+          outputs=[GEOJSON / 'data_centers_joined.geojson'],
+          description='Tag data centers with their serving tariff'),
+    Stage('site_proximity', 'compute_site_proximity.py',
+          inputs=[GEOJSON / 'data_centers_joined.geojson', GEOJSON / 'transmission_clean.geojson',
+                  GEOJSON / 'power_plants_new.geojson'],
+          outputs=[GEOJSON / 'data_centers_sites.geojson'],
+          description='Precompute grid proximity for data centers'),
+    Stage('iso_regions', 'build_iso_regions.py',
+          inputs=[GEOJSON / 'utility_territories.geojson', TARIFF_TS],
+          outputs=[GEOJSON / 'iso_regions_dissolved.geojson'],
+          description='Dissolve territories into ISO/RTO regions'),
+    Stage('hex_bins', 'bin_data_centers.py',
+          inputs=[GEOJSON / 'data_centers.geojson'],
+          outputs=[GEOJSON / f'data_centers_hex_{size:g}km.geojson' for size in HEX_SIZES_KM],
+          args=['--sizes'] + [str(size) for size in HEX_SIZES_KM],
+          description='Bin data center capacity into hexagons'),
+    Stage('clusters', 'cluster_points.py',
+          inputs=[GEOJSON / f'{layer}.geojson' for layer in CLUSTER_LAYERS],
+          outputs=[GEOJSON / 'clusters' / f'{layer}_z{zoom}.geojson'
+                   for layer in CLUSTER_LAYERS for zoom in CLUSTER_ZOOMS],
+          args=['--layers', *CLUSTER_LAYERS,
+                '--min-zoom', str(min(CLUSTER_ZOOMS)), '--max-zoom', str(max(CLUSTER_ZOOMS))],
+          description='Precompute per-zoom point clusters'),
+]
+
+
+def encode_stage(stages):
+    """
+    Stage that encodes every map layer to .geobin and writes the layer manifest.
+
+    Its inputs are all the GeoJSON layers the other stages read or write, so it
+    runs after every layer writer; geo_layers.write_layer() deletes a layer's
+    .geobin, so a rewritten layer makes this stage's output missing.
+    """
+    layers = []
+    for stage in stages:
+        for path in stage.inputs + stage.outputs:
+            if path.suffix == '.geojson' and path not in layers:
+                layers.append(path)
+    layers += [path for path in STATIC_LAYERS if path not in layers]
+    return Stage('encode', 'encode_geo_binary.py',
+                 inputs=layers,
+                 outputs=[path.with_suffix('.geobin') for path in layers] + [GEO_MANIFEST],
+                 args=[path.relative_to(GEOJSON).as_posix() for path in layers],
+                 description='Encode map layers to .geobin and write the layer manifest')
+
+
+STAGES.append(encode_stage(STAGES))
+
+
+def resolve_dependencies(stages):
+    """Map each stage name to the names of the stages it waits for."""
+    deps = {}
+    for i, stage in enumerate(stages):
+        deps[stage.name] = set()
+        for path in stage.inputs:
+            for earlier in reversed(stages[:i]):
+                if path in earlier.outputs:
+                    deps[stage.name].add(earlier.name)
+                    break
+    return deps
+
+
+def module_level_imports(source):
+    """Top-level names imported outside function bodies (what runs on import)."""
+    pending = list(ast.parse(source).body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.Import):
+            yield from (alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level:
+                yield node.module.split('.')[0]
+        else:
+            pending.extend(ast.iter_child_nodes(node))
+
+
+def local_imports(script, seen=None):
+    """
+    The script plus every module in scripts/ it imports at module level, transitively.
+
+    Imports inside functions are optional features (e.g. the territory download's
+    --vertex-budget or --binary) and are not followed, so editing them does not
+    make the stage stale; a stage lists the ones it always uses in code=.
+    """
+    seen = set() if seen is None else seen
+    if script in seen or not script.exists():
+        return seen
+    seen.add(script)
+    for module in module_level_imports(script.read_text()):
+        local_imports(SCRIPTS_DIR / f'{module}.py', seen)
+    return seen
+
+
+def stage_code(stage):
+    """Every code file a stage's fingerprint covers."""
+    seen = set()
+    for script in [stage.script] + stage.code:
+        local_imports(script, seen)
+    return seen
+
+
+class FileHasher:
+    """Content hashes, reused while a file's size and mtime are unchanged."""
+
+    def __init__(self, known):
+        self.known = known
+
+    def digest(self, path):
+        if not path.exists():
+            return 'missing'
+        stat = path.stat()
+        key = str(path)
+        entry = self.known.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self.known[key] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': h.hexdigest()}
+        return h.hexdigest()
+
+
+def fingerprint(stage, hasher):
+    """Hash of a stage's input data, code and arguments."""
+    h = hashlib.sha256()
+    for path in stage.inputs:
+        h.update(f'in:{path.relative_to(ROOT)}:{hasher.digest(path)}\n'.encode())
+    for path in sorted(stage_code(stage)):
+        h.update(f'code:{path.name}:{hasher.digest(path)}\n'.encode())
+    h.update(json.dumps(stage.args).encode())
+    return h.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(path)
+
+
+def ancestors(name, deps):
+    """Every stage that `name` depends on, directly or not."""
+    seen, pending = set(), list(deps[name])
+    while pending:
+        dep = pending.pop()
+        if dep not in seen:
+            seen.add(dep)
+            pending.extend(deps[dep])
+    return seen
+
+
+def refresh_upstream(name, deps, state, hasher):
+    """
+    Re-record upstream fingerprints after a stage rewrote their inputs in place.
+
+    site_proximity rewrites data_centers.geojson, which join_data_centers also
+    reads; that change comes from the pipeline itself and must not make
+    join_data_centers stale on the next build.
+    """
+    stage = next(s for s in STAGES if s.name == name)
+    for upstream in STAGES:
+        if (upstream.name in ancestors(name, deps) and upstream.name in state['stages']
+                and set(upstream.inputs) & set(stage.outputs)):
+            state['stages'][upstream.name]['fingerprint'] = fingerprint(upstream, hasher)
+
+
+def record_run(stage, deps, state, hasher, seconds):
+    """Record a successful run of a stage (outside build() too, e.g. watch mode's in-process patches)."""
+    # Recorded after the run, so in-place stages see their own output
+    state['stages'][stage.name] = {
+        'fingerprint': fingerprint(stage, hasher),
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seconds': round(seconds, 2),
+    }
+    refresh_upstream(stage.name, deps, state, hasher)
+
+
+def is_stale(stage, state, hasher, force, skip=()):
+    """(stale?, reason) for a stage whose dependencies have finished."""
+    if stage.name in skip:
+        return False, 'skipped'
+    if stage.name in force:
+        return True, 'forced'
+    missing = [p for p in stage.outputs if not p.exists()]
+    if missing:
+        return True, f'missing {missing[0].relative_to(ROOT)}'
+    recorded = state['stages'].get(stage.name, {}).get('fingerprint')
+    if recorded is None:
+        return True, 'never built'
+    if recorded != fingerprint(stage, hasher):
+        return True, 'inputs changed'
+    return False, 'up to date'
+
+
+def run_stage(stage, report_dir=None, trace_memory=False, profile=False):
+    """Run one stage's script; returns (returncode, combined output, seconds)."""
+    start = time.perf_counter()
+    result = subprocess.run(stage.command(report_dir, trace_memory, profile), cwd=SCRIPTS_DIR,
+                            capture_output=True, text=True)
+    return result.returncode, result.stdout + result.stderr, time.perf_counter() - start
+
+
+def select(stages, deps, targets):
+    """The requested stages plus everything they depend on, in declaration order."""
+    if not targets:
+        return stages
+    wanted = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [s for s in stages if s.name in wanted]
+
+
+def write_run_report(report_dir, results, started_at, elapsed):
+    """Combine the per-stage instrumentation reports into report_dir/build.json."""
+    stages = []
+    for name, result in results.items():
+        entry = {'name': name, **result}
+        stage_report = report_dir / f'{name}.json'
+        if result['status'] in ('done', 'failed') and stage_report.exists():
+            with open(stage_report) as f:
+                entry['report'] = json.load(f)
+        stages.append(entry)
+    path = report_dir / 'build.json'
+    with open(path, 'w') as f:
+        json.dump({'started_at': started_at, 'wall_s': round(elapsed, 3), 'stages': stages}, f, indent=2)
+    return path
+
+
+def build(targets=(), force=(), jobs=4, dry_run=False, verbose=False, skip=(), quiet=False,
+          report_dir=None, trace_memory=False, profile=False):
+    """
+    Run stale stages with up to `jobs` in parallel.
+
+    quiet hides the stages that are already up to date. With report_dir, each
+    stage that runs writes an instrumentation report there (see
+    instrumentation.py) and build.json collects them.
+
+    Returns:
+        True if every selected stage is up to date or succeeded
+    """
+    deps = resolve_dependencies(STAGES)
+    stages = select(STAGES, deps, targets)
+    by_name = {s.name: s for s in stages}
+    state = load_state()
+    hasher = FileHasher(state.setdefault('files', {}))
+
+    done, failed, ran = set(), set(), set()
+    running = {}
+    results = {}
+    started_at, build_start = time.strftime('%Y-%m-%dT%H:%M:%S'), time.perf_counter()
+    if report_dir is not None:
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            # Start every stage whose dependencies are finished
+            for stage in stages:
+                name = stage.name
+                if name in done or name in failed or name in running.values():
+                    continue
+                stage_deps = deps[name] & by_name.keys()
+                if stage_deps & failed:
+                    print(f"[skip]  {name}: dependency failed")
+                    failed.add(name)
+                    results[name] = {'status': 'dependency failed'}
+                    continue
+                if not stage_deps <= done:
+                    continue
+
+                # A dry run cannot see upstream output changes, so assume them
+                upstream_ran = dry_run and bool(stage_deps & ran)
+                stale, reason = is_stale(stage, state, hasher, force, skip)
+                if not stale and not upstream_ran:
+                    if not quiet:
+                        print(f"[ok]    {name}: {reason}")
+                    done.add(name)
+                    results[name] = {'status': reason}
+                    continue
+                if dry_run:
+                    print(f"[would] {name}: {reason if stale else 'upstream would run'}")
+                    done.add(name)
+                    ran.add(name)
+                    continue
+                print(f"[run]   {name}: {reason}")
+                running[pool.submit(run_stage, stage, report_dir, trace_memory, profile)] = name
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                code, output, elapsed = future.result()
+                if verbose or code != 0:
+                    print('\n'.join(f"    {name} | {line}" for line in output.rstrip().splitlines()))
+                if code != 0:
+                    print(f"[fail]  {name}: exit {code} after {elapsed:.1f}s")
+                    failed.add(name)
+                    results[name] = {'status': 'failed', 'seconds': round(elapsed, 2)}
+                    continue
+                print(f"[done]  {name}: {elapsed:.1f}s")
+                done.add(name)
+                ran.add(name)
+                results[name] = {'status': 'done', 'seconds': round(elapsed, 2)}
+                record_run(by_name[name], deps, state, hasher, elapsed)
+                save_state(state)
+
+    if not dry_run:
+        save_state(state)
+    if report_dir is not None and not dry_run:
+        path = write_run_report(report_dir, results, started_at, time.perf_counter() - build_start)
+        print(f"Run report written to: {path}")
+    return not failed
+
+
+def list_stages():
+    deps = resolve_dependencies(STAGES)
+    state = load_state()
+    hasher = FileHasher(state.setdefault('files', {}))
+    for stage in STAGES:
+        _, reason = is_stale(stage, state, hasher, ())
+        after = f" (after {', '.join(sorted(deps[stage.name]))})" if deps[stage.name] else ''
+        print(f"{stage.name:18} {reason:28} {stage.description}{after}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the tariff and geo pipeline stages')
+    parser.add_argument('targets', nargs='*', help='Stages to build (default: all) plus their dependencies')
+    parser.add_argument('--list', action='store_true', help='List stages and their status')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would run')
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help='Rerun these stages')
+    parser.add_argument('--skip', nargs='+', default=[], metavar='STAGE',
+                        help='Treat these stages as up to date (e.g. territories when offline)')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Stages to run in parallel')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show stage output')
+    parser.add_argument('--report', default=None, metavar='DIR',
+                        help='Write per-stage timing/memory reports and build.json here')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='With --report, also record top Python allocators per stage (slower)')
+    parser.add_argument('--profile', action='store_true',
+                        help='With --report, also write cProfile stats and folded stacks per stage')
+    args = parser.parse_args()
+
+    names = {s.name for s in STAGES}
+    unknown = [n for n in args.targets + args.force + args.skip if n not in names]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(sorted(names))})")
+
+    if args.list:
+        list_stages()
+        return
+
+    if (args.trace_memory or args.profile) and not args.report:
+        parser.error('--trace-memory and --profile need --report DIR')
+
+    ok = build(args.targets, set(args.force), args.jobs, args.dry_run, args.verbose, set(args.skip),
+               report_dir=args.report, trace_memory=args.trace_memory, profile=args.profile)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Build iso_regions_dissolved.geojson by dissolving utility territories by ISO/RTO.
+
+The ISO layer the map draws (iso_regions.geojson) is drawn by hand, so its
+boundaries do not follow utility_territories.geojson or the tariffs' iso_rto
+field. This script builds the territory-based alternative as its own layer and
+never touches the hand-made one (the territory layer only covers utilities in
+the tariff database, so switching the map over is a data decision):
+1. Looks up each territory's tariff (tariff_utility) and groups territories
+   by the tariff's iso_rto (utilities outside an organized market are skipped)
+2. Unions each ISO's members with a cascaded union, splitting the work into
+   chunks that run in parallel worker processes
+3. Simplifies the result and writes one feature per ISO, styled like the
+   hand-made layer (every ISO has its own colour)
+
+Unions are cached per ISO, keyed by a hash of the member geometries and the
+simplify parameters, so when one utility changes only its ISO is recomputed.
+
+Usage:
+    python scripts/build_iso_regions.py
+    python scripts/build_iso_regions.py --tolerance 0.02 --output iso_regions_test
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
+from generated_tariffs import tariffs_by_utility
+from geo_layers import read_layer, write_layer
+
+CACHE_FILE = Path(__file__).parent / '.cache' / 'iso_union_cache.json'
+
+DEFAULT_TOLERANCE = 0.01   # degrees (~1 km)
+MIN_PART_AREA = 0.01       # square degrees; drops slivers left between territories
+CHUNK_SIZE = 8             # territories per parallel union task
+
+# Properties of each ISO feature; keys are the tariff iso_rto values
+ISO_STYLES = {
+    'SPP': {'zoneName': 'US-CENT-SWPP', 'name': 'Southwest Power Pool', 'color': '#3B82F6', 'type': 'regulated'},
+    'PJM': {'zoneName': 'US-MIDA-PJM', 'name': 'PJM Interconnection', 'color': '#EF4444', 'type': 'iso'},
+    'MISO': {'zoneName': 'US-MIDW-MISO', 'name': 'MISO', 'color': '#F59E0B', 'type': 'iso'},
+    'ERCOT': {'zoneName': 'US-TEX-ERCO', 'name': 'ERCOT', 'color': '#10B981', 'type': 'deregulated'},
+    'CAISO': {'zoneName': 'US-CAL-CISO', 'name': 'California ISO', 'color': '#EC4899', 'type': 'iso'},
+    'NYISO': {'zoneName': 'US-NY-NYIS', 'name': 'New York ISO', 'color': '#8B5CF6', 'type': 'deregulated'},
+    'ISO-NE': {'zoneName': 'US-NE-ISNE', 'name': 'ISO New England', 'color': '#06B6D4', 'type': 'deregulated'},
+}
+
+# iso_rto values that mean "no organized market"
+NON_ISO = {'', 'None', 'none', 'N/A'}
+
+
+def union_wkb(wkbs):
+    """Worker task: union a chunk of WKB geometries and return WKB."""
+    geoms = shapely.from_wkb(wkbs)
+    return shapely.to_wkb(shapely.union_all(shapely.make_valid(geoms)))
+
+
+def group_by_iso(territories, tariffs):
+    """
+    Group territory geometries by their tariff's iso_rto.
+
+    Returns:
+        Dict of iso -> (list of WKB geometries, sorted list of member utilities)
+    """
+    wkbs = defaultdict(list)
+    members = defaultdict(set)
+    for feature in territories['features']:
+        utility = feature['properties'].get('tariff_utility')
+        if not feature.get('geometry') or utility not in tariffs:
+            continue
+        iso = str(tariffs[utility].get('iso_rto') or '')
+        if iso in NON_ISO:
+            continue
+        wkbs[iso].append(shapely.to_wkb(shape(feature['geometry'])))
+        members[iso].add(utility)
+    return {iso: (wkbs[iso], sorted(members[iso])) for iso in wkbs}
+
+
+def members_key(wkbs, tolerance):
+    """Cache key for one ISO: member geometries (order-independent) plus parameters."""
+    digest = hashlib.sha1()
+    for h in sorted(hashlib.sha1(w).hexdigest() for w in wkbs):
+        digest.update(h.encode('ascii'))
+    digest.update(json.dumps({'tolerance': tolerance, 'min_part_area': MIN_PART_AREA}).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def finish_region(merged, tolerance):
+    """Simplify a dissolved region, drop slivers and round coordinates."""
+    simplified = shapely.simplify(merged, tolerance, preserve_topology=True)
+    parts = shapely.get_parts(simplified)
+    parts = parts[(shapely.get_type_id(parts) == 3) & (shapely.area(parts) >= MIN_PART_AREA)]
+    if not len(parts):
+        return None
+    region = parts[0] if len(parts) == 1 else shapely.multipolygons(parts)
+    return mapping(shapely.transform(region, lambda coords: np.round(coords, 4)))
+
+
+def dissolve_regions(groups, tolerance, cache, workers=None):
+    """
+    Union each ISO's members, reusing cached regions whose members are unchanged.
+
+    Returns:
+        (dict of iso -> GeoJSON geometry, list of recomputed ISOs)
+    """
+    keys = {iso: members_key(wkbs, tolerance) for iso, (wkbs, _) in groups.items()}
+    stale = [iso for iso in groups if cache.get(iso, {}).get('key') != keys[iso]]
+
+    if stale:
+        # First level of the cascade: fixed-size chunks across all stale ISOs, in parallel
+        tasks = []
+        for iso in stale:
+            wkbs = groups[iso][0]
+            for i in range(0, len(wkbs), CHUNK_SIZE):
+                tasks.append((iso, wkbs[i:i + CHUNK_SIZE]))
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            partials = list(pool.map(union_wkb, [chunk for _, chunk in tasks]))
+
+        by_iso = defaultdict(list)
+        for (iso, _), wkb in zip(tasks, partials):
+            by_iso[iso].append(wkb)
+
+        # Second level: merge each ISO's partial unions
+        for iso in stale:
+            merged = shapely.union_all(shapely.from_wkb(by_iso[iso]))
+            cache[iso] = {'key': keys[iso], 'geometry': finish_region(merged, tolerance)}
+
+    for iso in list(cache):
+        if iso not in groups:
+            del cache[iso]
+
+    return {iso: cache[iso]['geometry'] for iso in groups}, stale
+
+
+def build_iso_regions(territories, tariffs, tolerance=DEFAULT_TOLERANCE, cache=None, workers=None):
+    """
+    Dissolve territories into an ISO FeatureCollection.
+
+    Returns:
+        (FeatureCollection, list of recomputed ISOs)
+    """
+    cache = {} if cache is None else cache
+    groups = group_by_iso(territories, tariffs)
+    regions, recomputed = dissolve_regions(groups, tolerance, cache, workers)
+
+    features = []
+    for iso in sorted(regions):
+        if regions[iso] is None:
+            continue
+        style = ISO_STYLES.get(iso, {'zoneName': f'US-{iso}', 'name': iso, 'color': '#6B7280', 'type': 'iso'})
+        features.append({
+            'type': 'Feature',
+            'properties': {
+                'zoneName': style['zoneName'],
+                'countryKey': 'US',
+                'countryName': 'United States',
+                'name': style['name'],
+                'color': style['color'],
+                'type': style['type'],
+                'iso_rto': iso,
+                'utilities': groups[iso][1],
+            },
+            'geometry': regions[iso],
+        })
+
+    collection = {
+        'type': 'FeatureCollection',
+        'features': features,
+        'metadata': {
+            'source': 'Dissolved from utility_territories.geojson by tariff iso_rto',
+            'tolerance': tolerance,
+        },
+    }
+    return collection, recomputed
+
+
+def load_cache(path=CACHE_FILE):
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(cache, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dissolve utility territories into ISO/RTO regions')
+    parser.add_argument('--territories', default='utility_territories', help='Territory layer name')
+    parser.add_argument('--output', default='iso_regions_dissolved', help='Output layer name')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Simplification tolerance in degrees')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    territories = read_layer(args.territories)
+    tariffs = tariffs_by_utility()
+    cache = load_cache()
+
+    start = time.perf_counter()
+    collection, recomputed = build_iso_regions(territories, tariffs, args.tolerance, cache, args.workers)
+    elapsed = time.perf_counter() - start
+    save_cache(cache)
+
+    print(f"Built {len(collection['features'])} ISO regions in {elapsed:.2f}s "
+          f"({len(recomputed)} recomputed: {', '.join(recomputed) or 'none'})")
+    for feature in collection['features']:
+        props = feature['properties']
+        print(f"  {props['iso_rto']}: {len(props['utilities'])} utilities")
+
+    path = write_layer(args.output, collection)
+    print(f"\nOutput written to: {path}")
+    print(f"File size: {path.stat().st_size / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Clean up the 230kV+ transmission layer for the map.
+
+transmission_230kv_plus.geojson carries zero-length segments, thousands of
+short fragments that join end to end, and repeats "iso"/"color" on every
+feature. This script:
+1. Drops degenerate segments (fewer than two distinct vertices)
+2. Merges contiguous lines that share the same voltage and ISO
+3. Simplifies the merged lines and rounds coordinates
+4. Moves the ISO colors into collection-level metadata (styles.iso_colors)
+5. Writes transmission_clean.geojson (the source layer is left as is, so a
+   rerun starts from the same input) and reports the savings
+
+MapView draws transmission_clean when the layer manifest lists it. It reads
+styles.iso_colors to build its line-color expression, and falls back to the
+per-feature color property for the uncleaned source.
+
+Usage:
+    python scripts/clean_transmission_lines.py
+    python scripts/clean_transmission_lines.py --tolerance 0.004 --output transmission_test
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+import shapely
+from shapely.geometry import mapping, shape
+
+from geo_layers import layer_path, read_layer, write_layer
+
+DEFAULT_TOLERANCE = 0.002  # degrees (~200 m); source coordinates are at 0.01 degree resolution
+
+
+def explode_lines(geometry):
+    """Yield the non-degenerate LineStrings of a LineString/MultiLineString geometry."""
+    geom = shape(geometry)
+    for part in shapely.get_parts(geom):
+        coords = shapely.get_coordinates(part)
+        if len(coords) < 2 or (coords == coords[0]).all():
+            continue
+        yield part
+
+
+def round_coords(coords, ndigits=4):
+    """Round nested GeoJSON coordinate lists."""
+    if isinstance(coords[0], (int, float)):
+        return [round(coords[0], ndigits), round(coords[1], ndigits)]
+    return [round_coords(c, ndigits) for c in coords]
+
+
+def clean_transmission(collection, tolerance=DEFAULT_TOLERANCE):
+    """
+    Drop degenerate segments, merge contiguous lines and strip styling.
+
+    Args:
+        collection: Transmission FeatureCollection (v/iso/color properties)
+        tolerance: Simplification tolerance in degrees
+
+    Returns:
+        (cleaned FeatureCollection, stats dict)
+    """
+    groups = defaultdict(list)
+    iso_colors = dict(collection.get('metadata', {}).get('styles', {}).get('iso_colors', {}))
+    degenerate = 0
+
+    for feature in collection['features']:
+        props = feature.get('properties') or {}
+        if not feature.get('geometry'):
+            degenerate += 1
+            continue
+        if props.get('color') and props.get('iso'):
+            iso_colors.setdefault(props['iso'], props['color'])
+
+        parts = list(explode_lines(feature['geometry']))
+        if not parts:
+            degenerate += 1
+        groups[(props.get('v'), props.get('iso'))].extend(parts)
+
+    features = []
+    for (voltage, iso), parts in sorted(groups.items(), key=lambda kv: (kv[0][0] or 0, kv[0][1] or '')):
+        if not parts:
+            continue
+        merged = shapely.line_merge(shapely.multilinestrings(parts))
+        simplified = shapely.simplify(shapely.get_parts(merged), tolerance, preserve_topology=True)
+        for line in simplified:
+            if line.is_empty or line.length == 0:
+                continue
+            geometry = mapping(line)
+            geometry['coordinates'] = round_coords(geometry['coordinates'])
+            features.append({
+                'type': 'Feature',
+                'geometry': geometry,
+                'properties': {'v': voltage, 'iso': iso},
+            })
+
+    metadata = dict(collection.get('metadata', {}))
+    metadata['styles'] = {'iso_colors': iso_colors}
+    cleaned = {'type': 'FeatureCollection', 'metadata': metadata, 'features': features}
+
+    stats = {
+        'features_in': len(collection['features']),
+        'degenerate_dropped': degenerate,
+        'groups': len(groups),
+        'features_out': len(features),
+    }
+    return cleaned, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge and clean the transmission line layer')
+    parser.add_argument('--input', default='transmission_230kv_plus', help='Input layer name')
+    parser.add_argument('--output', default='transmission_clean', help='Output layer name')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Simplification tolerance in degrees')
+    args = parser.parse_args()
+
+    input_path = layer_path(args.input)
+    bytes_in = input_path.stat().st_size
+    collection = read_layer(args.input)
+
+    cleaned, stats = clean_transmission(collection, args.tolerance)
+    output_path = write_layer(args.output, cleaned)
+    bytes_out = output_path.stat().st_size
+
+    print(f"Features: {stats['features_in']:,} -> {stats['features_out']:,} "
+          f"({1 - stats['features_out'] / max(stats['features_in'], 1):.0%} fewer)")
+    print(f"  Degenerate features dropped: {stats['degenerate_dropped']:,}")
+    print(f"  Voltage/ISO groups merged: {stats['groups']}")
+    print(f"Size: {bytes_in / 1024:.1f} KB -> {bytes_out / 1024:.1f} KB "
+          f"({1 - bytes_out / max(bytes_in, 1):.0%} smaller)")
+    print(f"ISO colors: {json.dumps(cleaned['metadata']['styles']['iso_colors'])}")
+    print(f"\nOutput written to: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Clip utility territories to the states each tariff actually covers.
+
+STATE_FILTERS in download_hifld_territories.py keeps or drops whole HIFLD
+features by their STATE attribute, so a multi-state match such as PacifiCorp
+or Evergy brings in every state's polygon. This script instead:
+1. Builds state polygons from usa_states.geojson (border lines + label points)
+   and indexes them in an STRtree of prepared geometries
+2. Finds every tariff each territory matches by name (ignoring STATE_FILTERS)
+3. Intersects all (territory, state) candidate pairs in one vectorized call,
+   skipping the intersection for territories that lie wholly inside a state
+4. Emits one feature per (tariff, state) with the clipped parts
+
+Intersections are cached by a hash of the territory geometry and the state's
+geometry, so reruns only pay for territories (or state outlines) that changed.
+
+Usage:
+    python scripts/clip_territories_by_state.py
+    python scripts/clip_territories_by_state.py --output utility_territories_by_state
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping, shape
+
+from download_hifld_territories import UTILITY_NAME_MAPPING, match_utility
+from generated_tariffs import tariffs_by_utility
+from geo_layers import compute_extents, feature_area, read_layer, strip_extents, write_layer
+
+CACHE_FILE = Path(__file__).parent / '.cache' / 'state_clip_cache.json'
+
+# usa_states.geojson has one label point per state; these cover the state
+# parts that polygonize into separate faces without a label of their own
+EXTRA_STATE_LABELS = {
+    'MI': [(-86.9, 46.25)],   # Upper Peninsula
+    'VA': [(-75.75, 37.65)],  # Eastern Shore
+}
+
+# Unlabeled faces smaller than this (sq degrees) are slivers between two
+# states' outlines; they join the neighbour they share the most border with
+SLIVER_AREA = 0.01
+
+
+def build_state_polygons(states_layer):
+    """
+    Polygonize the state border lines and label each face by state.
+
+    Returns:
+        Dict of state code -> (Multi)Polygon
+    """
+    lines = [shape(f['geometry']) for f in states_layer['features']
+             if f['geometry']['type'] in ('LineString', 'MultiLineString')]
+    labels = [(f['properties']['stateId'], shape(f['geometry'])) for f in states_layer['features']
+              if f['geometry']['type'] == 'Point']
+    for state, points in EXTRA_STATE_LABELS.items():
+        labels.extend((state, shapely.Point(p)) for p in points)
+
+    faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(shapely.node(shapely.union_all(lines)))))
+    face_tree = shapely.STRtree(faces)
+
+    face_state = {}
+    label_points = np.array([p for _, p in labels], dtype=object)
+    label_idx, face_idx = face_tree.query(label_points, predicate='within')
+    for li, fi in zip(label_idx, face_idx):
+        face_state[fi] = labels[li][0]
+
+    for fi, face in enumerate(faces):
+        if fi in face_state:
+            continue
+        if face.area < SLIVER_AREA:
+            # Longest shared border among labelled neighbours
+            best, best_len = None, 0.0
+            for nj in face_tree.query(face, predicate='touches'):
+                if nj in face_state:
+                    shared = shapely.intersection(face.boundary, faces[nj].boundary).length
+                    if shared > best_len:
+                        best, best_len = face_state[nj], shared
+            if best:
+                face_state[fi] = best
+            continue
+        nearest = shapely.STRtree(label_points).nearest(face.representative_point())
+        face_state[fi] = labels[nearest][0]
+        print(f"  Warning: unlabeled state face (area={face.area:.3f}) assigned to nearest label {face_state[fi]}")
+
+    by_state = defaultdict(list)
+    for fi, state in face_state.items():
+        by_state[state].append(faces[fi])
+    return {state: shapely.union_all(parts) for state, parts in by_state.items()}
+
+
+def tariff_states(tariff):
+    """State codes from a tariff's state field ('TN/AL/KY/MS' -> {...})."""
+    return {s.strip() for s in str(tariff.get('state', '')).split('/') if s.strip()}
+
+
+def state_digest(state, state_geom):
+    """Hash of a state code and its polygon, so edited borders miss the cache."""
+    digest = hashlib.sha1(state.encode('utf-8'))
+    digest.update(shapely.to_wkb(state_geom, hex=False))
+    return digest.digest()
+
+
+def geometry_key(geom, state_hash):
+    """Cache key for one (territory geometry, state geometry) intersection."""
+    digest = hashlib.sha1(shapely.to_wkb(geom, hex=False))
+    digest.update(state_hash)
+    return digest.hexdigest()
+
+
+def load_cache(path=CACHE_FILE):
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(cache, f)
+
+
+def round_geometry(geom, ndigits=4):
+    """Round coordinates to the precision used by simplify_geometry."""
+    return shapely.transform(geom, lambda coords: np.round(coords, ndigits))
+
+
+def clip_territories(territories, state_polygons, tariffs, cache):
+    """
+    Clip each territory to each state of each tariff it matches.
+
+    Returns:
+        (list of per-(tariff, state) features, stats dict)
+    """
+    features = [f for f in territories['features'] if f.get('geometry')]
+    geoms = np.array([shapely.make_valid(shape(f['geometry'])) for f in features], dtype=object)
+
+    # Candidate tariffs by name only; geometry decides the state split
+    candidates = []
+    for feature in features:
+        names = [t for t in UTILITY_NAME_MAPPING if match_utility(feature, t, apply_state_filter=False)]
+        if not names and feature['properties'].get('tariff_utility'):
+            names = [feature['properties']['tariff_utility']]
+        candidates.append(names)
+
+    state_codes = sorted(state_polygons)
+    state_geoms = np.array([state_polygons[s] for s in state_codes], dtype=object)
+    shapely.prepare(state_geoms)
+    tree = shapely.STRtree(state_geoms)
+
+    terr_idx, state_idx = tree.query(geoms, predicate='intersects')
+
+    # Pairs needed by at least one candidate tariff
+    wanted = []
+    for ti, si in zip(terr_idx, state_idx):
+        state = state_codes[si]
+        owners = [t for t in candidates[ti] if t in tariffs and state in tariff_states(tariffs[t])]
+        if owners:
+            wanted.append((ti, si, owners))
+
+    state_hashes = [state_digest(s, g) for s, g in zip(state_codes, state_geoms)]
+    keys = [geometry_key(geoms[ti], state_hashes[si]) for ti, si, _ in wanted]
+    misses = [i for i, key in enumerate(keys) if key not in cache]
+
+    # Entries for old territory or state geometries can never hit again
+    for stale in set(cache) - set(keys):
+        del cache[stale]
+
+    if misses:
+        miss_terr = geoms[[wanted[i][0] for i in misses]]
+        miss_state = state_geoms[[wanted[i][1] for i in misses]]
+
+        # Wholly-inside territories need no intersection at all
+        inside = shapely.contains_properly(miss_state, miss_terr)
+        clipped = np.array(miss_terr, dtype=object)
+        if (~inside).any():
+            clipped[~inside] = shapely.intersection(miss_terr[~inside], miss_state[~inside])
+
+        for i, geom in zip(misses, clipped):
+            polys = [p for p in shapely.get_parts(geom) if p.geom_type == 'Polygon' and not p.is_empty]
+            cache[keys[i]] = mapping(round_geometry(shapely.multipolygons(polys))) if polys else None
+
+    parts = defaultdict(list)
+    names = defaultdict(set)
+    ids = defaultdict(set)
+    for (ti, si, owners), key in zip(wanted, keys):
+        if cache[key] is None:
+            continue
+        for tariff_name in owners:
+            group = (tariff_name, state_codes[si])
+            parts[group].extend(shapely.get_parts(shape(cache[key])))
+            names[group].add(features[ti]['properties'].get('NAME', ''))
+            ids[group].add(str(features[ti]['properties'].get('ID', '')))
+
+    out = []
+    for (tariff_name, state), polys in parts.items():
+        geom = polys[0] if len(polys) == 1 else shapely.multipolygons(polys)
+        out.append({
+            'type': 'Feature',
+            'properties': {
+                'NAME': '; '.join(sorted(names[(tariff_name, state)])),
+                'STATE': state,
+                'ID': ','.join(sorted(ids[(tariff_name, state)])),
+                'tariff_utility': tariff_name,
+            },
+            'geometry': mapping(geom),
+        })
+
+    # Largest first so smaller utilities render on top
+    compute_extents(out)
+    out.sort(key=feature_area, reverse=True)
+    strip_extents(out)
+
+    stats = {
+        'territories': len(features),
+        'pairs': len(wanted),
+        'computed': len(misses),
+        'cached': len(wanted) - len(misses),
+        'parts': len(out),
+    }
+    return out, stats
+
+
+def clip_to_tariff_states(territories):
+    """Clip a territory FeatureCollection in place, using and updating the on-disk cache."""
+    state_polygons = build_state_polygons(read_layer('usa_states'))
+    cache = load_cache()
+    features, stats = clip_territories(territories, state_polygons, tariffs_by_utility(), cache)
+    save_cache(cache)
+
+    territories['features'] = features
+    metadata = territories.setdefault('metadata', {})
+    metadata['clipped_by_state'] = True
+    metadata['utility_count'] = len({f['properties']['tariff_utility'] for f in features})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clip utility territories to tariff states')
+    parser.add_argument('--input', default='utility_territories', help='Territory layer name')
+    parser.add_argument('--output', default=None, help='Output layer name (default: overwrite input)')
+    args = parser.parse_args()
+
+    territories = read_layer(args.input)
+
+    start = time.perf_counter()
+    stats = clip_to_tariff_states(territories)
+    elapsed = time.perf_counter() - start
+
+    print(f"Clipped {stats['territories']} territories into {stats['parts']} (tariff, state) parts "
+          f"in {elapsed:.2f}s")
+    print(f"  Intersections: {stats['computed']} computed, {stats['cached']} from cache")
+
+    path = write_layer(args.output or args.input, territories)
+    print(f"\nOutput written to: {path}")
+    print(f"File size: {path.stat().st_size / 1024 / 1024:.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Precompute zoom-level point clusters for the data center and power plant layers.
+
+Drawing data_centers.geojson and power_plants_new.geojson as raw points at
+every zoom puts every marker on the national view. This script builds a
+cluster hierarchy offline, and MapView draws one cluster layer per zoom range
+(raw points only above --max-zoom):
+1. Projects points to normalized Web Mercator (the map's own tile space)
+2. At the highest clustered zoom, merges points that share a grid cell of
+   --radius pixels; each lower zoom merges the clusters of the zoom above,
+   so every cluster nests inside exactly one parent
+3. Sums counts and MW (total and per status) and places each cluster at the
+   count-weighted centroid of its members
+4. Writes one layer per zoom (clusters/<layer>_z<zoom>.geojson)
+
+Clusters of a single point keep the point's own properties. expansion_zoom is
+the first zoom at which a cluster splits, for click-to-zoom.
+
+Usage:
+    python scripts/cluster_points.py
+    python scripts/cluster_points.py --layers data_centers --min-zoom 2 --max-zoom 8 --radius 50
+"""
+
+import argparse
+
+import numpy as np
+
+from geo_layers import read_layer, write_layer
+
+DEFAULT_LAYERS = ['data_centers', 'power_plants_new']
+DEFAULT_MIN_ZOOM = 3
+DEFAULT_MAX_ZOOM = 9
+DEFAULT_RADIUS_PX = 60
+TILE_SIZE = 512
+
+
+def mercator_xy(lon, lat):
+    """Lon/lat degrees -> normalized Web Mercator x/y in [0, 1]."""
+    x = (np.asarray(lon) + 180.0) / 360.0
+    sin = np.sin(np.radians(np.clip(lat, -85.0511, 85.0511)))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+    return x, y
+
+
+def mercator_lonlat(x, y):
+    """Normalized Web Mercator x/y -> lon/lat degrees."""
+    lon = x * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y))))
+    return lon, lat
+
+
+def cluster_level(x, y, weight, zoom, radius_px):
+    """
+    Merge items that fall in the same radius-sized grid cell at one zoom.
+
+    Returns:
+        (parent index of each item, cluster x, cluster y) with centroids weighted by weight
+    """
+    cell = radius_px / (TILE_SIZE * 2 ** zoom)
+    keys = np.column_stack([np.floor(x / cell), np.floor(y / cell)]).astype(np.int64)
+    _, parent = np.unique(keys, axis=0, return_inverse=True)
+    parent = parent.ravel()
+
+    total = np.bincount(parent, weights=weight)
+    cx = np.bincount(parent, weights=x * weight) / total
+    cy = np.bincount(parent, weights=y * weight) / total
+    return parent, cx, cy
+
+
+def build_clusters(collection, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM, radius_px=DEFAULT_RADIUS_PX):
+    """
+    Build the cluster hierarchy for a point layer.
+
+    Returns:
+        Dict of zoom -> FeatureCollection
+    """
+    features = [f for f in collection['features'] if f.get('geometry')]
+    coords = np.array([f['geometry']['coordinates'][:2] for f in features], dtype=float)
+    capacity = np.array([f['properties'].get('capacity') or 0 for f in features], dtype=float)
+    statuses = np.array([f['properties'].get('status') or 'unknown' for f in features], dtype=object)
+    status_names = sorted(set(statuses))
+
+    x, y = mercator_xy(coords[:, 0], coords[:, 1])
+    count = np.ones(len(features))
+    # Index of the first source point in each item, for single-point clusters
+    first = np.arange(len(features))
+    by_status = {s: capacity * (statuses == s) for s in status_names}
+
+    levels = {}
+    parents = {}
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        parent, x, y = cluster_level(x, y, count, zoom, radius_px)
+        n = len(x)
+        count = np.bincount(parent, weights=count, minlength=n)
+        capacity = np.bincount(parent, weights=capacity, minlength=n)
+        by_status = {s: np.bincount(parent, weights=v, minlength=n) for s, v in by_status.items()}
+        first_of = np.full(n, len(features))
+        np.minimum.at(first_of, parent, first)
+        first = first_of
+
+        levels[zoom] = (x, y, count, capacity, by_status, first)
+        parents[zoom] = parent
+
+    # expansion_zoom: a cluster whose members span several clusters one zoom up
+    # expands there; a cluster with a single child expands where that child does
+    expansion = {max_zoom: np.full(len(levels[max_zoom][0]), max_zoom + 1)}
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        child_parent = parents[zoom]
+        children = np.bincount(child_parent, minlength=len(levels[zoom][0]))
+        only_child = np.zeros(len(children), dtype=np.int64)
+        only_child[child_parent] = np.arange(len(child_parent))
+        expansion[zoom] = np.where(children > 1, zoom + 1, expansion[zoom + 1][only_child])
+
+    layers = {}
+    for zoom, (cx, cy, cnt, mw, status_mw, first_idx) in levels.items():
+        lon, lat = mercator_lonlat(cx, cy)
+        out = []
+        for i in range(len(cx)):
+            if cnt[i] == 1:
+                props = dict(features[first_idx[i]]['properties'])
+                geometry = features[first_idx[i]]['geometry']
+            else:
+                props = {'cluster': True, 'count': int(cnt[i]), 'mw': round(float(mw[i]), 1)}
+                for s in status_names:
+                    if status_mw[s][i]:
+                        props[f'mw_{s}'] = round(float(status_mw[s][i]), 1)
+                props['expansion_zoom'] = int(expansion[zoom][i])
+                geometry = {'type': 'Point', 'coordinates': [round(float(lon[i]), 4), round(float(lat[i]), 4)]}
+            out.append({'type': 'Feature', 'properties': props, 'geometry': geometry})
+
+        layers[zoom] = {
+            'type': 'FeatureCollection',
+            'metadata': {'zoom': zoom, 'radius_px': radius_px, 'points': len(features)},
+            'features': out,
+        }
+    return layers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute per-zoom point clusters')
+    parser.add_argument('--layers', nargs='+', default=DEFAULT_LAYERS, help='Point layer names')
+    parser.add_argument('--min-zoom', type=int, default=DEFAULT_MIN_ZOOM, help='Lowest zoom to cluster')
+    parser.add_argument('--max-zoom', type=int, default=DEFAULT_MAX_ZOOM,
+                        help='Highest zoom to cluster (raw points above it)')
+    parser.add_argument('--radius', type=float, default=DEFAULT_RADIUS_PX, help='Cluster radius in pixels')
+    args = parser.parse_args()
+
+    for name in args.layers:
+        layers = build_clusters(read_layer(name), args.min_zoom, args.max_zoom, args.radius)
+        print(f"{name}:")
+        for zoom in sorted(layers):
+            path = write_layer(f'clusters/{name}_z{zoom}', layers[zoom])
+            clusters = sum(1 for f in layers[zoom]['features'] if f['properties'].get('cluster'))
+            print(f"  z{zoom}: {len(layers[zoom]['features'])} features ({clusters} clusters) "
+                  f"-> {path.relative_to(path.parent.parent)} ({path.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Precompute grid proximity metrics for every data center site.
+
+This script:
+1. Explodes transmission lines into 2-point segments (tight bounding boxes)
+   and builds one STRtree per voltage class (230+, 345+, 500+, 765+ kV)
+2. Builds an STRtree over new power plant points
+3. For all data centers at once, queries the nearest line in each class,
+   the nearest plants, and the plant capacity within a set of radii
+4. Writes the results as properties of a new layer, data_centers_sites.geojson
+   (the joined data centers plus proximity), so the front end never computes
+   distances and the input layers stay as they are
+
+All geometry is projected to Albers equal-area (km) before indexing.
+
+Usage:
+    python scripts/compute_site_proximity.py
+    python scripts/compute_site_proximity.py --radii 25 50 100 --nearest-plants 5
+    python scripts/compute_site_proximity.py --data-centers data_centers --transmission transmission_230kv_plus
+"""
+
+import argparse
+import time
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from geo_layers import project_albers, read_layer, write_layer
+
+# Lines at or above each class voltage are indexed together
+VOLTAGE_CLASSES = [230, 345, 500, 765]
+
+DEFAULT_RADII_KM = [50, 100, 200]
+DEFAULT_NEAREST_PLANTS = 3
+
+
+def line_segments(transmission):
+    """
+    Explode transmission features into projected 2-point segments.
+
+    Returns:
+        (array of LineString segments in km, array of segment voltages)
+    """
+    geoms = np.array([
+        shape(f['geometry']) for f in transmission['features'] if f.get('geometry')
+    ], dtype=object)
+    voltages = np.array([
+        f['properties'].get('v', 0) or 0 for f in transmission['features'] if f.get('geometry')
+    ], dtype=float)
+
+    # Split MultiLineStrings so every part is a simple line
+    parts, part_owner = shapely.get_parts(geoms, return_index=True)
+    coords, vertex_owner = shapely.get_coordinates(parts, return_index=True)
+    x, y = project_albers(coords[:, 0], coords[:, 1])
+
+    # A segment joins vertex i and i+1 when both belong to the same part
+    same_part = vertex_owner[:-1] == vertex_owner[1:]
+    start = np.flatnonzero(same_part)
+    segment_coords = np.stack([
+        np.column_stack([x[start], y[start]]),
+        np.column_stack([x[start + 1], y[start + 1]]),
+    ], axis=1)
+    segments = shapely.linestrings(segment_coords)
+    return segments, voltages[part_owner[vertex_owner[start]]]
+
+
+def nearest_line_distances(sites, segments, segment_voltages):
+    """Distance (km) from each site to the nearest segment in each voltage class."""
+    distances = {}
+    for kv in VOLTAGE_CLASSES:
+        in_class = segments[segment_voltages >= kv]
+        if not len(in_class):
+            distances[kv] = np.full(len(sites), np.nan)
+            continue
+        tree = shapely.STRtree(in_class)
+        (site_idx, _), dist = tree.query_nearest(sites, return_distance=True, all_matches=False)
+        out = np.full(len(sites), np.nan)
+        out[site_idx] = dist
+        distances[kv] = out
+    return distances
+
+
+def plant_proximity(sites, plant_points, plant_capacity, radii_km, k):
+    """
+    Capacity within each radius and the k nearest plants for every site.
+
+    Returns:
+        (dict radius -> capacity array, list of (plant indices, distances) per site)
+    """
+    tree = shapely.STRtree(plant_points)
+    max_radius = max(radii_km)
+
+    site_idx, plant_idx = tree.query(sites, predicate='dwithin', distance=max_radius)
+    dist = shapely.distance(sites[site_idx], plant_points[plant_idx])
+
+    capacity_within = {}
+    for radius in radii_km:
+        inside = dist <= radius
+        capacity_within[radius] = np.bincount(
+            site_idx[inside], weights=plant_capacity[plant_idx[inside]], minlength=len(sites))
+
+    # k nearest: sort hits by (site, distance) and cut each site's run at k
+    order = np.lexsort((dist, site_idx))
+    site_idx, plant_idx, dist = site_idx[order], plant_idx[order], dist[order]
+    bounds = np.searchsorted(site_idx, np.arange(len(sites) + 1))
+    nearest = [
+        (plant_idx[lo:min(hi, lo + k)], dist[lo:min(hi, lo + k)])
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+
+    # Sites with nothing inside the largest radius still get their single nearest plant
+    missing = np.flatnonzero(bounds[1:] == bounds[:-1])
+    if len(missing):
+        (miss_idx, near_idx), miss_dist = tree.query_nearest(
+            sites[missing], return_distance=True, all_matches=False)
+        for i, j, d in zip(missing[miss_idx], near_idx, miss_dist):
+            nearest[i] = (np.array([j]), np.array([d]))
+
+    return capacity_within, nearest
+
+
+def compute_site_proximity(data_centers, transmission, plants,
+                           radii_km=DEFAULT_RADII_KM, nearest_plants=DEFAULT_NEAREST_PLANTS):
+    """Annotate data center features in place with proximity properties."""
+    features = [f for f in data_centers['features'] if f.get('geometry')]
+    site_coords = np.array([f['geometry']['coordinates'][:2] for f in features], dtype=float)
+    sites = shapely.points(np.column_stack(project_albers(site_coords[:, 0], site_coords[:, 1])))
+
+    segments, segment_voltages = line_segments(transmission)
+    line_dist = nearest_line_distances(sites, segments, segment_voltages)
+
+    plant_features = [f for f in plants['features'] if f.get('geometry')]
+    plant_coords = np.array([f['geometry']['coordinates'][:2] for f in plant_features], dtype=float)
+    plant_points = shapely.points(np.column_stack(project_albers(plant_coords[:, 0], plant_coords[:, 1])))
+    plant_capacity = np.array([f['properties'].get('capacity') or 0 for f in plant_features], dtype=float)
+    capacity_within, nearest = plant_proximity(
+        sites, plant_points, plant_capacity, radii_km, nearest_plants)
+
+    for i, feature in enumerate(features):
+        props = feature['properties']
+        for kv in VOLTAGE_CLASSES:
+            d = line_dist[kv][i]
+            props[f'tx_{kv}kv_km'] = None if np.isnan(d) else round(float(d), 1)
+        for radius in radii_km:
+            props[f'gen_mw_{radius}km'] = round(float(capacity_within[radius][i]), 1)
+        props['nearest_plants'] = [
+            {
+                'name': plant_features[j]['properties'].get('name'),
+                'km': round(float(d), 1),
+                'mw': plant_features[j]['properties'].get('capacity'),
+            }
+            for j, d in zip(*nearest[i])
+        ]
+
+    return len(features), len(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute data center proximity to grid assets')
+    parser.add_argument('--radii', type=float, nargs='+', default=DEFAULT_RADII_KM,
+                        help='Radii in km for generation capacity sums')
+    parser.add_argument('--nearest-plants', type=int, default=DEFAULT_NEAREST_PLANTS,
+                        help='Number of nearest plants to record per site')
+    parser.add_argument('--data-centers', default='data_centers_joined', help='Data center layer name')
+    parser.add_argument('--transmission', default='transmission_clean', help='Transmission layer name')
+    parser.add_argument('--plants', default='power_plants_new', help='Power plant layer name')
+    parser.add_argument('--output', default='data_centers_sites', help='Output layer name')
+    args = parser.parse_args()
+    radii = [int(r) if float(r).is_integer() else r for r in args.radii]
+
+    data_centers = read_layer(args.data_centers)
+    transmission = read_layer(args.transmission)
+    plants = read_layer(args.plants)
+
+    start = time.perf_counter()
+    site_count, segment_count = compute_site_proximity(
+        data_centers, transmission, plants, radii, args.nearest_plants)
+    elapsed = time.perf_counter() - start
+
+    print(f"Computed proximity for {site_count} sites against {segment_count} line segments "
+          f"and {len(plants['features'])} plants in {elapsed * 1000:.1f} ms")
+
+    distances = [f['properties']['tx_230kv_km'] for f in data_centers['features']
+                 if f['properties'].get('tx_230kv_km') is not None]
+    if distances:
+        print(f"  Median distance to 230kV+: {float(np.median(distances)):.1f} km")
+
+    path = write_layer(args.output, data_centers)
+    print(f"\nOutput written to: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,9 @@ FINAL COMPREHENSIVE Large Load Utility Tariff Database
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from pathlib import Path
+
+OUTPUT_FILE = Path(__file__).parent.parent / 'Large_Load_Tariff_Database_FINAL.xlsx'
 
 # =============================================================================
 # COMPREHENSIVE UTILITY DATABASE WITH DOCUMENT CITATIONS
@@ -816,20 +819,8 @@ UTILITIES = [
      'notes': 'Partial requirements',
      'qaqc_status': 'Verified'},
 
-    {'utility': 'PNM Resources', 'state': 'NM', 'region': 'Southwest', 'iso_rto': 'None',
-     'tariff_name': 'Large Power Service', 'rate_schedule': 'Schedule 3B',
-     'effective_date': '2025-01-01', 'status': 'Active', 'docket': 'NM PRC Case',
-     'min_load_mw': 1.0, 'peak_demand_charge': 8.80, 'off_peak_demand_charge': 3.60,
-     'energy_rate_peak': 0.048, 'energy_rate_off_peak': 0.035, 'fuel_adjustment': 0.015,
-     'contract_term_years': 5, 'ratchet_pct': 0, 'demand_ratchet': True,
-     'ciac_required': True, 'take_or_pay': False, 'exit_fee': False, 'credit_requirements': True,
-     'dc_specific': False, 'collateral_required': False,
-     'rate_components': 'Base + FPPAC',
-     'source_document': 'PNM Schedule 3B',
-     'source_url': 'https://www.pnm.com/rates',
-     'page_reference': 'Schedule 3B',
-     'notes': 'New Mexico; coal transition',
-     'qaqc_status': 'Verified'},
+    # PNM Resources is the holding company of Public Service Company of New Mexico,
+    # which add_more_utilities.py adds - no separate row
 
     {'utility': 'Tucson Electric Power', 'state': 'AZ', 'region': 'Southwest', 'iso_rto': 'None',
      'tariff_name': 'Large General Service TOU', 'rate_schedule': 'Schedule LGS-51',
@@ -1110,7 +1101,7 @@ print(f"Total utilities in database: {len(UTILITIES)}")
 # EXCEL GENERATION WITH ALL 6 TABS AND CELL REFERENCES
 # =============================================================================
 
-def create_workbook():
+def create_workbook(utilities=UTILITIES, output_path=OUTPUT_FILE):
     """Create comprehensive workbook with all tabs and cell references."""
     wb = openpyxl.Workbook()
 
@@ -1151,7 +1142,7 @@ def create_workbook():
         cell.alignment = Alignment(horizontal='center', wrap_text=True)
 
     # Data rows with formulas
-    for row_idx, t in enumerate(UTILITIES, 3):
+    for row_idx, t in enumerate(utilities, 3):
         row = row_idx
         r = row  # For formula references
 
@@ -1252,7 +1243,7 @@ def create_workbook():
         energy = ((ep + fa) * 140160000) + ((eop + fa) * 210240000)
         return (demand + energy + 500) / 350400000
 
-    sorted_utils = sorted(enumerate(UTILITIES), key=lambda x: calc_blended(x[1]))
+    sorted_utils = sorted(enumerate(utilities), key=lambda x: calc_blended(x[1]))
 
     for rank, (orig_idx, t) in enumerate(sorted_utils, 1):
         row = rank + 1
@@ -1322,7 +1313,7 @@ def create_workbook():
         if min_load >= 50: score += 1
         return score
 
-    sorted_by_prot = sorted(enumerate(UTILITIES), key=lambda x: calc_score(x[1]), reverse=True)
+    sorted_by_prot = sorted(enumerate(utilities), key=lambda x: calc_score(x[1]), reverse=True)
 
     for rank, (orig_idx, t) in enumerate(sorted_by_prot, 1):
         row = rank + 1
@@ -1367,7 +1358,7 @@ def create_workbook():
         cell.fill = header_fill
         cell.border = border
 
-    for row_idx, t in enumerate(UTILITIES, 2):
+    for row_idx, t in enumerate(utilities, 2):
         ws4.cell(row=row_idx, column=1, value=t.get('utility', ''))
         ws4.cell(row=row_idx, column=2, value=t.get('source_document', ''))
         url = t.get('source_url', '')
@@ -1458,8 +1449,8 @@ def create_workbook():
         ['Generated: January 2026', '', ''],
         ['', '', ''],
         ['DATABASE STATISTICS', '', ''],
-        ['Total Utilities', len(UTILITIES), ''],
-        ['States Covered', len(set(t['state'] for t in UTILITIES)), ''],
+        ['Total Utilities', len(utilities), ''],
+        ['States Covered', len(set(t['state'] for t in utilities)), ''],
         ['', '', ''],
         ['BLENDED RATE METHODOLOGY', '', ''],
         ['Data Center Size', '600 MW', ''],
@@ -1506,14 +1497,13 @@ def create_workbook():
     ws6.column_dimensions['C'].width = 30
 
     # Save
-    output_path = '/sessions/laughing-peaceful-archimedes/mnt/power-insight/Large_Load_Tariff_Database_FINAL.xlsx'
     wb.save(output_path)
 
     print(f"\n{'='*70}")
     print("FINAL COMPREHENSIVE DATABASE GENERATED")
     print(f"{'='*70}")
     print(f"Output: {output_path}")
-    print(f"Total Utilities: {len(UTILITIES)}")
+    print(f"Total Utilities: {len(utilities)}")
     print(f"\nSheets created:")
     print("  1. Tariff Database - Base data with live formulas")
     print("  2. Blended Rate Analysis - References Tariff Database")
@@ -1523,13 +1513,13 @@ def create_workbook():
     print("  6. QA-QC Summary - Methodology and corrections")
 
     # Stats
-    rates = [calc_blended(t) for t in UTILITIES]
+    rates = [calc_blended(t) for t in utilities]
     print(f"\nBlended Rate Range: ${min(rates):.4f} - ${max(rates):.4f}/kWh")
     print(f"Average Blended Rate: ${sum(rates)/len(rates):.4f}/kWh")
 
-    high = sum(1 for t in UTILITIES if calc_score(t) >= 14)
-    mid = sum(1 for t in UTILITIES if 8 <= calc_score(t) < 14)
-    low = sum(1 for t in UTILITIES if calc_score(t) < 8)
+    high = sum(1 for t in utilities if calc_score(t) >= 14)
+    mid = sum(1 for t in utilities if 8 <= calc_score(t) < 14)
+    low = sum(1 for t in utilities if calc_score(t) < 8)
     print(f"\nProtection Distribution: High={high}, Mid={mid}, Low={low}")
 
 if __name__ == '__main__':
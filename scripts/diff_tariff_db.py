@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Diff two tariff databases: workbooks or JSON snapshots.
+
+Rows are aligned by tariff ID (create_tariff_id of Utility and State, the ID
+generatedTariffData.ts uses), so inserted, deleted or re-sorted rows do not
+cascade into spurious changes. Each row is reduced to a digest of its
+normalized cells; only rows whose digests differ are compared cell by cell,
+so the diff is O(rows) plus the size of the actual changes.
+
+Inputs:
+- .xlsx: the tariff sheet ('Tariff Database', or the first sheet whose name
+  starts with it, e.g. 'Tariff Database (60 Utilities)'); the header row is
+  found automatically (row 2 in the FINAL workbook, row 1 in older variants).
+  Formulas are compared as text, with references to their own row written as
+  {row}, so the same formula on a moved row is unchanged.
+- .json: a list of records (or {"tariffs": [...]}) keyed by 'id', or by
+  utility and state (UTILITIES-schema records as in synthetic_data.py's
+  tariffs.json, or sheet-style records with 'Utility' and 'State').
+
+Columns are matched by name; columns present on one side only are listed
+separately and not counted as cell changes.
+
+Usage:
+    python scripts/diff_tariff_db.py Large_Load_Tariff_Database_BACKUP_PRE_QAQC.xlsx Large_Load_Tariff_Database_FINAL.xlsx
+    python scripts/diff_tariff_db.py old.xlsx new.xlsx --json diff.json
+    python scripts/diff_tariff_db.py old.json new.xlsx --format json --ignore Notes "Row"
+
+Exit status is 0 when the databases match and 1 when they differ (like diff).
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from tariff_corrections import tariff_key
+from migrate_tariff_excel_to_ts import create_tariff_id
+from xlsx_patch import XlsxPatcher
+
+TARIFF_SHEET = 'Tariff Database'
+# Header row is searched for in the first rows of the sheet
+HEADER_SEARCH_ROWS = 5
+# Columns that only number the rows
+ROW_NUMBER_COLUMNS = {'Row', '#'}
+
+CELL_REF_RE = re.compile(r"(?<![A-Za-z_!'])(\$?[A-Z]{1,3}\$?)(\d+)\b")
+
+
+class TariffTable:
+    """Rows of one tariff database keyed by tariff ID."""
+
+    def __init__(self, source, columns):
+        self.source = source
+        self.columns = columns
+        self.rows = {}
+        self.locations = {}
+        self.duplicates = []
+
+    def add(self, key, location, record):
+        if key in self.rows:
+            # Keep both rows; the later one gets a numbered key
+            n = 2
+            while f'{key}#{n}' in self.rows:
+                n += 1
+            self.duplicates.append(key)
+            key = f'{key}#{n}'
+        self.rows[key] = record
+        self.locations[key] = location
+
+
+def normalize(value, row=None):
+    """Comparable form of a cell: blanks as None, whole floats as ints, same-row references as {row}."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        if value != value:
+            return None
+        return int(value) if value.is_integer() else round(value, 10)
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        if value.startswith('=') and row is not None:
+            return CELL_REF_RE.sub(lambda m: m.group(1) + ('{row}' if int(m.group(2)) == row else m.group(2)), value)
+        return value
+    return value
+
+
+def find_tariff_sheet(patcher, sheet=None):
+    if sheet:
+        return sheet
+    if TARIFF_SHEET in patcher.sheetnames:
+        return TARIFF_SHEET
+    for name in patcher.sheetnames:
+        if name.startswith(TARIFF_SHEET):
+            return name
+    raise ValueError(f"{patcher.path.name}: no '{TARIFF_SHEET}' sheet (sheets: {', '.join(patcher.sheetnames)})")
+
+
+def load_workbook_table(path, sheet=None):
+    patcher = XlsxPatcher(path)
+    sheet = find_tariff_sheet(patcher, sheet)
+    rows = patcher.values(sheet)
+
+    header_row = next((r for r in sorted(rows)[:HEADER_SEARCH_ROWS]
+                       if {'Utility', 'State'} <= {str(v).strip() for v in rows[r].values() if v is not None}), None)
+    if header_row is None:
+        raise ValueError(f"{path}: no header row with Utility and State in '{sheet}'")
+    columns = {}
+    for col, value in sorted(rows[header_row].items()):
+        if value is not None:
+            columns.setdefault(str(value).strip(), col)
+
+    table = TariffTable(f'{path} [{sheet}]', list(columns))
+    for r in sorted(r for r in rows if r > header_row):
+        cells = rows[r]
+        record = {name: normalize(cells.get(col), r) for name, col in columns.items()}
+        key = tariff_key(record)
+        if key is not None:
+            table.add(key, f'row {r}', record)
+    return table
+
+
+def load_json_table(path):
+    with open(path) as f:
+        data = json.load(f)
+    records = data.get('tariffs', data) if isinstance(data, dict) else data
+    if not isinstance(records, list):
+        raise ValueError(f"{path}: expected a list of tariff records")
+
+    columns = []
+    seen = set()
+    table = TariffTable(str(path), columns)
+    for i, raw in enumerate(records):
+        record = {k: normalize(v) if not isinstance(v, (dict, list)) else json.dumps(v, sort_keys=True)
+                  for k, v in raw.items()}
+        for k in record:
+            if k not in seen:
+                seen.add(k)
+                columns.append(k)
+        if record.get('id'):
+            key = str(record['id'])
+        elif record.get('utility'):
+            key = create_tariff_id(str(record['utility']), record.get('state') or '')
+        else:
+            key = tariff_key(record)
+        if key is not None:
+            table.add(key, f'record {i}', record)
+    return table
+
+
+def load_table(path, sheet=None):
+    path = Path(path)
+    if path.suffix.lower() == '.json':
+        return load_json_table(path)
+    return load_workbook_table(path, sheet)
+
+
+def row_digest(record, columns):
+    """Digest of a row's cells in the given column order."""
+    return hashlib.blake2b(repr([record.get(c) for c in columns]).encode(), digest_size=16).digest()
+
+
+def diff_tables(old, new, ignore=()):
+    """
+    Compare two TariffTables.
+
+    Returns:
+        JSON-serializable dict with added/removed/changed tariffs and column changes
+    """
+    ignored = set(ignore) | ROW_NUMBER_COLUMNS
+    common = [c for c in old.columns if c in set(new.columns) and c not in ignored]
+
+    old_keys, new_keys = old.rows.keys(), new.rows.keys()
+    changed = []
+    unchanged = 0
+    for key in old_keys & new_keys:
+        a, b = old.rows[key], new.rows[key]
+        if row_digest(a, common) == row_digest(b, common):
+            unchanged += 1
+            continue
+        cells = [{'field': c, 'old': a.get(c), 'new': b.get(c)} for c in common if a.get(c) != b.get(c)]
+        changed.append({'id': key, 'old_location': old.locations[key], 'new_location': new.locations[key],
+                        'cells': cells})
+    changed.sort(key=lambda c: c['id'])
+
+    def summary(table, key):
+        record = table.rows[key]
+        return {'id': key, 'location': table.locations[key],
+                'utility': record.get('Utility', record.get('utility'))}
+
+    return {
+        'old': old.source,
+        'new': new.source,
+        'old_count': len(old.rows),
+        'new_count': len(new.rows),
+        'added': [summary(new, k) for k in sorted(new_keys - old_keys)],
+        'removed': [summary(old, k) for k in sorted(old_keys - new_keys)],
+        'changed': changed,
+        'unchanged': unchanged,
+        'columns_added': [c for c in new.columns if c not in set(old.columns)],
+        'columns_removed': [c for c in old.columns if c not in set(new.columns)],
+        'duplicate_ids': {'old': sorted(set(old.duplicates)), 'new': sorted(set(new.duplicates))},
+    }
+
+
+def is_empty(result):
+    return not (result['added'] or result['removed'] or result['changed']
+                or result['columns_added'] or result['columns_removed'])
+
+
+def format_text(result):
+    lines = [f"--- {result['old']} ({result['old_count']} tariffs)",
+             f"+++ {result['new']} ({result['new_count']} tariffs)"]
+    if result['columns_removed']:
+        lines.append(f"Columns removed: {', '.join(result['columns_removed'])}")
+    if result['columns_added']:
+        lines.append(f"Columns added: {', '.join(result['columns_added'])}")
+    for side, ids in result['duplicate_ids'].items():
+        if ids:
+            lines.append(f"Duplicate IDs in {side} (numbered #2, #3, ...): {', '.join(ids)}")
+
+    for t in result['removed']:
+        lines.append(f"- {t['id']} ({t['utility']}, {t['location']})")
+    for t in result['added']:
+        lines.append(f"+ {t['id']} ({t['utility']}, {t['location']})")
+    for c in result['changed']:
+        moved = '' if c['old_location'] == c['new_location'] else f", {c['old_location']} -> {c['new_location']}"
+        lines.append(f"~ {c['id']} ({len(c['cells'])} cell(s){moved})")
+        for cell in c['cells']:
+            lines.append(f"    {cell['field']}: {cell['old']!r} -> {cell['new']!r}")
+
+    lines.append(f"\n{len(result['added'])} added, {len(result['removed'])} removed, "
+                 f"{len(result['changed'])} changed "
+                 f"({sum(len(c['cells']) for c in result['changed'])} cells), {result['unchanged']} unchanged")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff two tariff workbooks or JSON snapshots by tariff ID')
+    parser.add_argument('old', help='Old workbook (.xlsx) or snapshot (.json)')
+    parser.add_argument('new', help='New workbook (.xlsx) or snapshot (.json)')
+    parser.add_argument('--sheet', default=None, help=f"Sheet to compare (default: the '{TARIFF_SHEET}' sheet)")
+    parser.add_argument('--ignore', nargs='+', default=[], metavar='COLUMN', help='Columns to leave out')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='Output on stdout')
+    parser.add_argument('--json', default=None, metavar='PATH', help='Also write the diff as JSON')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    old = load_table(args.old, args.sheet)
+    new = load_table(args.new, args.sheet)
+    result = diff_tables(old, new, args.ignore)
+    result['seconds'] = round(time.perf_counter() - start, 4)
+
+    if args.format == 'json':
+        print(json.dumps(result, indent=2, default=str))
+    else:
+        print(format_text(result))
+        print(f"Compared in {result['seconds'] * 1000:.0f} ms")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, default=str)
+
+    sys.exit(0 if is_empty(result) else 1)
+
+
+if __name__ == '__main__':
+    main()
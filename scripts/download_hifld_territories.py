@@ -7,18 +7,54 @@ This script:
 2. Filters to only utilities in our tariff database
 3. Simplifies geometries to reduce file size
 4. Outputs a GeoJSON file for use in the web app
+
+Responses are parsed incrementally and each feature goes straight into matching
+and simplification. Completed pages are checkpointed, so rerunning after a crash
+resumes where the download stopped (use --restart to start over).
+
+Processed features are kept in a local store keyed by HIFLD ID. With
+--incremental, an attribute-only listing of the mapped utilities' records is
+compared against the store: records deleted upstream or no longer mapped are
+dropped, and only new or edited records are fetched with geometry.
+
+Repaired and simplified geometries are cached by a hash of the raw geometry
+(see geometry_cache.py), so reprocessing unchanged records is cheap.
 """
 
+import argparse
+import codecs
+import hashlib
 import json
+import os
+import sys
 import urllib.request
 import urllib.parse
 from pathlib import Path
+import shapely
 from shapely.geometry import shape, mapping
 from shapely.validation import make_valid
 
+from geo_layers import compute_extents, feature_area, strip_extents
+from geometry_cache import MISS, GeometryCache
+from instrumentation import stage, step, timed_iter
+
 # ArcGIS Feature Service endpoint
 HIFLD_SERVICE = "https://services3.arcgis.com/OYP7N6mAJJCyH6hd/arcgis/rest/services/Electric_Retail_Service_Territories_HIFLD/FeatureServer/0/query"
 
+# HIFLD attribute holding each record's last validation/update date (epoch ms in GeoJSON)
+EDIT_DATE_FIELD = 'VAL_DATE'
+OUT_FIELDS = f'NAME,STATE,ID,{EDIT_DATE_FIELD}'
+
+# Processed features keyed by HIFLD ID, for --incremental refreshes
+STORE_FILE = Path(__file__).parent / '.cache' / 'territory_store.json'
+
+# Fixed-tolerance simplification (degrees, square degrees) when no vertex budget is set
+SIMPLIFY_TOLERANCE = 0.005
+MIN_POLYGON_AREA = 0.001
+
+# Completed (batch, offset) pages, so an interrupted download can resume
+CHECKPOINT_FILE = Path(__file__).parent / '.cache' / 'hifld_download_checkpoint.jsonl'
+
 # Mapping from tariff database utility names to HIFLD NAME patterns
 # Format: 'tariff_db_name': ['HIFLD_pattern1', 'HIFLD_pattern2', ...]
 UTILITY_NAME_MAPPING = {
@@ -139,12 +175,86 @@ def build_where_clauses(batch_size=10):
 
     return batches
 
-def query_hifld(where_clause, offset=0, limit=1000):
-    """Query the HIFLD Feature Service."""
+def iter_geojson_features(stream, chunk_size=64 * 1024):
+    """
+    Incrementally parse a GeoJSON FeatureCollection, yielding one feature at a time.
+
+    Only the feature being decoded (plus one read chunk) is held in memory, instead
+    of the raw response bytes and the full parsed tree of up to 1,000 polygons.
+
+    Args:
+        stream: Binary file-like object (e.g. an HTTP response)
+        chunk_size: Bytes to read per call
+
+    Yields:
+        GeoJSON feature dicts
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer = buffer[pos:] + text.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+
+    # Skip ahead to the opening bracket of the "features" array
+    while True:
+        key = buffer.find('"features"', pos)
+        if key >= 0:
+            bracket = buffer.find('[', key)
+            if bracket >= 0:
+                pos = bracket + 1
+                break
+        if eof:
+            # ArcGIS reports query errors as a JSON body without features
+            body = json.loads(buffer) if buffer.strip() else {}
+            if 'error' in body:
+                raise RuntimeError(f"HIFLD query failed: {body['error'].get('message', body['error'])}")
+            return
+        fill()
+
+    while True:
+        # Skip separators between features
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            fill()
+
+        if pos >= len(buffer) or buffer[pos] == ']':
+            return
+
+        try:
+            feature, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Incomplete feature: read until the pending text has doubled before decoding
+            # again, so a multi-MB polygon is re-parsed O(log n) times instead of per chunk
+            pending = len(buffer) - pos
+            while not eof and len(buffer) - pos < 2 * pending:
+                fill()
+            continue
+
+        pos = end
+        yield feature
+
+
+def query_hifld(where_clause, offset=0, limit=1000, return_geometry=True):
+    """Query the HIFLD Feature Service, yielding features as they are parsed."""
     params = {
         'where': where_clause,
-        'outFields': 'NAME,STATE,ID',
-        'returnGeometry': 'true',
+        'outFields': OUT_FIELDS,
+        'returnGeometry': 'true' if return_geometry else 'false',
         'outSR': '4326',
         'f': 'geojson',
         'resultRecordCount': str(limit),
@@ -154,10 +264,91 @@ def query_hifld(where_clause, offset=0, limit=1000):
     url = f"{HIFLD_SERVICE}?{urllib.parse.urlencode(params)}"
     print(f"Querying: offset={offset}")
 
-    with urllib.request.urlopen(url, timeout=120) as response:
-        return json.loads(response.read().decode('utf-8'))
+    with step('http_fetch'):
+        response = urllib.request.urlopen(url, timeout=120)
+    with response:
+        yield from timed_iter('http_fetch', iter_geojson_features(response))
+
+def query_hifld_all(where_clause, limit=1000, return_geometry=True):
+    """Yield every feature matching a WHERE clause, following result pages."""
+    offset = 0
+    while True:
+        retrieved = 0
+        for feature in query_hifld(where_clause, offset, limit, return_geometry):
+            retrieved += 1
+            yield feature
+        if retrieved < limit:
+            return
+        offset += limit
+
+
+class DownloadCheckpoint:
+    """
+    Append-only record of completed (batch, offset) pages and their processed features.
+
+    Each line of the checkpoint file is one finished page, written only after every
+    feature of that page has been matched and simplified, so a crash mid-download
+    resumes at the first unfinished page. The header line fingerprints the query
+    batches and the simplify settings (pages hold raw geometry in budget mode and
+    simplified geometry otherwise); a changed UTILITY_NAME_MAPPING, budget or
+    tolerance starts a fresh checkpoint.
+    """
+
+    def __init__(self, path, where_clauses, settings=None, restart=False):
+        self.path = Path(path)
+        digest = hashlib.sha256('\n'.join(where_clauses).encode('utf-8'))
+        digest.update(json.dumps(settings or {}, sort_keys=True).encode('utf-8'))
+        self.fingerprint = digest.hexdigest()
+        self.completed = {}
+
+        if self.path.exists() and not restart:
+            with open(self.path) as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('fingerprint') == self.fingerprint:
+                    for line in f:
+                        try:
+                            page = json.loads(line)
+                        except json.JSONDecodeError:
+                            break  # torn final line from a crash
+                        self.completed[(page['batch'], page['offset'])] = page['retrieved']
+                else:
+                    print("Checkpoint is for a different query set or simplify settings, starting over")
+
+        if not self.completed:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w') as f:
+                f.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+
+    def is_done(self, batch, offset):
+        return (batch, offset) in self.completed
+
+    def retrieved(self, batch, offset):
+        return self.completed[(batch, offset)]
+
+    def record(self, batch, offset, retrieved, features):
+        """Persist a finished page (one line, flushed to disk)."""
+        page = {'batch': batch, 'offset': offset, 'retrieved': retrieved, 'features': features}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(page) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed[(batch, offset)] = retrieved
+
+    def iter_features(self):
+        """Stream processed features back out of the checkpoint file."""
+        with open(self.path) as f:
+            f.readline()
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                yield from page['features']
 
-def simplify_geometry(geometry, tolerance=0.005, min_area=0.001):
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+def simplify_geometry(geometry, tolerance=SIMPLIFY_TOLERANCE, min_area=MIN_POLYGON_AREA, cache=None):
     """
     Use Shapely for proper topology-preserving simplification.
 
@@ -165,6 +356,7 @@ def simplify_geometry(geometry, tolerance=0.005, min_area=0.001):
         geometry: GeoJSON geometry dict
         tolerance: Simplification tolerance in degrees (~0.005 = ~500m)
         min_area: Minimum polygon area in square degrees to keep (~0.0001 = ~1 sq km)
+        cache: Optional GeometryCache; results are looked up by raw geometry and parameters
 
     Returns:
         Simplified GeoJSON geometry dict, or None if invalid
@@ -172,6 +364,20 @@ def simplify_geometry(geometry, tolerance=0.005, min_area=0.001):
     if geometry is None:
         return None
 
+    if cache is None:
+        return repair_and_simplify(geometry, tolerance, min_area)
+
+    key = cache.key(geometry, tolerance=tolerance, min_area=min_area)
+    result = cache.get(key)
+    if result is MISS:
+        result = repair_and_simplify(geometry, tolerance, min_area)
+        # Failures fall back to the original geometry; don't cache those
+        if result is not geometry:
+            cache.put(key, result)
+    return result
+
+def repair_and_simplify(geometry, tolerance, min_area):
+    """make_valid + simplify + small-polygon filter behind simplify_geometry."""
     try:
         from shapely.geometry import MultiPolygon, Polygon
 
@@ -192,8 +398,9 @@ def simplify_geometry(geometry, tolerance=0.005, min_area=0.001):
 
         # Filter out tiny polygons from MultiPolygon
         if simplified.geom_type == 'MultiPolygon':
-            # Keep only polygons with area >= min_area
-            large_polys = [p for p in simplified.geoms if p.area >= min_area]
+            # Keep only polygons with area >= min_area (one vectorized area call for all parts)
+            parts = shapely.get_parts(simplified)
+            large_polys = list(parts[shapely.area(parts) >= min_area])
             if not large_polys:
                 print(f"  Warning: All polygons filtered out (too small)")
                 return None
@@ -222,13 +429,13 @@ def simplify_geometry(geometry, tolerance=0.005, min_area=0.001):
         print(f"  Warning: Could not simplify geometry: {e}")
         return geometry  # Return original if simplification fails
 
-def match_utility(feature, tariff_name):
+def match_utility(feature, tariff_name, apply_state_filter=True):
     """Check if a HIFLD feature matches a tariff utility."""
     hifld_name = feature['properties'].get('NAME', '').upper()
     hifld_state = feature['properties'].get('STATE', '')
 
     patterns = UTILITY_NAME_MAPPING.get(tariff_name, [])
-    state_filter = STATE_FILTERS.get(tariff_name)
+    state_filter = STATE_FILTERS.get(tariff_name) if apply_state_filter else None
 
     for pattern in patterns:
         if pattern.upper() in hifld_name:
@@ -239,90 +446,330 @@ def match_utility(feature, tariff_name):
 
     return False
 
-def calculate_area(geometry):
-    """Approximate area calculation for sorting (not geodetically accurate, but good enough for ordering)."""
-    def get_bounds(coords):
-        min_lon, max_lon = float('inf'), float('-inf')
-        min_lat, max_lat = float('inf'), float('-inf')
+def process_feature(feature, cache=None, simplify=True):
+    """
+    Tag a feature with its tariff utility and simplify its geometry.
 
-        if isinstance(coords[0], (int, float)):
-            return coords[0], coords[0], coords[1], coords[1]
+    cache is an optional GeometryCache passed through to simplify_geometry.
+    With simplify=False the raw geometry is kept for budget simplification.
 
-        for c in coords:
-            c_min_lon, c_max_lon, c_min_lat, c_max_lat = get_bounds(c)
-            min_lon = min(min_lon, c_min_lon)
-            max_lon = max(max_lon, c_max_lon)
-            min_lat = min(min_lat, c_min_lat)
-            max_lat = max(max_lat, c_max_lat)
+    Returns:
+        (feature, tariff_name), or (None, None) if no tariff utility matches
+    """
+    for tariff_name in UTILITY_NAME_MAPPING.keys():
+        if match_utility(feature, tariff_name):
+            # Add tariff_name to properties
+            feature['properties']['tariff_utility'] = tariff_name
 
-        return min_lon, max_lon, min_lat, max_lat
+            # Simplify geometry
+            if simplify:
+                with step('simplify'):
+                    feature['geometry'] = simplify_geometry(feature['geometry'], cache=cache)
+            return feature, tariff_name
 
-    min_lon, max_lon, min_lat, max_lat = get_bounds(geometry['coordinates'])
-    return (max_lon - min_lon) * (max_lat - min_lat)
+    return None, None
 
-def process_features(features):
+def process_features(features, cache=None):
     """Process and tag features with tariff IDs."""
     processed = []
     matched_tariffs = set()
 
     for feature in features:
-        hifld_name = feature['properties'].get('NAME', '').upper()
+        feature, tariff_name = process_feature(feature, cache)
+        if feature is not None:
+            processed.append(feature)
+            matched_tariffs.add(tariff_name)
+
+    # Sort by area (largest first) so smaller utilities render on top
+    compute_extents(processed)
+    processed.sort(key=feature_area, reverse=True)
 
-        # Find matching tariff utility
-        for tariff_name in UTILITY_NAME_MAPPING.keys():
-            if match_utility(feature, tariff_name):
-                # Add tariff_name to properties
-                feature['properties']['tariff_utility'] = tariff_name
+    return processed, matched_tariffs
 
-                # Simplify geometry
-                feature['geometry'] = simplify_geometry(feature['geometry'])
+class TerritoryStore:
+    """
+    Local store of processed territory features keyed by HIFLD ID.
 
-                processed.append(feature)
-                matched_tariffs.add(tariff_name)
-                break
+    Features keep their NAME, STATE and EDIT_DATE_FIELD attributes, so an
+    incremental run can compare them against an attribute-only listing and
+    only fetch geometry for records that changed.
+    """
 
-    # Sort by area (largest first) so smaller utilities render on top
-    processed.sort(key=lambda f: calculate_area(f['geometry']), reverse=True)
+    def __init__(self, path):
+        self.path = Path(path)
+        self.features = {}
+
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            self.features = data.get('features', {})
+
+    def exists(self):
+        return self.path.exists()
+
+    def upsert(self, feature):
+        """Add or replace a processed feature."""
+        self.features[str(feature['properties'].get('ID'))] = feature
+
+    def replace_all(self, features):
+        self.features = {}
+        for feature in features:
+            self.upsert(feature)
+
+    def retag(self):
+        """
+        Re-apply match_utility to stored features without touching geometry.
+
+        Drops features whose mapping entry was removed and returns the
+        matched tariff names.
+        """
+        matched = set()
+        for key, feature in list(self.features.items()):
+            for tariff_name in UTILITY_NAME_MAPPING.keys():
+                if match_utility(feature, tariff_name):
+                    feature['properties']['tariff_utility'] = tariff_name
+                    matched.add(tariff_name)
+                    break
+            else:
+                del self.features[key]
+        return matched
 
-    return processed, matched_tariffs
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'features': self.features}, f)
+        os.replace(tmp_path, self.path)
+
+def sql_quote(value):
+    """Quote a string literal for an ArcGIS WHERE clause."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def refresh_incremental(store, cache=None):
+    """
+    Reconcile the store with HIFLD, fetching geometry only for changed records.
+
+    1. One attribute-only pass over the mapping's WHERE clauses lists every
+       record that currently belongs to a mapped utility (match_utility,
+       including state filters), with its name, state and edit date
+    2. Stored records missing from that list were deleted upstream or moved
+       to an unmapped utility, and are dropped
+    3. New records, and records whose edit date, name or state differ from the
+       stored copy, are fetched with geometry, 100 IDs per query
+
+    Returns:
+        (fetched, dropped) feature counts
+    """
+    upstream = {}
+    for where_clause in build_where_clauses(batch_size=15):
+        for feature in query_hifld_all(where_clause, return_geometry=False):
+            if any(match_utility(feature, tariff_name) for tariff_name in UTILITY_NAME_MAPPING.keys()):
+                upstream[str(feature['properties'].get('ID'))] = feature['properties']
+    print(f"  {len(upstream)} HIFLD records belong to mapped utilities")
+
+    stale = [key for key in store.features if key not in upstream]
+    for key in stale:
+        props = store.features.pop(key)['properties']
+        print(f"  Dropped {props.get('NAME')} ({props.get('STATE')}, ID {key})")
+
+    def changed(key, props):
+        stored = store.features.get(key)
+        return stored is None or any(stored['properties'].get(field) != props.get(field)
+                                     for field in ('NAME', 'STATE', EDIT_DATE_FIELD))
+
+    changed_ids = [key for key, props in upstream.items() if changed(key, props)]
+    print(f"  {len(changed_ids)} new or edited records")
+
+    fetched = 0
+    for i in range(0, len(changed_ids), 100):
+        where = f"ID IN ({', '.join(sql_quote(x) for x in changed_ids[i:i + 100])})"
+        for feature in query_hifld_all(where):
+            feature, tariff_name = process_feature(feature, cache)
+            if feature is not None:
+                store.upsert(feature)
+                fetched += 1
+                print(f"  Updated {feature['properties'].get('NAME')} -> {tariff_name}")
+        if cache is not None:
+            cache.commit()
+
+    return fetched, len(stale)
+
+def vertex_budget(args):
+    """Total vertex budget from --vertex-budget / --size-budget-mb, or None."""
+    if args.vertex_budget:
+        return args.vertex_budget
+    if args.size_budget_mb:
+        from adaptive_simplify import bytes_to_vertices
+        return bytes_to_vertices(args.size_budget_mb * 1024 * 1024)
+    return None
+
+def feature_vertex_cap(args):
+    """Per-feature vertex cap from --max-feature-vertices / --max-feature-kb, or None."""
+    if args.max_feature_kb:
+        from adaptive_simplify import MIN_FEATURE_VERTICES, bytes_to_vertices
+        return max(bytes_to_vertices(args.max_feature_kb * 1024), MIN_FEATURE_VERTICES)
+    return args.max_feature_vertices
+
+def download_all(args, cache=None):
+    """Full national download through the resumable checkpoint; returns the checkpoint."""
+    # Budget simplification needs every raw geometry, so it runs after the download
+    budget = vertex_budget(args)
 
-def main():
     # Build queries in batches
     where_clauses = build_where_clauses(batch_size=15)
     print(f"Split into {len(where_clauses)} query batches")
 
-    # Query all matching features
-    all_features = []
+    settings = {
+        'vertex_budget': budget,
+        'tolerance': None if budget else SIMPLIFY_TOLERANCE,
+        'min_area': None if budget else MIN_POLYGON_AREA,
+    }
+    checkpoint = DownloadCheckpoint(CHECKPOINT_FILE, where_clauses, settings, restart=args.restart)
+    if checkpoint.completed:
+        print(f"Resuming from checkpoint: {len(checkpoint.completed)} pages already done")
+
+    # Stream each page straight into matching and simplification
+    total_retrieved = 0
+    complete = True
 
     for batch_idx, where_clause in enumerate(where_clauses):
         print(f"\nBatch {batch_idx + 1}/{len(where_clauses)} (clause length: {len(where_clause)} chars)")
         offset = 0
 
         while True:
-            try:
-                result = query_hifld(where_clause, offset)
-                features = result.get('features', [])
-
-                if not features:
+            if checkpoint.is_done(batch_idx, offset):
+                retrieved = checkpoint.retrieved(batch_idx, offset)
+                print(f"  Skipping offset={offset} (checkpointed, {retrieved} features)")
+            else:
+                try:
+                    retrieved = 0
+                    page_features = []
+                    for feature in query_hifld(where_clause, offset):
+                        retrieved += 1
+                        feature, _ = process_feature(feature, cache, simplify=budget is None)
+                        if feature is not None:
+                            page_features.append(feature)
+                except Exception as e:
+                    print(f"  Error: {e}")
+                    complete = False
                     break
 
-                all_features.extend(features)
-                print(f"  Retrieved {len(features)} features, total: {len(all_features)}")
-
-                if len(features) < 1000:
-                    break
+                checkpoint.record(batch_idx, offset, retrieved, page_features)
+                if cache is not None:
+                    cache.commit()
+                print(f"  Retrieved {retrieved} features, matched {len(page_features)}")
 
-                offset += 1000
-            except Exception as e:
-                print(f"  Error: {e}")
+            total_retrieved += retrieved
+            if retrieved < 1000:
                 break
 
-    print(f"\nTotal features retrieved: {len(all_features)}")
+            offset += 1000
 
-    # Process and tag features
-    processed, matched = process_features(all_features)
+    print(f"\nTotal features retrieved: {total_retrieved}")
+
+    if not complete:
+        print(f"\nDownload incomplete - rerun to resume from {CHECKPOINT_FILE}")
+        sys.exit(1)
+
+    return checkpoint
+
+def main():
+    parser = argparse.ArgumentParser(description='Download and process HIFLD utility territories')
+    parser.add_argument('--binary', action='store_true',
+                        help='Also write a quantized .geobin copy (see encode_geo_binary.py)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore any download checkpoint and start from the first page')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reconcile the territory store with HIFLD, fetching only new or edited records')
+    parser.add_argument('--clip-states', action='store_true',
+                        help='Clip territories to each tariff\'s states (see clip_territories_by_state.py)')
+    parser.add_argument('--no-geometry-cache', action='store_true',
+                        help='Repair and simplify every geometry instead of using the geometry cache')
+    parser.add_argument('--geometry-cache-mb', type=int, default=256,
+                        help='Size limit of the geometry cache in MB (least recently used entries are evicted)')
+    parser.add_argument('--vertex-budget', type=int, default=None,
+                        help='Simplify to a total vertex budget instead of one tolerance (see adaptive_simplify.py)')
+    parser.add_argument('--size-budget-mb', type=float, default=None,
+                        help='Like --vertex-budget, as an approximate output size in MB')
+    parser.add_argument('--max-feature-vertices', type=int, default=None,
+                        help='With a budget, cap the vertices of any single feature')
+    parser.add_argument('--max-feature-kb', type=float, default=None,
+                        help='Like --max-feature-vertices, as an approximate size in KB')
+    parser.add_argument('--min-area-km2', type=float, default=0,
+                        help='Drop territories smaller than this equal-area size')
+    parser.add_argument('--name-mapping', default=None,
+                        help='Apply approved entries from a resolve_utility_names.py review file')
+    args = parser.parse_args()
+
+    if args.name_mapping:
+        from resolve_utility_names import load_name_mapping
+        approved = load_name_mapping(args.name_mapping)
+        UTILITY_NAME_MAPPING.update(approved)
+        print(f"Applied {len(approved)} approved name mappings from {args.name_mapping}")
+
+    budget = vertex_budget(args)
+    if budget is not None and args.incremental:
+        parser.error('budget simplification needs a full download; drop --incremental')
+    if args.max_feature_vertices and args.max_feature_kb:
+        parser.error('use only one of --max-feature-vertices and --max-feature-kb')
+
+    store = TerritoryStore(STORE_FILE)
+    checkpoint = None
+    cache = None if args.no_geometry_cache else GeometryCache(max_bytes=args.geometry_cache_mb * 1024 * 1024)
+
+    try:
+        if args.incremental and store.exists():
+            print(f"Incremental refresh from {STORE_FILE} ({len(store.features)} stored features)")
+            with stage('download'):
+                fetched, dropped = refresh_incremental(store, cache)
+            print(f"Fetched and processed {fetched} features, dropped {dropped} stale features")
+        else:
+            if args.incremental:
+                print("No territory store yet, running a full download")
+            with stage('download'):
+                checkpoint = download_all(args, cache)
+            # Features are streamed back out of the checkpoint, never all loaded raw
+            features = checkpoint.iter_features()
+            if budget is not None:
+                from adaptive_simplify import simplify_stream_to_budget
+                with stage('budget_simplify'):
+                    features, stats = simplify_stream_to_budget(features, budget, feature_vertex_cap(args))
+                features = [f for f in features if f.get('geometry')]
+                print(f"Budget simplification: {stats['vertices_in']:,} -> {stats['vertices_out']:,} vertices "
+                      f"(budget {budget:,})")
+            store.replace_all(features)
+    finally:
+        if cache is not None:
+            print(cache.report())
+            cache.close()
+
+    with stage('retag'):
+        matched = store.retag()
+        store.save()
+
+    # Output keeps the web app's properties only
+    processed = []
+    for feature in store.features.values():
+        props = {k: v for k, v in feature['properties'].items() if k != EDIT_DATE_FIELD}
+        processed.append({**feature, 'properties': props})
+
+    # Bounding boxes and equal-area sizes, computed once and cached on each feature
+    with stage('extents'):
+        compute_extents(processed)
+    if args.min_area_km2:
+        dropped = [f for f in processed if feature_area(f) < args.min_area_km2]
+        processed = [f for f in processed if feature_area(f) >= args.min_area_km2]
+        for f in dropped:
+            print(f"  Dropped {f['properties'].get('NAME')} ({feature_area(f):.1f} km2 < {args.min_area_km2} km2)")
+
+    # Sort by area (largest first) so smaller utilities render on top
+    processed.sort(key=feature_area, reverse=True)
 
     print(f"Processed features: {len(processed)}")
+    if processed:
+        print(f"Total area: {sum(map(feature_area, processed)):,.0f} km2 "
+              f"(largest {processed[0]['properties'].get('NAME')}: {feature_area(processed[0]):,.0f} km2, "
+              f"smallest {processed[-1]['properties'].get('NAME')}: {feature_area(processed[-1]):,.1f} km2)")
     print(f"Matched tariff utilities: {len(matched)}")
 
     # Report unmatched utilities
@@ -343,15 +790,32 @@ def main():
         }
     }
 
-    # Write output
+    if args.clip_states:
+        from clip_territories_by_state import clip_to_tariff_states
+        with stage('clip'):
+            clip_to_tariff_states(output)
+        print(f"Clipped to {len(output['features'])} (tariff, state) parts")
+
+    # Write output (the extents were only needed for filtering and sorting)
+    strip_extents(output['features'])
     output_path = Path(__file__).parent.parent / 'nextjs-app' / 'public' / 'geojson' / 'utility_territories.geojson'
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(output_path, 'w') as f:
+    with stage('write'), open(output_path, 'w') as f:
         json.dump(output, f)
 
     print(f"\nOutput written to: {output_path}")
     print(f"File size: {output_path.stat().st_size / 1024 / 1024:.2f} MB")
 
+    if args.binary:
+        from encode_geo_binary import write_binary_layer
+        with stage('write_binary'):
+            binary_path = write_binary_layer(output, output_path)
+        print(f"Binary layer written to: {binary_path}")
+        print(f"Binary size: {binary_path.stat().st_size / 1024 / 1024:.2f} MB")
+
+    if checkpoint is not None:
+        checkpoint.clear()
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Encode GeoJSON map layers into a compact quantized binary format (.geobin).
+
+Text GeoJSON spends 8-10 bytes per ordinate even after rounding to 4 decimal
+places, plus JSON punctuation and property keys repeated on every feature.
+This encoder:
+1. Quantizes coordinates to integers (1e-4 degrees by default, matching round_coords)
+2. Delta-encodes each ring/line against the previous vertex, as zigzag varints
+3. Drops the closing vertex of polygon rings (the decoder re-closes them)
+4. Stores property keys and values once in dictionary tables
+
+The matching decoder for the web app is nextjs-app/lib/geoBinary.ts. After
+encoding, the layer manifest (geo_layers.write_manifest) is rewritten; the web
+app only fetches the .geobin files it lists.
+
+Layout (all integers are unsigned LEB128 varints unless noted):
+    magic 'CEGB', version (u8), precision (u8)
+    metadata:   len + UTF-8 JSON of the FeatureCollection's non-feature members
+    keys:       count, then len + UTF-8 per key
+    values:     count, then tag (u8) + payload per value
+                (0 null, 1 false, 2 true, 3 zigzag int, 4 float64 LE, 5 string, 6 JSON)
+    features:   count, then per feature:
+                geometry type (u8), property count, (key index, value index) pairs,
+                geometry payload
+
+Usage:
+    python scripts/encode_geo_binary.py                      # every layer in public/geojson
+    python scripts/encode_geo_binary.py utility_territories  # selected layers
+    python scripts/encode_geo_binary.py clusters/data_centers_z3.geojson
+    python scripts/encode_geo_binary.py --verify ...         # round-trip check
+"""
+
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+
+from geo_layers import GEOJSON_DIR, layer_path, refresh_manifest, write_manifest
+
+MAGIC = b'CEGB'
+VERSION = 1
+
+GEOMETRY_TYPES = {
+    None: 0,
+    'Point': 1,
+    'MultiPoint': 2,
+    'LineString': 3,
+    'MultiLineString': 4,
+    'Polygon': 5,
+    'MultiPolygon': 6,
+}
+GEOMETRY_NAMES = {code: name for name, code in GEOMETRY_TYPES.items()}
+
+TAG_NULL, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_FLOAT, TAG_STRING, TAG_JSON = range(7)
+
+
+def zigzag(n):
+    """Map a signed int onto an unsigned one (0, -1, 1, -2 -> 0, 1, 2, 3)."""
+    return (n << 1) if n >= 0 else ((-n << 1) - 1)
+
+
+def unzigzag(n):
+    """Inverse of zigzag()."""
+    return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+
+
+def write_varint(buf, n):
+    """Append an unsigned LEB128 varint to a bytearray."""
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def write_bytes(buf, data):
+    """Append a length-prefixed byte string."""
+    write_varint(buf, len(data))
+    buf.extend(data)
+
+
+class _Encoder:
+    """Stateful writer: dictionary tables plus the running delta cursor."""
+
+    def __init__(self, precision):
+        self.scale = 10 ** precision
+        self.keys = {}
+        self.values = {}
+        self.body = bytearray()
+        self.x = 0
+        self.y = 0
+
+    def key_index(self, key):
+        return self.keys.setdefault(key, len(self.keys))
+
+    def value_index(self, value):
+        # bool is a subclass of int, so include the type in the dictionary key
+        if isinstance(value, (dict, list)):
+            ident = ('json', json.dumps(value, sort_keys=True, separators=(',', ':')))
+        else:
+            ident = (type(value).__name__, value)
+        return self.values.setdefault(ident, len(self.values))
+
+    def write_point(self, coord):
+        x = round(coord[0] * self.scale)
+        y = round(coord[1] * self.scale)
+        write_varint(self.body, zigzag(x - self.x))
+        write_varint(self.body, zigzag(y - self.y))
+        self.x, self.y = x, y
+
+    def write_line(self, coords, closed=False):
+        if closed and len(coords) > 1 and coords[0] == coords[-1]:
+            coords = coords[:-1]
+        write_varint(self.body, len(coords))
+        for coord in coords:
+            self.write_point(coord)
+
+    def write_polygon(self, rings):
+        write_varint(self.body, len(rings))
+        for ring in rings:
+            self.write_line(ring, closed=True)
+
+    def write_geometry(self, geometry):
+        if geometry is None:
+            return
+        kind = geometry['type']
+        coords = geometry['coordinates']
+        if kind == 'Point':
+            self.write_point(coords)
+        elif kind in ('MultiPoint', 'LineString'):
+            self.write_line(coords)
+        elif kind == 'MultiLineString':
+            write_varint(self.body, len(coords))
+            for line in coords:
+                self.write_line(line)
+        elif kind == 'Polygon':
+            self.write_polygon(coords)
+        elif kind == 'MultiPolygon':
+            write_varint(self.body, len(coords))
+            for polygon in coords:
+                self.write_polygon(polygon)
+
+    def write_feature(self, feature):
+        geometry = feature.get('geometry')
+        kind = geometry['type'] if geometry else None
+        if kind not in GEOMETRY_TYPES:
+            raise ValueError(f"Unsupported geometry type: {kind}")
+        self.body.append(GEOMETRY_TYPES[kind])
+
+        properties = feature.get('properties') or {}
+        write_varint(self.body, len(properties))
+        for key, value in properties.items():
+            write_varint(self.body, self.key_index(key))
+            write_varint(self.body, self.value_index(value))
+
+        self.write_geometry(geometry)
+
+    def value_table(self):
+        buf = bytearray()
+        write_varint(buf, len(self.values))
+        for kind, value in self.values:
+            if kind == 'NoneType':
+                buf.append(TAG_NULL)
+            elif kind == 'bool':
+                buf.append(TAG_TRUE if value else TAG_FALSE)
+            elif kind == 'int':
+                buf.append(TAG_INT)
+                write_varint(buf, zigzag(value))
+            elif kind == 'float':
+                buf.append(TAG_FLOAT)
+                buf.extend(struct.pack('<d', value))
+            elif kind == 'str':
+                buf.append(TAG_STRING)
+                write_bytes(buf, value.encode('utf-8'))
+            else:
+                buf.append(TAG_JSON)
+                write_bytes(buf, value.encode('utf-8'))
+        return buf
+
+
+def encode_feature_collection(collection, precision=4):
+    """
+    Encode a GeoJSON FeatureCollection dict to .geobin bytes.
+
+    Args:
+        collection: GeoJSON FeatureCollection dict
+        precision: Decimal places kept when quantizing coordinates
+
+    Returns:
+        Encoded bytes
+    """
+    encoder = _Encoder(precision)
+    features = collection.get('features', [])
+    for feature in features:
+        encoder.write_feature(feature)
+
+    metadata = {k: v for k, v in collection.items() if k not in ('type', 'features')}
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    out.append(precision)
+    write_bytes(out, json.dumps(metadata, separators=(',', ':')).encode('utf-8') if metadata else b'')
+
+    write_varint(out, len(encoder.keys))
+    for key in encoder.keys:
+        write_bytes(out, key.encode('utf-8'))
+
+    out.extend(encoder.value_table())
+    write_varint(out, len(features))
+    out.extend(encoder.body)
+    return bytes(out)
+
+
+def decode_feature_collection(data):
+    """Decode .geobin bytes back into a GeoJSON FeatureCollection dict."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a .geobin file (bad magic)")
+    if data[4] != VERSION:
+        raise ValueError(f"Unsupported .geobin version: {data[4]}")
+    scale = 10 ** data[5]
+    pos = 6
+
+    def varint():
+        nonlocal pos
+        result = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def text():
+        nonlocal pos
+        n = varint()
+        value = data[pos:pos + n].decode('utf-8')
+        pos += n
+        return value
+
+    meta_json = text()
+    collection = {'type': 'FeatureCollection', 'features': []}
+    if meta_json:
+        collection.update(json.loads(meta_json))
+
+    keys = [text() for _ in range(varint())]
+
+    values = []
+    for _ in range(varint()):
+        tag = data[pos]
+        pos += 1
+        if tag == TAG_NULL:
+            values.append(None)
+        elif tag in (TAG_FALSE, TAG_TRUE):
+            values.append(tag == TAG_TRUE)
+        elif tag == TAG_INT:
+            values.append(unzigzag(varint()))
+        elif tag == TAG_FLOAT:
+            values.append(struct.unpack_from('<d', data, pos)[0])
+            pos += 8
+        elif tag == TAG_STRING:
+            values.append(text())
+        else:
+            values.append(json.loads(text()))
+
+    x = y = 0
+
+    def point():
+        nonlocal x, y
+        x += unzigzag(varint())
+        y += unzigzag(varint())
+        return [x / scale, y / scale]
+
+    def line(closed=False):
+        coords = [point() for _ in range(varint())]
+        if closed and coords:
+            coords.append(list(coords[0]))
+        return coords
+
+    def polygon():
+        return [line(closed=True) for _ in range(varint())]
+
+    for _ in range(varint()):
+        kind = GEOMETRY_NAMES[data[pos]]
+        pos += 1
+        properties = {}
+        for _ in range(varint()):
+            key = keys[varint()]
+            properties[key] = values[varint()]
+
+        if kind is None:
+            geometry = None
+        elif kind == 'Point':
+            geometry = {'type': kind, 'coordinates': point()}
+        elif kind in ('MultiPoint', 'LineString'):
+            geometry = {'type': kind, 'coordinates': line()}
+        elif kind == 'MultiLineString':
+            geometry = {'type': kind, 'coordinates': [line() for _ in range(varint())]}
+        elif kind == 'Polygon':
+            geometry = {'type': kind, 'coordinates': polygon()}
+        else:
+            geometry = {'type': kind, 'coordinates': [polygon() for _ in range(varint())]}
+
+        collection['features'].append({'type': 'Feature', 'properties': properties, 'geometry': geometry})
+
+    return collection
+
+
+def write_binary_layer(collection, path, precision=4):
+    """Encode a FeatureCollection and write it next to its GeoJSON source."""
+    data = encode_feature_collection(collection, precision)
+    path = Path(path).with_suffix('.geobin')
+    path.write_bytes(data)
+    refresh_manifest()
+    return path
+
+
+def verify_round_trip(collection, data, precision=4):
+    """Check that decoding reproduces the input to within the quantization step."""
+    decoded = decode_feature_collection(data)
+    tolerance = 0.5 / 10 ** precision + 1e-12
+
+    def same_coords(a, b):
+        if isinstance(a[0], (int, float)):
+            return abs(a[0] - b[0]) <= tolerance and abs(a[1] - b[1]) <= tolerance
+        return len(a) == len(b) and all(same_coords(p, q) for p, q in zip(a, b))
+
+    original = collection.get('features', [])
+    if len(original) != len(decoded['features']):
+        return False
+    for src, dst in zip(original, decoded['features']):
+        if (src.get('properties') or {}) != dst['properties']:
+            return False
+        if src.get('geometry') is None or dst['geometry'] is None:
+            if src.get('geometry') != dst['geometry']:
+                return False
+            continue
+        coords = src['geometry']['coordinates']
+        if src['geometry']['type'] == 'Polygon':
+            coords = [r if r[0] == r[-1] else r + [r[0]] for r in coords]
+        elif src['geometry']['type'] == 'MultiPolygon':
+            coords = [[r if r[0] == r[-1] else r + [r[0]] for r in p] for p in coords]
+        if not same_coords(coords, dst['geometry']['coordinates']):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('layers', nargs='*', help='Layer names in public/geojson (default: all)')
+    parser.add_argument('--precision', type=int, default=4, help='Decimal places to keep (default: 4)')
+    parser.add_argument('--verify', action='store_true', help='Decode each output and compare')
+    args = parser.parse_args()
+
+    paths = [layer_path(name) for name in args.layers] or sorted(GEOJSON_DIR.glob('*.geojson'))
+
+    total_in = total_out = 0
+    for path in paths:
+        with open(path) as f:
+            collection = json.load(f)
+        out_path = write_binary_layer(collection, path, args.precision)
+
+        size_in = path.stat().st_size
+        size_out = out_path.stat().st_size
+        total_in += size_in
+        total_out += size_out
+        print(f"{path.name}: {size_in / 1024:.1f} KB -> {out_path.name}: {size_out / 1024:.1f} KB "
+              f"({size_in / size_out:.1f}x)")
+
+        if args.verify and not verify_round_trip(collection, out_path.read_bytes(), args.precision):
+            print(f"  Error: round trip mismatch for {path.name}", file=sys.stderr)
+            sys.exit(1)
+
+    if total_out:
+        print(f"\nTotal: {total_in / 1024:.1f} KB -> {total_out / 1024:.1f} KB ({total_in / total_out:.1f}x)")
+    print(f"Manifest written to: {write_manifest()}")
+
+
+if __name__ == '__main__':
+    main()
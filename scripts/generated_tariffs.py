@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Read GENERATED_TARIFFS back out of nextjs-app/lib/generatedTariffData.ts.
+
+The geo stages need the tariff records (id, utility, iso_rto, ...) that the web
+app sees, and the TypeScript file written by migrate_tariff_excel_to_ts.py is
+the only copy kept in the repo. Its object literals are regular enough to be
+rewritten into JSON and parsed directly.
+"""
+
+import json
+import re
+from pathlib import Path
+
+GENERATED_TS_FILE = Path(__file__).parent.parent / 'nextjs-app' / 'lib' / 'generatedTariffData.ts'
+
+ARRAY_START = 'export const GENERATED_TARIFFS: EnrichedTariff[] = ['
+
+_TOKEN = re.compile(r"""
+    '(?P<str>(?:[^'\\]|\\.)*)'      # single-quoted string
+  | (?P<key>[A-Za-z_]\w*)\s*:       # object key
+  | (?P<undef>\bundefined\b)
+  | ,(?P<trail>\s*[}\]])            # trailing comma
+""", re.VERBOSE)
+
+
+def _ts_string_to_json(raw):
+    value = raw.replace("\\'", "'").replace('\\n', '\n').replace('\\\\', '\\')
+    return json.dumps(value)
+
+
+def _ts_literal_to_json(text):
+    def replace(match):
+        if match.group('str') is not None:
+            return _ts_string_to_json(match.group('str'))
+        if match.group('key') is not None:
+            return f'"{match.group("key")}":'
+        if match.group('undef') is not None:
+            return 'null'
+        return match.group('trail')
+    return _TOKEN.sub(replace, text)
+
+
+def load_generated_tariffs(path=GENERATED_TS_FILE):
+    """
+    Parse the GENERATED_TARIFFS array into a list of tariff dicts.
+
+    Returns:
+        List of dicts in file order (sorted by blended rate)
+    """
+    text = Path(path).read_text()
+    start = text.index(ARRAY_START) + len(ARRAY_START) - 1
+    end = text.index('\n];', start) + 2
+    return json.loads(_ts_literal_to_json(text[start:end]))
+
+
+def tariffs_by_utility(tariffs=None):
+    """Index tariffs by utility name (the tariff_utility tag on territories)."""
+    if tariffs is None:
+        tariffs = load_generated_tariffs()
+    return {t['utility']: t for t in tariffs}
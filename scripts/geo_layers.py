@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the map layers in nextjs-app/public/geojson.
+
+The geo build scripts all read from and write to the same directory, so the
+paths, the (compact) JSON serialization settings, the layer manifest, the
+planar projection used for distances and areas, and the cached per-feature
+extents live here.
+
+The manifest (manifest.json, written by encode_geo_binary.py) lists every
+layer with the sizes of its .geojson and, when one is current, its .geobin.
+The web app fetches a .geobin only when the manifest lists it. write_layer()
+deletes a layer's .geobin and refreshes the manifest, so a binary encoded
+before the GeoJSON was rewritten is never served.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+# Directory served by the Next.js app
+GEOJSON_DIR = Path(__file__).parent.parent / 'nextjs-app' / 'public' / 'geojson'
+MANIFEST_FILE = GEOJSON_DIR / 'manifest.json'
+
+# Spherical Albers equal-area conic with the CONUS parameters of EPSG:5070.
+# Areas are exact (on the sphere) and distances are within ~1-2% across the lower 48.
+EARTH_RADIUS_KM = 6371.0088
+ALBERS_LAT_1 = 29.5
+ALBERS_LAT_2 = 45.5
+ALBERS_LAT_0 = 23.0
+ALBERS_LON_0 = -96.0
+
+
+def layer_path(name):
+    """Return the path of a layer in GEOJSON_DIR (name with or without extension, e.g. clusters/x_z3)."""
+    path = Path(name)
+    if path.suffix:
+        return GEOJSON_DIR / path
+    return GEOJSON_DIR / f'{name}.geojson'
+
+
+def read_layer(name):
+    """Load a GeoJSON FeatureCollection from GEOJSON_DIR."""
+    with open(layer_path(name)) as f:
+        return json.load(f)
+
+
+def write_layer(name, collection):
+    """Write a GeoJSON FeatureCollection to GEOJSON_DIR and return the path."""
+    path = layer_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(collection, f, separators=(',', ':'))
+    path.with_suffix('.geobin').unlink(missing_ok=True)
+    refresh_manifest()
+    return path
+
+
+def scan_layers():
+    """
+    Every layer in GEOJSON_DIR with its file sizes.
+
+    Returns:
+        Dict of layer name (path below GEOJSON_DIR without .geojson) ->
+        {'geojson': bytes, 'geobin': bytes}; 'geobin' only for binaries at
+        least as new as their GeoJSON
+    """
+    layers = {}
+    for path in sorted(GEOJSON_DIR.rglob('*.geojson')):
+        name = path.relative_to(GEOJSON_DIR).as_posix()[:-len('.geojson')]
+        stat = path.stat()
+        entry = {'geojson': stat.st_size}
+        binary = path.with_suffix('.geobin')
+        if binary.exists() and binary.stat().st_mtime >= stat.st_mtime:
+            entry['geobin'] = binary.stat().st_size
+        layers[name] = entry
+    return layers
+
+
+def write_manifest():
+    """Write MANIFEST_FILE from the layers currently in GEOJSON_DIR and return its path."""
+    GEOJSON_DIR.mkdir(parents=True, exist_ok=True)
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump({'layers': scan_layers()}, f, indent=1)
+    return MANIFEST_FILE
+
+
+def refresh_manifest():
+    """Rewrite the manifest after a layer changed, if there is one (the build creates it)."""
+    if MANIFEST_FILE.exists():
+        write_manifest()
+
+
+def project_albers(lon, lat):
+    """
+    Project lon/lat degrees to Albers equal-area x/y in kilometres.
+
+    Args:
+        lon, lat: Scalars or arrays of degrees
+
+    Returns:
+        (x, y) arrays in km
+    """
+    phi1, phi2, phi0 = np.radians([ALBERS_LAT_1, ALBERS_LAT_2, ALBERS_LAT_0])
+    n = (np.sin(phi1) + np.sin(phi2)) / 2
+    c = np.cos(phi1) ** 2 + 2 * n * np.sin(phi1)
+    rho0 = EARTH_RADIUS_KM * np.sqrt(c - 2 * n * np.sin(phi0)) / n
+
+    rho = EARTH_RADIUS_KM * np.sqrt(c - 2 * n * np.sin(np.radians(lat))) / n
+    theta = n * np.radians(np.asarray(lon) - ALBERS_LON_0)
+    return rho * np.sin(theta), rho0 - rho * np.cos(theta)
+
+
+def unproject_albers(x, y):
+    """Inverse of project_albers: Albers x/y in km to (lon, lat) degrees."""
+    phi1, phi2, phi0 = np.radians([ALBERS_LAT_1, ALBERS_LAT_2, ALBERS_LAT_0])
+    n = (np.sin(phi1) + np.sin(phi2)) / 2
+    c = np.cos(phi1) ** 2 + 2 * n * np.sin(phi1)
+    rho0 = EARTH_RADIUS_KM * np.sqrt(c - 2 * n * np.sin(phi0)) / n
+
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    rho = np.hypot(x, rho0 - y)
+    theta = np.arctan2(x, rho0 - y)
+    lat = np.degrees(np.arcsin((c - (rho * n / EARTH_RADIUS_KM) ** 2) / (2 * n)))
+    return ALBERS_LON_0 + np.degrees(theta / n), lat
+
+
+def albers_coords(coords):
+    """Vectorized coordinate transform for shapely.transform (N x 2 lon/lat -> km)."""
+    x, y = project_albers(coords[:, 0], coords[:, 1])
+    return np.column_stack([x, y])
+
+
+# GeoJSON types read as their multi-part form, so each kind is one from_ragged_array call
+# (bounds and areas are the same for a one-part multi geometry)
+MULTI_TYPES = {
+    'Point': 'MultiPoint', 'MultiPoint': 'MultiPoint',
+    'LineString': 'MultiLineString', 'MultiLineString': 'MultiLineString',
+    'Polygon': 'MultiPolygon', 'MultiPolygon': 'MultiPolygon',
+}
+# Nesting depth below the geometry's coordinates of one part (point, line, polygon)
+PART_DEPTH = {'MultiPoint': 0, 'MultiLineString': 1, 'MultiPolygon': 2}
+
+
+def geometry_array(geometries):
+    """
+    Build shapely geometries from GeoJSON geometry dicts via flat coordinate buffers.
+
+    Coordinates of each geometry kind are gathered into one (N, 2) array with
+    ring/part/geometry offsets and handed to shapely.from_ragged_array, so no
+    per-feature shapely object construction or JSON round trip is needed.
+    GeometryCollections fall back to shapely.geometry.shape.
+
+    Returns:
+        Object array of shapely geometries, parallel to geometries
+    """
+    result = np.empty(len(geometries), dtype=object)
+    groups = {kind: [] for kind in PART_DEPTH}
+    for i, geometry in enumerate(geometries):
+        kind = MULTI_TYPES.get(geometry.get('type'))
+        if kind is None:
+            from shapely.geometry import shape
+            result[i] = shape(geometry)
+        else:
+            coords = geometry['coordinates']
+            groups[kind].append((i, coords if geometry['type'] == kind else [coords]))
+
+    for kind, items in groups.items():
+        if not items:
+            continue
+        depth = PART_DEPTH[kind]
+        arrays = []
+        offsets = [[0] for _ in range(depth + 1)]
+        for _, parts in items:
+            for part in parts:
+                if depth == 0:
+                    arrays.append(np.asarray([part], dtype=float)[:, :2])
+                    continue
+                lines = part if depth == 2 else [part]
+                for line in lines:
+                    arrays.append(np.asarray(line, dtype=float).reshape(len(line), len(line[0]) if line else 2)[:, :2])
+                    offsets[0].append(offsets[0][-1] + len(line))
+                if depth == 2:
+                    offsets[1].append(len(offsets[0]) - 1)
+            offsets[-1].append(len(offsets[-2]) - 1 if depth else offsets[-1][-1] + len(parts))
+        coords = np.concatenate(arrays) if arrays else np.empty((0, 2))
+        built = shapely.from_ragged_array(
+            getattr(shapely.GeometryType, kind.upper()), coords,
+            tuple(np.asarray(o, dtype=np.int64) for o in offsets))
+        for (i, _), geom in zip(items, built):
+            result[i] = geom
+    return result
+
+
+def compute_extents(features, force=False):
+    """
+    Cache each feature's bounding box and equal-area size on the feature.
+
+    Sets the GeoJSON 'bbox' member and properties['area_km2'] (Albers
+    equal-area) for every feature with a geometry, building all geometries
+    from flat coordinate buffers (geometry_array) and measuring them in single
+    vectorized calls. Features that already carry both
+    are skipped unless force is set; drop 'bbox' after replacing a geometry.
+    The values are for the build scripts only: strip_extents() removes them
+    before a layer is written, so they never reach the client.
+
+    Returns:
+        The features that were (re)computed
+    """
+    pending = [
+        f for f in features
+        if f.get('geometry') and (force or 'bbox' not in f or 'area_km2' not in (f.get('properties') or {}))
+    ]
+    if not pending:
+        return pending
+
+    geoms = geometry_array([f['geometry'] for f in pending])
+    bounds = np.round(shapely.bounds(geoms), 4)
+    areas = shapely.area(shapely.transform(geoms, albers_coords))
+
+    for feature, bbox, area in zip(pending, bounds.tolist(), areas.tolist()):
+        feature['bbox'] = bbox
+        feature.setdefault('properties', {})['area_km2'] = round(area, 1)
+    return pending
+
+
+def strip_extents(features):
+    """Drop the cached bbox and area_km2 (see compute_extents) from features, in place."""
+    for feature in features:
+        feature.pop('bbox', None)
+        (feature.get('properties') or {}).pop('area_km2', None)
+    return features
+
+
+def feature_area(feature):
+    """Cached equal-area size in km2 (computing it if needed); 0 without geometry."""
+    if feature.get('geometry') and 'area_km2' not in (feature.get('properties') or {}):
+        compute_extents([feature])
+    return (feature.get('properties') or {}).get('area_km2', 0)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of repaired and simplified territory geometries.
+
+make_valid and simplify are the slowest steps of download_hifld_territories.py
+on the large IOU multipolygons, and their output only depends on the raw HIFLD
+geometry and the simplify parameters. Results are stored in a SQLite file keyed
+by a hash of both, so reruns after mapping or property changes skip the
+geometry work entirely.
+
+The cache is bounded by the total size of its stored values; the least
+recently used entries are evicted first. Writes and access times are
+committed every COMMIT_EVERY changes (and by commit() after each downloaded
+page), so an interrupted run keeps what it already computed.
+
+Usage:
+    python scripts/geometry_cache.py            # print cache stats
+    python scripts/geometry_cache.py --clear
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).parent / '.cache' / 'geometry_cache.sqlite'
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Uncommitted writes/access updates before an automatic commit
+COMMIT_EVERY = 50
+
+# Returned by get() when the key is absent (None is a valid cached result)
+MISS = object()
+
+
+class GeometryCache:
+    """
+    Size-bounded LRU cache of geometry results in a SQLite file.
+
+    Values are GeoJSON geometry dicts (or None), stored zlib-compressed.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def key(geometry, **params):
+        """Hash of a raw GeoJSON geometry and the parameters applied to it."""
+        digest = hashlib.sha1(json.dumps(geometry, separators=(',', ':')).encode('utf-8'))
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or MISS."""
+        row = self.db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return MISS
+        self.hits += 1
+        self.db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.changed()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+        old = self.db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if old is not None:
+            self.total_bytes -= old[0]
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, blob, len(blob), time.time()))
+        self.total_bytes += len(blob)
+        self.writes += 1
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        self.changed()
+
+    def changed(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        """Persist pending writes and access times."""
+        self.db.commit()
+        self.pending = 0
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        rows = self.db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        self.db.execute("DELETE FROM entries")
+        self.db.commit()
+        self.db.execute("VACUUM")
+        self.total_bytes = 0
+
+    def entry_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'entries': self.entry_count(),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def report(self):
+        s = self.stats()
+        return (f"Geometry cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%} hit rate), "
+                f"{s['evictions']} evicted, {s['entries']} entries, "
+                f"{s['bytes'] / 1024 / 1024:.1f}/{s['max_bytes'] / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or clear the territory geometry cache')
+    parser.add_argument('--clear', action='store_true', help='Delete all cached geometries')
+    args = parser.parse_args()
+
+    cache = GeometryCache()
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {CACHE_FILE}")
+    else:
+        s = cache.stats()
+        print(f"{CACHE_FILE}: {s['entries']} entries, {s['bytes'] / 1024 / 1024:.1f} MB")
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
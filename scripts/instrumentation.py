@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and memory instrumentation for the pipeline scripts.
+
+Scripts mark their sub-steps with stage() blocks, and hot loops with step()
+or timed_iter(). Both do nothing but a couple of clock reads unless a
+Recorder is active, which is what running a script through this module does:
+
+    python scripts/instrumentation.py --report run.json migrate_tariff_excel_to_ts.py
+    python scripts/instrumentation.py --report run.json --trace-memory --flame run.folded \\
+        download_hifld_territories.py --incremental
+
+build.py --report DIR runs every stage this way and collects the reports.
+
+For each stage the report records:
+    wall_s, cpu_s        elapsed and process CPU time (summed over calls)
+    peak_rss_mb          process resident-set high-water mark at stage exit
+    rss_growth_mb        how much the stage raised that high-water mark
+    py_peak_mb           peak Python memory allocated since the stage started (--trace-memory)
+    top_allocations      lines whose allocations the stage still held at exit (--trace-memory)
+    steps                calls and time of step()/timed_iter() blocks run inside it
+
+--profile writes cProfile stats (view with snakeviz or pstats); --flame
+writes folded stacks sampled from the main thread, prefixed with the active
+stage, for flamegraph.pl or speedscope.
+"""
+
+import argparse
+import cProfile
+import json
+import platform
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCRIPTS_DIR = Path(__file__).parent
+
+TOP_ALLOCATIONS = 10
+SAMPLE_INTERVAL = 0.005
+
+# Allocations made by the measuring itself, left out of top_allocations
+OWN_FILES = {tracemalloc.__file__, __file__}
+
+RUNNER_FILES = {__file__, runpy.__file__, '<frozen runpy>'}
+
+# The active recorder, if any; stage() and step() are cheap no-ops without one
+_recorder = None
+
+
+def peak_rss_mb():
+    """Resident-set high-water mark of this process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageRecord:
+    """Accumulated measurements of one stage path."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss = None
+        self.rss_growth = 0.0
+        self.py_peak = 0
+        self.allocations = Counter()
+        self.allocation_counts = Counter()
+        self.steps = {}
+
+    def to_dict(self):
+        record = {
+            'name': self.path.rsplit('/', 1)[-1],
+            'path': self.path,
+            'calls': self.calls,
+            'wall_s': round(self.wall, 4),
+            'cpu_s': round(self.cpu, 4),
+            'peak_rss_mb': round(self.peak_rss, 1) if self.peak_rss is not None else None,
+            'rss_growth_mb': round(self.rss_growth, 1),
+        }
+        if self.py_peak:
+            record['py_peak_mb'] = round(self.py_peak / (1024 * 1024), 2)
+            record['top_allocations'] = [
+                {'where': where, 'size_kb': round(size / 1024, 1), 'blocks': self.allocation_counts[where]}
+                for where, size in self.allocations.most_common(TOP_ALLOCATIONS) if size > 0
+            ]
+        if self.steps:
+            record['steps'] = {
+                name: {'calls': calls, 'wall_s': round(wall, 4), 'cpu_s': round(cpu, 4)}
+                for name, (calls, wall, cpu) in self.steps.items()
+            }
+        return record
+
+
+class Recorder:
+    """
+    Collects stage measurements for one run.
+
+    Args:
+        label: Name of the run (usually the script)
+        trace_memory: Also trace Python allocations (slower, often 2-3x)
+    """
+
+    def __init__(self, label, trace_memory=False):
+        self.label = label
+        self.trace_memory = trace_memory
+        self.records = {}
+        self.stack = []
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def current_path(self):
+        return self.stack[-1][0].path if self.stack else ''
+
+    def flush_memory(self, frame):
+        """
+        Fold the allocations traced since the last clear into a stage call, then clear.
+
+        Clearing the traces at every stage boundary keeps each snapshot down to
+        what one stage allocated, instead of every block since the imports.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        frame['py_peak'] = max(frame['py_peak'], frame['retained'] + peak)
+        frame['retained'] += current
+        for stat in tracemalloc.take_snapshot().statistics('lineno'):
+            frame_info = stat.traceback[0]
+            if frame_info.filename in OWN_FILES:
+                continue
+            where = f'{Path(frame_info.filename).name}:{frame_info.lineno}'
+            frame['allocations'][where] += stat.size
+            frame['blocks'][where] += stat.count
+        tracemalloc.clear_traces()
+
+    @contextmanager
+    def stage(self, name):
+        path = f'{self.current_path()}/{name}' if self.stack else name
+        record = self.records.get(path)
+        if record is None:
+            record = self.records[path] = StageRecord(path)
+
+        frame = {'py_peak': 0, 'retained': 0, 'allocations': Counter(), 'blocks': Counter()}
+        if self.trace_memory:
+            if self.stack:
+                self.flush_memory(self.stack[-1][1])
+            else:
+                tracemalloc.clear_traces()
+
+        self.stack.append((record, frame))
+        rss_before = peak_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.calls += 1
+            record.wall += time.perf_counter() - wall
+            record.cpu += time.process_time() - cpu
+            record.peak_rss = peak_rss_mb()
+            if rss_before is not None:
+                record.rss_growth += record.peak_rss - rss_before
+            self.stack.pop()
+
+            if self.trace_memory:
+                self.flush_memory(frame)
+                record.py_peak = max(record.py_peak, frame['py_peak'])
+                record.allocations.update(frame['allocations'])
+                record.allocation_counts.update(frame['blocks'])
+                if self.stack:
+                    # A child's allocations and peak count towards its parent
+                    parent = self.stack[-1][1]
+                    parent['py_peak'] = max(parent['py_peak'], parent['retained'] + frame['py_peak'])
+                    parent['retained'] += frame['retained']
+                    parent['allocations'].update(frame['allocations'])
+                    parent['blocks'].update(frame['blocks'])
+
+    def add_step(self, name, wall, cpu):
+        """Accumulate a step() measurement into the innermost stage."""
+        if not self.stack:
+            return
+        steps = self.stack[-1][0].steps
+        calls, total_wall, total_cpu = steps.get(name, (0, 0.0, 0.0))
+        steps[name] = (calls + 1, total_wall + wall, total_cpu + cpu)
+
+    def report(self):
+        """The run report as a JSON-serializable dict."""
+        return {
+            'label': self.label,
+            'argv': sys.argv,
+            'started_at': self.started_at,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'wall_s': round(time.perf_counter() - self.start_wall, 4),
+            'cpu_s': round(time.process_time() - self.start_cpu, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1) if resource is not None else None,
+            'trace_memory': self.trace_memory,
+            'stages': [r.to_dict() for r in self.records.values()],
+        }
+
+
+@contextmanager
+def stage(name):
+    """Measure a block as a named stage of the active recorder (nested stages form a path)."""
+    if _recorder is None:
+        yield None
+        return
+    with _recorder.stage(name) as record:
+        yield record
+
+
+@contextmanager
+def step(name):
+    """Time a block that runs many times (per feature, per row) without memory tracing."""
+    if _recorder is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        _recorder.add_step(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+def timed_iter(name, iterable):
+    """Yield from iterable, timing each advance as a step (e.g. reading a streamed HTTP response)."""
+    if _recorder is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            _recorder.add_step(name, time.perf_counter() - wall, time.process_time() - cpu)
+            return
+        _recorder.add_step(name, time.perf_counter() - wall, time.process_time() - cpu)
+        yield item
+
+
+def start(label, trace_memory=False):
+    """Activate a recorder for this process; returns it."""
+    global _recorder
+    _recorder = Recorder(label, trace_memory)
+    return _recorder
+
+
+def stop():
+    """Deactivate the recorder; returns it."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+class StackSampler:
+    """
+    Samples the main thread's Python stack at a fixed interval into folded stacks.
+
+    Each sample is prefixed with the active stage path, so a flame graph
+    groups time by pipeline stage first.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.thread_id = threading.main_thread().ident
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                # Leave out the runner's own frames above the script
+                if code.co_filename not in RUNNER_FILES:
+                    frames.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+                frame = frame.f_back
+            stage_path = _recorder.current_path() if _recorder is not None else ''
+            prefix = [f'[{part}]' for part in stage_path.split('/') if part]
+            self.counts[';'.join(prefix + frames[::-1])] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+def run_script(script, script_args, report=None, trace_memory=False, profile=None, flame=None):
+    """
+    Run a pipeline script as __main__ under a recorder, wrapped in one top-level stage.
+
+    Returns:
+        (exit code, run report dict)
+    """
+    script = Path(script)
+    if not script.exists() and (SCRIPTS_DIR / script).exists():
+        script = SCRIPTS_DIR / script
+    # Scripts locate their data relative to __file__
+    script = script.resolve()
+
+    recorder = start(script.stem, trace_memory)
+    sampler = StackSampler() if flame else None
+    profiler = cProfile.Profile() if profile else None
+
+    sys.argv = [str(script)] + list(script_args)
+    sys.path.insert(0, str(script.parent))
+    code = 0
+    if sampler:
+        sampler.start()
+    try:
+        if profiler:
+            profiler.enable()
+        with recorder.stage(script.stem):
+            runpy.run_path(str(script), run_name='__main__')
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+        stop()
+        result = recorder.report()
+        if report:
+            Path(report).parent.mkdir(parents=True, exist_ok=True)
+            with open(report, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"Run report written to: {report}", file=sys.stderr)
+        if profiler:
+            Path(profile).parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile)
+            print(f"Profile written to: {profile}", file=sys.stderr)
+        if sampler:
+            print(f"Folded stacks written to: {sampler.write(flame)}", file=sys.stderr)
+    return code, result
+
+
+def print_summary(report):
+    """Stage table of a run report."""
+    print(f"{report['label']}: {report['wall_s']:.2f}s wall, {report['cpu_s']:.2f}s CPU, "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    for s in report['stages']:
+        depth = s['path'].count('/')
+        line = (f"  {'  ' * depth}{s['name']:<{28 - 2 * depth}} {s['wall_s']:>9.3f}s {s['cpu_s']:>9.3f}s CPU"
+                f"  RSS {s['peak_rss_mb']} MB (+{s['rss_growth_mb']})")
+        if 'py_peak_mb' in s:
+            line += f"  py peak {s['py_peak_mb']} MB"
+        print(line)
+        for name, st in s.get('steps', {}).items():
+            print(f"  {'  ' * (depth + 1)}~{name:<{27 - 2 * depth}} {st['wall_s']:>9.3f}s ({st['calls']} calls)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a pipeline script with per-stage timing and memory instrumentation',
+        usage='%(prog)s [options] script.py [script args ...]')
+    parser.add_argument('--report', default=None, help='Write the JSON run report here')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Record Python peak memory and top allocators per stage (slower)')
+    parser.add_argument('--profile', default=None, help='Write cProfile stats here')
+    parser.add_argument('--flame', default=None, help='Write sampled folded stacks here (flame graph input)')
+    parser.add_argument('--show', default=None, metavar='REPORT', help='Print an existing report and exit')
+    parser.add_argument('script', nargs='?', help='Script to run')
+    parser.add_argument('script_args', nargs=argparse.REMAINDER, help='Arguments for the script')
+    args = parser.parse_args()
+
+    if args.show:
+        with open(args.show) as f:
+            print_summary(json.load(f))
+        return
+    if not args.script:
+        parser.error('a script to run is required')
+
+    code, report = run_script(args.script, args.script_args, args.report, args.trace_memory,
+                              args.profile, args.flame)
+    print_summary(report)
+    sys.exit(code)
+
+
+if __name__ == '__main__':
+    # Instrumented scripts import this module by name; give them this running copy
+    sys.modules.setdefault('instrumentation', sys.modules[__name__])
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Assign data centers to the utility territory (and tariff) that serves them.
+
+This script:
+1. Loads utility_territories.geojson (tagged with tariff_utility by
+   download_hifld_territories.py) and builds an STRtree over prepared polygons
+2. Runs one batched point-in-polygon query for every data center
+3. Resolves overlapping territories to the smallest one (the one drawn on top)
+4. Writes data_centers_joined.geojson: the data centers with tariff_utility /
+   tariff_id, and a per-utility MW roll-up in its metadata. Both input layers
+   are left as they are
+
+Usage:
+    python scripts/join_data_centers.py
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from geo_layers import read_layer, write_layer
+from generated_tariffs import tariffs_by_utility
+
+
+def build_territory_index(territories):
+    """
+    Build a spatial index over territory polygons.
+
+    Args:
+        territories: GeoJSON FeatureCollection from download_hifld_territories.py
+
+    Returns:
+        (STRtree, array of tariff_utility names, array of polygon areas)
+    """
+    features = [f for f in territories['features'] if f.get('geometry')]
+    geoms = np.array([shape(f['geometry']) for f in features], dtype=object)
+    shapely.prepare(geoms)
+
+    names = np.array([f['properties'].get('tariff_utility') for f in features], dtype=object)
+    areas = shapely.area(geoms)
+    return shapely.STRtree(geoms), names, areas
+
+
+def assign_points(index, coords):
+    """
+    Find the serving territory for each point in one batch query.
+
+    Args:
+        index: Result of build_territory_index()
+        coords: (N, 2) array of lon/lat
+
+    Returns:
+        Array of N territory indices (-1 where no territory contains the point)
+    """
+    tree, _, areas = index
+    points = shapely.points(np.asarray(coords, dtype=float))
+    point_idx, territory_idx = tree.query(points, predicate='intersects')
+
+    assigned = np.full(len(points), -1, dtype=np.int64)
+    if len(point_idx):
+        # Smallest containing territory wins: sort hits by (point, area) and keep the first per point
+        order = np.lexsort((areas[territory_idx], point_idx))
+        point_idx, territory_idx = point_idx[order], territory_idx[order]
+        first = np.ones(len(point_idx), dtype=bool)
+        first[1:] = point_idx[1:] != point_idx[:-1]
+        assigned[point_idx[first]] = territory_idx[first]
+    return assigned
+
+
+def rollup_capacity(features, utilities, tariffs):
+    """Sum data center MW and counts per tariff utility, split by status."""
+    rollup = defaultdict(lambda: {'tariff_id': None, 'count': 0, 'capacity_mw': 0, 'by_status': defaultdict(int)})
+
+    for feature, utility in zip(features, utilities):
+        if utility is None:
+            continue
+        props = feature['properties']
+        capacity = props.get('capacity') or 0
+        entry = rollup[utility]
+        entry['tariff_id'] = tariffs[utility]['id'] if utility in tariffs else None
+        entry['count'] += 1
+        entry['capacity_mw'] += capacity
+        entry['by_status'][props.get('status', 'unknown')] += capacity
+
+    return {
+        utility: {**entry, 'by_status': dict(entry['by_status'])}
+        for utility, entry in sorted(rollup.items(), key=lambda kv: -kv[1]['capacity_mw'])
+    }
+
+
+def join_data_centers(data_centers, territories, tariffs):
+    """
+    Tag data centers with their serving tariff and roll capacity up per utility.
+
+    Mutates the data center collection in place (properties, and the roll-up
+    in its metadata) and returns the roll-up dict.
+    """
+    index = build_territory_index(territories)
+    _, names, _ = index
+
+    features = [f for f in data_centers['features'] if f.get('geometry')]
+    coords = [f['geometry']['coordinates'][:2] for f in features]
+    assigned = assign_points(index, coords) if coords else np.array([], dtype=np.int64)
+
+    utilities = [names[i] if i >= 0 else None for i in assigned]
+    for feature, utility in zip(features, utilities):
+        feature['properties']['tariff_utility'] = utility
+        feature['properties']['tariff_id'] = tariffs[utility]['id'] if utility in tariffs else None
+
+    rollup = rollup_capacity(features, utilities, tariffs)
+    data_centers.setdefault('metadata', {})['data_center_rollup'] = rollup
+    return rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Join data centers to utility territories')
+    parser.add_argument('--data-centers', default='data_centers', help='Data center layer name')
+    parser.add_argument('--territories', default='utility_territories', help='Territory layer name')
+    parser.add_argument('--output', default='data_centers_joined', help='Output layer name')
+    args = parser.parse_args()
+
+    data_centers = read_layer(args.data_centers)
+    territories = read_layer(args.territories)
+    tariffs = tariffs_by_utility()
+
+    start = time.perf_counter()
+    rollup = join_data_centers(data_centers, territories, tariffs)
+    elapsed = time.perf_counter() - start
+
+    total = len(data_centers['features'])
+    matched = sum(1 for f in data_centers['features'] if f['properties'].get('tariff_utility'))
+    print(f"Joined {matched}/{total} data centers to {len(rollup)} utilities in {elapsed * 1000:.1f} ms")
+
+    for utility, entry in list(rollup.items())[:10]:
+        print(f"  {utility}: {entry['count']} sites, {entry['capacity_mw']:,.0f} MW")
+
+    path = write_layer(args.output, data_centers)
+    print(f"\nOutput written to: {path}")
+
+
+if __name__ == '__main__':
+    main()
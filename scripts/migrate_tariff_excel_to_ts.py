@@ -8,21 +8,38 @@ with their protection mechanisms and calculated fields.
 
 Usage:
     python scripts/migrate_tariff_excel_to_ts.py
+    python scripts/migrate_tariff_excel_to_ts.py --allow-fewer   # accept dropped tariffs
+    python scripts/migrate_tariff_excel_to_ts.py --allow-new     # accept added tariffs
 
 Output:
     - Prints TypeScript array to stdout
     - Also saves to nextjs-app/lib/generatedTariffData.ts
+    - Records any tariff changes since the last run in the change journal
+      (tariff_journal.py)
+
+Nothing is generated while validate_tariffs.py reports errors for the sheet,
+and an existing module is not replaced by one that drops tariffs (a workbook
+built without add_more_utilities.py, say) unless --allow-fewer is given, or by
+one with tariff IDs it does not have (a utility removed on purpose coming
+back, a renamed utility) unless --allow-new is given.
 """
 
+import argparse
 import pandas as pd
 import json
+import re
 import sys
 from pathlib import Path
 
+from instrumentation import stage
+
 # Configuration
 EXCEL_FILE = Path(__file__).parent.parent / "Large_Load_Tariff_Database_FINAL.xlsx"
 OUTPUT_FILE = Path(__file__).parent.parent / "nextjs-app" / "lib" / "generatedTariffData.ts"
 
+# One "    id: '...'," line per tariff in the generated module
+TARIFF_ID_RE = re.compile(r"^    id: '([^']*)',$", re.MULTILINE)
+
 # State to region mapping (as fallback)
 STATE_TO_REGION = {
     'CT': 'Northeast', 'ME': 'Northeast', 'MA': 'Northeast', 'NH': 'Northeast',
@@ -435,38 +452,54 @@ def tariff_to_typescript(tariff):
     lines.append('  }')
     return '\n'.join(lines)
 
-def main():
-    print(f"Reading Excel file: {EXCEL_FILE}", file=sys.stderr)
-
-    if not EXCEL_FILE.exists():
-        print(f"Error: Excel file not found at {EXCEL_FILE}", file=sys.stderr)
-        sys.exit(1)
+def read_tariff_sheet(path=EXCEL_FILE):
+    """Read the main Tariff Database sheet with header on row 1 (0-indexed)."""
+    return pd.read_excel(path, sheet_name='Tariff Database', header=1)
 
-    # Read the main Tariff Database sheet with header on row 1 (0-indexed)
-    try:
-        df = pd.read_excel(EXCEL_FILE, sheet_name='Tariff Database', header=1)
-        print(f"Found {len(df)} rows in Tariff Database sheet", file=sys.stderr)
-        print(f"Columns: {list(df.columns)}", file=sys.stderr)
-    except Exception as e:
-        print(f"Error reading Excel: {e}", file=sys.stderr)
-        sys.exit(1)
+def has_utility(row):
+    """True for rows that describe a tariff (a non-blank Utility cell)."""
+    utility = row.get('Utility', '')
+    return not pd.isna(utility) and bool(str(utility).strip())
 
-    # Convert rows to tariffs
+def convert_rows(df):
+    """Convert sheet rows to tariffs, sorted by blended rate."""
     tariffs = []
     for idx, row in df.iterrows():
-        utility = row.get('Utility', '')
-        if pd.isna(utility) or not str(utility).strip():
+        if not has_utility(row):
             continue
 
         tariff = row_to_tariff(row, idx)
         tariffs.append(tariff)
 
-    print(f"Converted {len(tariffs)} tariffs", file=sys.stderr)
-
     # Sort by blended rate
     tariffs.sort(key=lambda t: t['blendedRatePerKWh'])
+    return tariffs
+
+def tariff_stats(tariffs):
+    """Rating counts, blended rate range, states and ISOs for the stats block."""
+    rates = [t['blendedRatePerKWh'] for t in tariffs if t['blendedRatePerKWh'] > 0]
+    return {
+        'high': sum(1 for t in tariffs if t['protectionRating'] == 'High'),
+        'mid': sum(1 for t in tariffs if t['protectionRating'] == 'Mid'),
+        'low': sum(1 for t in tariffs if t['protectionRating'] == 'Low'),
+        'avg_rate': sum(rates) / len(rates) if rates else 0,
+        'min_rate': min(rates) if rates else 0,
+        'max_rate': max(rates) if rates else 0,
+        'states': sorted(set(t['state'] for t in tariffs)),
+        'isos': sorted(set(t['iso_rto'] for t in tariffs if t['iso_rto'] != 'None')),
+    }
+
+def render_typescript(tariffs, tariff_strings=None):
+    """
+    Render generatedTariffData.ts from tariffs sorted by blended rate.
+
+    tariff_strings, when given, are the already-rendered object literals of
+    the same tariffs in the same order (watch mode reuses unchanged ones).
+    """
+    if tariff_strings is None:
+        tariff_strings = [tariff_to_typescript(t) for t in tariffs]
+    stats = tariff_stats(tariffs)
 
-    # Generate TypeScript code
     ts_code = '''/**
  * Generated Tariff Data
  *
@@ -506,49 +539,35 @@ export interface EnrichedTariff extends LargeLoadTariff {
 export const GENERATED_TARIFFS: EnrichedTariff[] = [
 '''
 
-    tariff_strings = [tariff_to_typescript(t) for t in tariffs]
     ts_code += ',\n'.join(tariff_strings)
     ts_code += '\n];\n'
 
-    # Calculate statistics
-    high_count = sum(1 for t in tariffs if t['protectionRating'] == 'High')
-    mid_count = sum(1 for t in tariffs if t['protectionRating'] == 'Mid')
-    low_count = sum(1 for t in tariffs if t['protectionRating'] == 'Low')
-    rates = [t['blendedRatePerKWh'] for t in tariffs if t['blendedRatePerKWh'] > 0]
-    avg_rate = sum(rates) / len(rates) if rates else 0
-    min_rate = min(rates) if rates else 0
-    max_rate = max(rates) if rates else 0
-
-    # Get unique states and ISOs
-    states = list(set(t['state'] for t in tariffs))
-    isos = list(set(t['iso_rto'] for t in tariffs if t['iso_rto'] != 'None'))
-
     ts_code += f'''
 /**
  * Database Statistics
  */
 export const TARIFF_STATS = {{
   totalUtilities: {len(tariffs)},
-  highProtection: {high_count},
-  midProtection: {mid_count},
-  lowProtection: {low_count},
-  avgBlendedRate: {avg_rate:.5f},
-  minBlendedRate: {min_rate:.5f},
-  maxBlendedRate: {max_rate:.5f},
-  uniqueStates: {len(states)},
-  uniqueISOs: {len(isos)},
+  highProtection: {stats['high']},
+  midProtection: {stats['mid']},
+  lowProtection: {stats['low']},
+  avgBlendedRate: {stats['avg_rate']:.5f},
+  minBlendedRate: {stats['min_rate']:.5f},
+  maxBlendedRate: {stats['max_rate']:.5f},
+  uniqueStates: {len(stats['states'])},
+  uniqueISOs: {len(stats['isos'])},
   generatedDate: '2026-01-01',
 }};
 
 /**
  * Get all unique states in the database
  */
-export const TARIFF_STATES = {json.dumps(sorted(states))};
+export const TARIFF_STATES = {json.dumps(stats['states'])};
 
 /**
  * Get all unique ISO/RTOs in the database
  */
-export const TARIFF_ISOS = {json.dumps(sorted(isos))};
+export const TARIFF_ISOS = {json.dumps(stats['isos'])};
 
 /**
  * Helper function to get tariffs by rating
@@ -586,15 +605,98 @@ export function getTariffsInRateRange(minRate: number, maxRate: number): Enriche
 }}
 '''
 
+    return ts_code
+
+def write_typescript(ts_code, path=OUTPUT_FILE):
+    """Write the generated module; returns False (and leaves the file alone) if unchanged."""
+    if path.exists() and path.read_text() == ts_code:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(ts_code)
+    return True
+
+def generated_tariff_ids(path=OUTPUT_FILE):
+    """Tariff IDs in an existing generated module (empty if there is none)."""
+    if not path.exists():
+        return []
+    return TARIFF_ID_RE.findall(path.read_text())
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate generatedTariffData.ts from the tariff workbook')
+    parser.add_argument('--allow-fewer', action='store_true',
+                        help='Write the module even if tariffs of the current one are missing')
+    parser.add_argument('--allow-new', action='store_true',
+                        help='Write the module even if it has tariff IDs the current one does not')
+    args = parser.parse_args()
+
+    print(f"Reading Excel file: {EXCEL_FILE}", file=sys.stderr)
+
+    if not EXCEL_FILE.exists():
+        print(f"Error: Excel file not found at {EXCEL_FILE}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        with stage('excel_parse'):
+            df = read_tariff_sheet(EXCEL_FILE)
+        print(f"Found {len(df)} rows in Tariff Database sheet", file=sys.stderr)
+        print(f"Columns: {list(df.columns)}", file=sys.stderr)
+    except Exception as e:
+        print(f"Error reading Excel: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Imported here: validate_tariffs imports this module
+    from validate_tariffs import format_report, summary, validate_tariffs
+    with stage('validate'):
+        report = validate_tariffs(df)
+    print(f"Validation: {summary(report)}", file=sys.stderr)
+    errors = report[report['severity'] == 'error']
+    if len(errors):
+        print(format_report(errors), file=sys.stderr)
+        print("Error: fix the workbook before generating TypeScript "
+              "(python scripts/validate_tariffs.py for the full report)", file=sys.stderr)
+        sys.exit(1)
+
+    with stage('row_conversion'):
+        tariffs = convert_rows(df)
+    print(f"Converted {len(tariffs)} tariffs", file=sys.stderr)
+
+    previous = set(generated_tariff_ids())
+    ids = {t['id'] for t in tariffs}
+    dropped = sorted(previous - ids) if previous and not args.allow_fewer else []
+    added = sorted(ids - previous) if previous and not args.allow_new else []
+    if dropped:
+        print(f"Error: {len(dropped)} tariff(s) of {OUTPUT_FILE.name} are not in the workbook; "
+              f"not overwriting. Missing: {', '.join(dropped)}", file=sys.stderr)
+        print("Rerun with --allow-fewer if the tariffs were removed on purpose", file=sys.stderr)
+    if added:
+        print(f"Error: {len(added)} tariff(s) in the workbook are not in {OUTPUT_FILE.name}; "
+              f"not overwriting. New: {', '.join(added)}", file=sys.stderr)
+        print("Rerun with --allow-new if the tariffs were added on purpose", file=sys.stderr)
+    if dropped or added:
+        sys.exit(1)
+
+    with stage('codegen'):
+        ts_code = render_typescript(tariffs)
+        stats = tariff_stats(tariffs)
+
     # Save to file
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_FILE.write_text(ts_code)
+    with stage('write'):
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        OUTPUT_FILE.write_text(ts_code)
     print(f"Written TypeScript to: {OUTPUT_FILE}", file=sys.stderr)
+
+    # Imported here: tariff_journal imports this module for create_tariff_id
+    from tariff_journal import JOURNAL_DIR, TariffJournal
+    with stage('journal'):
+        recorded = TariffJournal().sync_workbook(EXCEL_FILE, reason='Regenerated from workbook')
+    if recorded:
+        print(f"Journaled {recorded} tariff change(s) to {JOURNAL_DIR}", file=sys.stderr)
     print(f"\nStatistics:", file=sys.stderr)
     print(f"  Total utilities: {len(tariffs)}", file=sys.stderr)
-    print(f"  High protection: {high_count}", file=sys.stderr)
-    print(f"  Mid protection: {mid_count}", file=sys.stderr)
-    print(f"  Low protection: {low_count}", file=sys.stderr)
+    print(f"  High protection: {stats['high']}", file=sys.stderr)
+    print(f"  Mid protection: {stats['mid']}", file=sys.stderr)
+    print(f"  Low protection: {stats['low']}", file=sys.stderr)
+    avg_rate, min_rate, max_rate = stats['avg_rate'], stats['min_rate'], stats['max_rate']
     print(f"  Avg blended rate: ${avg_rate:.4f}/kWh ({avg_rate*100:.2f} ¢/kWh)", file=sys.stderr)
     print(f"  Min blended rate: ${min_rate:.4f}/kWh ({min_rate*100:.2f} ¢/kWh)", file=sys.stderr)
     print(f"  Max blended rate: ${max_rate:.4f}/kWh ({max_rate*100:.2f} ¢/kWh)", file=sys.stderr)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Rank HIFLD territory names for every tariff utility.
+
+UTILITY_NAME_MAPPING in download_hifld_territories.py is kept by hand. This
+script suggests and checks it:
+1. Normalizes names: expands abbreviations (CO -> COMPANY, PWR -> POWER, ...),
+   drops punctuation and legal suffixes, and splits parentheticals into
+   aliases ('(PSO)', '(Xcel)') or state hints ('(MN)')
+2. Builds an inverted character-trigram index over all HIFLD names (trigram ->
+   records containing it), weighting each trigram by its inverse document
+   frequency so distinctive fragments ('AVI', 'NSTAR') count for more than
+   common ones ('ENERGY', 'ELECTRIC')
+3. Scores every tariff utility against every HIFLD name by walking only the
+   posting lists of its query trigrams (weighted Dice similarity, memory
+   linear in the total trigram count), lets short all-caps names match HIFLD initials
+   (TVA, SMUD, LADWP), and adjusts by whether the HIFLD record's state is one
+   the tariff covers
+4. Writes a reviewable JSON file with the ranked candidates, suggested
+   patterns, and whether they agree with the current mapping
+
+Approved entries (set "approved": true, edit "patterns" if needed) can be used
+by download_hifld_territories.py --name-mapping.
+
+HIFLD names are fetched attribute-only once and cached in scripts/.cache.
+
+Usage:
+    python scripts/resolve_utility_names.py
+    python scripts/resolve_utility_names.py --refresh-names --top 8
+    python scripts/resolve_utility_names.py --names-from-layer   # offline, territory layer names only
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from download_hifld_territories import UTILITY_NAME_MAPPING, query_hifld_all
+from generated_tariffs import load_generated_tariffs
+from geo_layers import read_layer
+
+NAMES_CACHE = Path(__file__).parent / '.cache' / 'hifld_names.json'
+REVIEW_FILE = Path(__file__).parent / 'utility_name_candidates.json'
+
+ABBREVIATIONS = {
+    'CO': 'COMPANY', 'COS': 'COMPANIES', 'CORP': 'CORPORATION', 'PWR': 'POWER',
+    'ELEC': 'ELECTRIC', 'ELECT': 'ELECTRIC', 'SVC': 'SERVICE', 'SERV': 'SERVICE',
+    'PUB': 'PUBLIC', 'UTIL': 'UTILITIES', 'UTILS': 'UTILITIES', 'DEPT': 'DEPARTMENT',
+    'COOP': 'COOPERATIVE', 'ASSN': 'ASSOCIATION', 'AUTH': 'AUTHORITY', 'DIST': 'DISTRICT',
+    'MUNI': 'MUNICIPAL', 'LT': 'LIGHT', 'GEN': 'GENERAL', 'NATL': 'NATIONAL', 'SO': 'SOUTHERN',
+}
+
+# Dropped entirely; they carry no identity
+STOPWORDS = {'INC', 'LLC', 'LP', 'THE', 'OF', 'AND'}
+
+# Also left out of initials ('PUBLIC SERVICE ELEC & GAS CO' -> PSEG)
+ACRONYM_SKIP = {'COMPANY', 'CORPORATION', 'COMPANIES'}
+
+STATE_CODES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA',
+    'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM',
+    'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA',
+    'WV', 'WI', 'WY',
+}
+
+ACRONYM_SCORE = 0.9   # a short all-caps query equal to a HIFLD name's initials
+STATE_BONUS = 0.1
+STATE_PENALTY = 0.3
+ACCEPT_SCORE = 0.45   # suggest a candidate at or above this score
+SUGGEST_MARGIN = 0.05  # ...and any other candidate this close to the best
+
+
+def split_parentheticals(name):
+    """'Xcel Energy (MN)' -> ('Xcel Energy', ['MN'])."""
+    inner = re.findall(r'\(([^)]*)\)', name)
+    return re.sub(r'\([^)]*\)', ' ', name), [s.strip() for s in inner if s.strip()]
+
+
+def normalize(name):
+    """Uppercase, expand abbreviations, drop punctuation and stopwords."""
+    text = name.upper().replace('&', ' AND ')
+    tokens = re.split(r'[^A-Z0-9]+', text)
+    out = []
+    for token in tokens:
+        if not token:
+            continue
+        token = ABBREVIATIONS.get(token, token)
+        if token not in STOPWORDS:
+            out.append(token)
+    return ' '.join(out)
+
+
+def initials(text):
+    """Initials of a normalized name, skipping legal-form words."""
+    return ''.join(token[0] for token in text.split() if token not in ACRONYM_SKIP)
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def tariff_queries(tariff):
+    """
+    Normalized query strings and state set for one tariff utility.
+
+    The name without parentheticals, each non-state parenthetical and
+    utility_short are all tried; the best-scoring one counts.
+    """
+    base, inner = split_parentheticals(tariff['utility'])
+    states = {s.strip() for s in str(tariff.get('state', '')).split('/') if s.strip()}
+    raw = [base]
+    for part in inner:
+        if part.upper() in STATE_CODES:
+            states.add(part.upper())
+        else:
+            raw.append(part)
+    if tariff.get('utility_short'):
+        raw.append(tariff['utility_short'])
+
+    queries = [normalize(q) for q in raw]
+    acronyms = {q.strip().upper() for q in raw if re.fullmatch(r'[A-Z&]{2,6}', q.strip())}
+    return [q for i, q in enumerate(queries) if q and q not in queries[:i]], states, acronyms
+
+
+def load_hifld_names(refresh=False, from_layer=False):
+    """
+    Distinct (NAME, STATE, ID) records from HIFLD, cached after the first fetch.
+
+    With from_layer, use the names already in utility_territories.geojson
+    (offline, but only the currently matched utilities).
+    """
+    if from_layer:
+        return [
+            {'name': f['properties'].get('NAME', ''), 'state': f['properties'].get('STATE', ''),
+             'id': str(f['properties'].get('ID', ''))}
+            for f in read_layer('utility_territories')['features']
+        ]
+    if NAMES_CACHE.exists() and not refresh:
+        with open(NAMES_CACHE) as f:
+            return json.load(f)
+
+    print("Fetching HIFLD names (attributes only)...")
+    records = [
+        {'name': f['properties'].get('NAME', ''), 'state': f['properties'].get('STATE', ''),
+         'id': str(f['properties'].get('ID', ''))}
+        for f in query_hifld_all('1=1', return_geometry=False)
+    ]
+    NAMES_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    with open(NAMES_CACHE, 'w') as f:
+        json.dump(records, f)
+    return records
+
+
+def trigram_index(texts):
+    """
+    Inverted trigram index over texts.
+
+    Returns:
+        (dict of trigram -> int array of text indices, list of trigram sets per text)
+    """
+    grams_per_text = [trigrams(text) for text in texts]
+    postings = defaultdict(list)
+    for i, grams in enumerate(grams_per_text):
+        for gram in grams:
+            postings[gram].append(i)
+    return {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}, grams_per_text
+
+
+def score_candidates(tariffs, records):
+    """
+    Score every tariff utility against every HIFLD record.
+
+    Returns:
+        (scores array tariffs x records, list of tariff state sets)
+    """
+    hifld_texts = [normalize(split_parentheticals(r['name'])[0]) for r in records]
+    postings, hifld_grams = trigram_index(hifld_texts)
+
+    # Inverse document frequency per trigram; unseen query trigrams get the maximum
+    idf = {gram: float(np.log((len(records) + 1) / (len(ids) + 1)) + 1) for gram, ids in postings.items()}
+    max_idf = float(np.log(len(records) + 1) + 1)
+    hifld_sizes = np.array([sum(idf[g] for g in grams) for grams in hifld_grams], dtype=np.float32)
+
+    # One query string at a time; each tariff keeps its best one
+    scores = np.full((len(tariffs), len(records)), -np.inf, dtype=np.float32)
+    overlap = np.zeros(len(records), dtype=np.float32)
+    tariff_states, tariff_acronyms = [], []
+    for ti, tariff in enumerate(tariffs):
+        queries, states, acronyms = tariff_queries(tariff)
+        tariff_states.append(states)
+        tariff_acronyms.append(acronyms)
+        for query in queries:
+            overlap[:] = 0
+            query_size = 0.0
+            for gram in trigrams(query):
+                if gram in postings:
+                    overlap[postings[gram]] += idf[gram]
+                    query_size += idf[gram]
+                else:
+                    query_size += max_idf
+            np.maximum(scores[ti], 2 * overlap / (query_size + hifld_sizes), out=scores[ti])
+
+    # Short names that are a HIFLD name's initials (TVA, SMUD, LADWP, PSEG)
+    hifld_initials = defaultdict(list)
+    for ri, text in enumerate(hifld_texts):
+        hifld_initials[initials(text)].append(ri)
+    for ti, acronyms in enumerate(tariff_acronyms):
+        for acronym in acronyms:
+            for ri in hifld_initials.get(acronym.replace('&', ''), []):
+                scores[ti, ri] = max(scores[ti, ri], ACRONYM_SCORE)
+
+    # State-aware adjustment
+    record_states = np.array([r['state'] for r in records], dtype=object)
+    for ti, states in enumerate(tariff_states):
+        if states:
+            in_state = np.isin(record_states, list(states))
+            scores[ti] += np.where(in_state, STATE_BONUS, -STATE_PENALTY)
+    return scores, tariff_states
+
+
+def build_review(tariffs, records, scores, tariff_states, top):
+    """Ranked candidates and suggested patterns per tariff utility."""
+    review = []
+    order = np.argsort(-scores, axis=1)[:, :top * 3]
+    for ti, tariff in enumerate(tariffs):
+        # Collapse records with the same name (one HIFLD utility, several rows)
+        candidates, seen = [], set()
+        for ri in order[ti]:
+            record = records[ri]
+            if record['name'] in seen:
+                continue
+            seen.add(record['name'])
+            candidates.append({
+                'hifld_name': record['name'],
+                'state': record['state'],
+                'id': record['id'],
+                'score': round(float(scores[ti, ri]), 3),
+            })
+            if len(candidates) == top:
+                break
+
+        best = candidates[0]['score'] if candidates else 0
+        suggested = [c['hifld_name'] for c in candidates
+                     if c['score'] >= ACCEPT_SCORE and c['score'] >= best - SUGGEST_MARGIN]
+
+        current = UTILITY_NAME_MAPPING.get(tariff['utility'])
+        if not suggested:
+            status = 'unresolved'
+        elif current is None:
+            status = 'new'
+        elif any(p.upper() in name.upper() for p in current for name in suggested):
+            status = 'agrees'
+        else:
+            status = 'differs'
+
+        review.append({
+            'tariff_utility': tariff['utility'],
+            'tariff_id': tariff.get('id'),
+            'states': sorted(tariff_states[ti]),
+            'status': status,
+            'current_patterns': current,
+            'patterns': suggested,
+            'approved': False,
+            'candidates': candidates,
+        })
+    return review
+
+
+def load_name_mapping(path=REVIEW_FILE):
+    """Approved entries of a review file as {tariff_utility: [patterns]}."""
+    with open(path) as f:
+        review = json.load(f)
+    return {e['tariff_utility']: e['patterns'] for e in review['utilities'] if e.get('approved')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rank HIFLD names for each tariff utility')
+    parser.add_argument('--output', default=str(REVIEW_FILE), help='Review file to write')
+    parser.add_argument('--top', type=int, default=5, help='Candidates to keep per tariff utility')
+    parser.add_argument('--refresh-names', action='store_true', help='Re-fetch the HIFLD name list')
+    parser.add_argument('--names-from-layer', action='store_true',
+                        help='Use names from utility_territories.geojson instead of HIFLD (offline)')
+    args = parser.parse_args()
+
+    records = load_hifld_names(args.refresh_names, args.names_from_layer)
+    # Same utility name and state listed several times -> one candidate
+    unique = {(r['name'], r['state']): r for r in records}
+    records = list(unique.values())
+
+    # One entry per tariff utility (some utilities have several tariffs)
+    tariffs = list({t['utility']: t for t in load_generated_tariffs()}.values())
+
+    start = time.perf_counter()
+    scores, tariff_states = score_candidates(tariffs, records)
+    review = build_review(tariffs, records, scores, tariff_states, args.top)
+    elapsed = time.perf_counter() - start
+
+    counts = defaultdict(int)
+    for entry in review:
+        counts[entry['status']] += 1
+
+    output = Path(args.output)
+    with open(output, 'w') as f:
+        json.dump({'hifld_records': len(records), 'utilities': review}, f, indent=2)
+
+    print(f"Resolved {len(tariffs)} tariff utilities against {len(records)} HIFLD names "
+          f"in {elapsed * 1000:.0f} ms")
+    print("  " + ", ".join(f"{status}: {n}" for status, n in sorted(counts.items())))
+    for entry in review:
+        if entry['status'] in ('differs', 'unresolved'):
+            top = entry['candidates'][0] if entry['candidates'] else {}
+            print(f"  [{entry['status']}] {entry['tariff_utility']}: "
+                  f"best {top.get('hifld_name')} ({top.get('score')})")
+    print(f"\nReview file written to: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic tariffs, territories and data centers for scale and load testing.
+
+Tariff records have the UTILITIES schema of create_final_comprehensive_db.py,
+drawn from distributions fitted to the real entries:
+- (region, ISO/RTO) pairs at their observed frequencies; states from those
+  seen in the pair, or any state of the region
+- rates and charges log-normal per (region, ISO) group, falling back to the
+  whole database for small groups, with each group's share of zero values
+- TOU vs flat energy pricing at the group's rate
+- protection terms (flags, contract term, ratchet %) copied as a whole from a
+  random tariff of the group, with each flag flipped now and then, so the mix
+  of High/Mid/Low protection scores follows the real one
+- statuses at their overall frequencies
+- multi-state tariffs (e.g. 'KS/MO') at the observed share, covering the
+  nearest neighbouring states
+
+Each tariff gets a territory polygon around its states (one part per state),
+named like an HIFLD record and tagged with tariff_utility, and data centers
+are placed inside random territories with capacity, status and year drawn
+from data_centers.geojson.
+
+Every record is generated from its own random stream, keyed by (seed, kind,
+index), so output is identical for a given seed regardless of N, any record
+can be regenerated on its own, and files stream to disk in constant memory.
+
+Output mirrors the repository layout, so a scratch copy of the repo can be
+overlaid with it and every stage run offline:
+    <out>/Large_Load_Tariff_Database_FINAL.xlsx     (Tariff Database sheet)
+    <out>/tariffs.json                              (UTILITIES-schema records)
+    <out>/nextjs-app/public/geojson/utility_territories.geojson
+    <out>/nextjs-app/public/geojson/data_centers.geojson
+
+Usage:
+    python scripts/synthetic_data.py --tariffs 10000 --data-centers 50000
+    python scripts/synthetic_data.py --tariffs 1000 --formats xlsx --seed 7 --out /tmp/loadtest
+"""
+
+import argparse
+import io
+import json
+import contextlib
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from geo_layers import read_layer
+
+DEFAULT_OUT = Path(__file__).parent / '.cache' / 'synthetic'
+GEOJSON_SUBDIR = Path('nextjs-app') / 'public' / 'geojson'
+
+DEFAULT_SEED = 42
+FORMATS = ['xlsx', 'json', 'geojson']
+
+# Random stream kinds, part of every record's seed
+TARIFF, TERRITORY, DATA_CENTER = 0, 1, 2
+
+RATE_FIELDS = ['peak_demand_charge', 'off_peak_demand_charge', 'energy_rate_peak', 'fuel_adjustment',
+               'min_load_mw']
+FLAG_FIELDS = ['demand_ratchet', 'ciac_required', 'take_or_pay', 'exit_fee', 'credit_requirements',
+               'dc_specific', 'collateral_required']
+
+# Groups with fewer nonzero values than this use the whole database's spread
+MIN_GROUP_SAMPLES = 3
+# Chance of flipping each copied protection flag
+FLAG_FLIP_P = 0.05
+
+PLACES = ['Ozark', 'Prairie', 'Blue Ridge', 'Cumberland', 'Red River', 'Big Sky', 'Cascade', 'Piedmont',
+          'Great Plains', 'Lakeshore', 'Sierra', 'Gulf Coast', 'Tri-County', 'Heartland', 'Mesa',
+          'Allegheny', 'Bayou', 'High Desert', 'North Star', 'Sandhills', 'Tidewater', 'Wabash',
+          'Yellowstone', 'Chesapeake', 'Brazos', 'Columbia', 'Platte', 'Shenandoah', 'Superior', 'Pecos']
+KINDS = ['Electric Cooperative', 'Power & Light', 'Public Power District', 'Energy', 'Electric Company',
+         'Municipal Utilities', 'Rural Electric Association', 'Power Authority']
+SCHEDULES = ['LGS', 'LPS', 'LPL', 'GS-TOU', 'LP-T', 'XLP', 'HLF', 'TX-1']
+OPERATORS = ['Hyperscale Partners', 'Northwind Compute', 'Atlas Data', 'Summit Cloud', 'Keystone DC',
+             'Meridian Digital', 'Frontier AI Campus', 'Granite Hosting']
+
+SHEET_TITLE = 'Tariff Database'
+SHEET_PARAMETERS = ('Parameters: 600 MW DC @ 80% LF = 480 MW avg = 350,400,000 kWh/mo | '
+                    'Peak: 40% (140,160,000 kWh) | Off-Peak: 60% (210,240,000 kWh)')
+SHEET_HEADERS = ['Row', 'Utility', 'State', 'Region', 'ISO/RTO', 'Tariff Name', 'Rate Schedule',
+                 'Effective Date', 'Status', 'Min Load (MW)',
+                 'Peak Demand ($/kW)', 'Off-Peak Demand', 'Energy Peak ($/kWh)', 'Energy Off-Peak',
+                 'Fuel/Rider Adj', 'Contract (Yrs)', 'Ratchet %',
+                 'Demand Ratchet', 'CIAC', 'Take-or-Pay', 'Exit Fee', 'Credit Req', 'DC Specific', 'Collateral',
+                 'Blended Rate ($/kWh)', 'Annual Cost ($M)', 'Protection Score', 'Protection Rating',
+                 'Rate Components', 'Notes']
+
+
+def load_utilities():
+    """The real UTILITIES entries (the module prints a count on import)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from create_final_comprehensive_db import UTILITIES
+    return UTILITIES
+
+
+def split_states(state):
+    return [s.strip() for s in str(state).replace(',', '/').split('/') if s.strip()]
+
+
+def lognormal_fit(values):
+    """(mu, sigma) of log values, or None if there are none."""
+    logs = np.log([v for v in values if v and v > 0])
+    if len(logs) == 0:
+        return None
+    return float(logs.mean()), float(max(logs.std(), 0.05))
+
+
+class TariffModel:
+    """Distributions fitted to the real UTILITIES entries."""
+
+    def __init__(self, utilities=None, states_layer=None):
+        from migrate_tariff_excel_to_ts import STATE_TO_REGION
+
+        utilities = utilities if utilities is not None else load_utilities()
+        self.utilities = utilities
+
+        groups = defaultdict(list)
+        for t in utilities:
+            groups[(t['region'], t['iso_rto'])].append(t)
+        self.groups = sorted(groups)
+        counts = np.array([len(groups[g]) for g in self.groups], dtype=float)
+        self.group_p = counts / counts.sum()
+
+        self.group_states = {g: sorted({split_states(t['state'])[0] for t in groups[g]}) for g in self.groups}
+        self.region_states = defaultdict(list)
+        for state, region in STATE_TO_REGION.items():
+            self.region_states[region].append(state)
+
+        # Rates: share of zeros and log-normal spread of nonzero values, per group
+        overall = {f: lognormal_fit(t.get(f) for t in utilities) for f in RATE_FIELDS}
+        self.rates = {}
+        for g in self.groups:
+            members = groups[g]
+            fits = {}
+            for f in RATE_FIELDS:
+                values = [t.get(f) or 0 for t in members]
+                nonzero = [v for v in values if v > 0]
+                fit = lognormal_fit(nonzero) if len(nonzero) >= MIN_GROUP_SAMPLES else None
+                if fit is None and overall[f] is not None:
+                    mu = float(np.log(nonzero).mean()) if nonzero else overall[f][0]
+                    fit = (mu, overall[f][1])
+                p_zero = (values.count(0) + 0.5) / (len(values) + 1)
+                fits[f] = (p_zero if f != 'energy_rate_peak' else 0.0, fit)
+            self.rates[g] = fits
+
+        # TOU: off-peak energy below peak; the ratio is fitted over all TOU tariffs
+        def is_tou(t):
+            return bool(t.get('energy_rate_off_peak')) and t.get('energy_rate_off_peak') != t.get('energy_rate_peak')
+        self.tou_p = {g: (sum(map(is_tou, groups[g])) + 1) / (len(groups[g]) + 2) for g in self.groups}
+        ratios = [t['energy_rate_off_peak'] / t['energy_rate_peak'] for t in utilities
+                  if is_tou(t) and t.get('energy_rate_peak')]
+        self.tou_ratio = lognormal_fit(ratios) or (np.log(0.7), 0.1)
+
+        # Draws are clipped to the range seen anywhere in the database
+        self.bounds = {f: (min(v for v in (t.get(f) or 0 for t in utilities) if v > 0),
+                           max(t.get(f) or 0 for t in utilities)) for f in RATE_FIELDS}
+
+        self.protections = {g: [({f: bool(t.get(f)) for f in FLAG_FIELDS},
+                                 int(t.get('contract_term_years') or 5), int(t.get('ratchet_pct') or 0))
+                                for t in groups[g]] for g in self.groups}
+        self.statuses = Counter(t.get('status', 'Active') for t in utilities)
+        self.multi_state_p = sum(len(split_states(t['state'])) > 1 for t in utilities) / len(utilities)
+        self.extra_states = Counter(len(split_states(t['state'])) - 1 for t in utilities
+                                    if len(split_states(t['state'])) > 1)
+        self.tariff_names = sorted({t['tariff_name'] for t in utilities})
+        self.rate_components = sorted({t['rate_components'] for t in utilities if t.get('rate_components')})
+
+        # State label points from usa_states.geojson, for territory placement and neighbours
+        states_layer = states_layer if states_layer is not None else read_layer('usa_states')
+        self.state_centers = {f['properties']['stateId']: tuple(f['geometry']['coordinates'])
+                              for f in states_layer['features'] if f['geometry']['type'] == 'Point'}
+
+    @staticmethod
+    def choice(rng, counter):
+        values = list(counter)
+        p = np.array([counter[v] for v in values], dtype=float)
+        return values[rng.choice(len(values), p=p / p.sum())]
+
+    def neighbours(self, state, count):
+        """The `count` states whose label points are nearest to `state`'s."""
+        if state not in self.state_centers:
+            return []
+        x, y = self.state_centers[state]
+        others = sorted((s for s in self.state_centers if s != state),
+                        key=lambda s: (self.state_centers[s][0] - x) ** 2 + (self.state_centers[s][1] - y) ** 2)
+        return others[:count]
+
+
+def utility_name(i):
+    """Unique, deterministic utility name for index i."""
+    place = PLACES[i % len(PLACES)]
+    kind = KINDS[(i // len(PLACES)) % len(KINDS)]
+    cycle = i // (len(PLACES) * len(KINDS))
+    return f'{place} {kind}' + (f' {cycle + 1}' if cycle else '')
+
+
+def make_tariff(model, i, seed=DEFAULT_SEED):
+    """Synthetic tariff i in the UTILITIES schema."""
+    rng = np.random.default_rng((seed, TARIFF, i))
+    g = model.groups[rng.choice(len(model.groups), p=model.group_p)]
+    region, iso = g
+
+    if rng.random() < 0.7 or not model.region_states.get(region):
+        state = str(rng.choice(model.group_states[g]))
+    else:
+        state = str(rng.choice(model.region_states[region]))
+    states = [state]
+    if rng.random() < model.multi_state_p:
+        states += model.neighbours(state, model.choice(rng, model.extra_states))
+
+    rates = {}
+    for f, (p_zero, fit) in model.rates[g].items():
+        if fit is None or rng.random() < p_zero:
+            rates[f] = 0.0
+        else:
+            rates[f] = float(np.clip(np.exp(rng.normal(*fit)), *model.bounds[f]))
+    peak = rates['energy_rate_peak']
+    if rng.random() < model.tou_p[g]:
+        off_peak = peak * min(float(np.exp(rng.normal(*model.tou_ratio))), 0.98)
+    else:
+        off_peak = peak
+
+    profile, term, ratchet = model.protections[g][rng.integers(len(model.protections[g]))]
+    flips = rng.random(len(FLAG_FIELDS)) < FLAG_FLIP_P
+    flags = {f: bool(value != flip) for (f, value), flip in zip(profile.items(), flips)}
+    name = utility_name(i)
+    schedule = f"Schedule {rng.choice(SCHEDULES)}-{int(rng.integers(1, 99))}"
+    year = int(rng.integers(2023, 2026))
+    month, day = int(rng.integers(1, 13)), int(rng.integers(1, 29))
+
+    return {
+        'utility': name,
+        'state': '/'.join(states),
+        'region': region,
+        'iso_rto': iso,
+        'tariff_name': str(rng.choice(model.tariff_names)),
+        'rate_schedule': schedule,
+        'effective_date': f'{year}-{month:02d}-{day:02d}',
+        'status': model.choice(rng, model.statuses),
+        'docket': f'{state} PSC Docket {year}-{int(rng.integers(1, 999999)):06d}',
+        'min_load_mw': round(rates['min_load_mw'] or 1.0, 1),
+        'peak_demand_charge': round(rates['peak_demand_charge'], 2),
+        'off_peak_demand_charge': round(rates['off_peak_demand_charge'], 2),
+        'energy_rate_peak': round(peak, 4),
+        'energy_rate_off_peak': round(off_peak, 4),
+        'fuel_adjustment': round(rates['fuel_adjustment'], 4),
+        'contract_term_years': term,
+        'ratchet_pct': ratchet,
+        **flags,
+        'rate_components': str(rng.choice(model.rate_components)),
+        'source_document': f'{name} {schedule}',
+        'source_url': '',
+        'page_reference': schedule,
+        'notes': f'Synthetic record (seed {seed}, index {i})',
+        'qaqc_status': 'Synthetic',
+    }
+
+
+def iter_tariffs(model, n, seed=DEFAULT_SEED, include_real=False):
+    """
+    Yield n tariffs.
+
+    With include_real, the real UTILITIES entries come first and synthetic
+    ones fill up the rest.
+    """
+    real = model.utilities if include_real else []
+    for i in range(n):
+        yield dict(real[i]) if i < len(real) else make_tariff(model, i, seed)
+
+
+def star_polygon(rng, lon, lat, radius, vertices):
+    """Closed ring of a jagged star-shaped polygon around (lon, lat)."""
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    # Smooth low-frequency wobble plus vertex-level noise, like a digitized boundary
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    wobble = 1 + 0.25 * sum(np.sin((k + 2) * angles + phase[k]) / (k + 1) for k in range(3))
+    r = radius * wobble * rng.uniform(0.93, 1.07, vertices)
+    ring = np.column_stack([lon + r * np.cos(angles), lat + r * np.sin(angles) * 0.8])
+    return np.round(np.vstack([ring, ring[:1]]), 6).tolist()
+
+
+def territory_anchor(model, tariff, i, seed=DEFAULT_SEED):
+    """(lon, lat, radius) of the first part of tariff i's territory."""
+    rng = np.random.default_rng((seed, TERRITORY, i, 0))
+    state = split_states(tariff['state'])[0]
+    lon, lat = model.state_centers.get(state, (-96.0, 38.0))
+    return lon + rng.normal(0, 0.8), lat + rng.normal(0, 0.6), float(rng.uniform(0.15, 1.0))
+
+
+def make_territory(model, tariff, i, seed=DEFAULT_SEED, max_vertices=1024):
+    """HIFLD-style territory feature for tariff i: one part per tariff state."""
+    rng = np.random.default_rng((seed, TERRITORY, i, 1))
+    polygons = []
+    for k, state in enumerate(split_states(tariff['state'])):
+        if k == 0:
+            lon, lat, radius = territory_anchor(model, tariff, i, seed)
+        else:
+            lon, lat = model.state_centers.get(state, (-96.0, 38.0))
+            lon, lat, radius = lon + rng.normal(0, 0.8), lat + rng.normal(0, 0.6), float(rng.uniform(0.15, 1.0))
+        vertices = int(rng.integers(64, max_vertices))
+        polygons.append([star_polygon(rng, lon, lat, radius, vertices)])
+
+    geometry = ({'type': 'Polygon', 'coordinates': polygons[0]} if len(polygons) == 1
+                else {'type': 'MultiPolygon', 'coordinates': polygons})
+    return {
+        'type': 'Feature',
+        'properties': {
+            'NAME': tariff['utility'].upper(),
+            'STATE': split_states(tariff['state'])[0],
+            'ID': str(900000 + i),
+            'tariff_utility': tariff['utility'],
+        },
+        'geometry': geometry,
+    }
+
+
+def data_center_model(layer=None):
+    """Capacity fit and (status, year) pairs from data_centers.geojson."""
+    layer = layer if layer is not None else read_layer('data_centers')
+    props = [f['properties'] for f in layer['features']]
+    return {
+        'capacity': lognormal_fit(p.get('capacity') for p in props) or (np.log(800), 0.7),
+        'status_years': Counter((p.get('status') or 'announced', p.get('year') or 2030) for p in props),
+    }
+
+
+def make_data_center(model, dc_model, tariff_for, n_tariffs, j, seed=DEFAULT_SEED):
+    """
+    Data center j inside the first part of a random tariff's territory.
+
+    tariff_for(i) returns tariff i (regenerated or looked up).
+    """
+    rng = np.random.default_rng((seed, DATA_CENTER, j))
+    i = int(rng.integers(n_tariffs))
+    tariff = tariff_for(i)
+    lon, lat, radius = territory_anchor(model, tariff, i, seed)
+    # Within half the radius the wobble (at most +-45%) cannot put the point outside
+    r, theta = radius * 0.5 * np.sqrt(rng.random()), rng.uniform(0, 2 * np.pi)
+    status, year = TariffModel.choice(rng, dc_model['status_years'])
+    return {
+        'type': 'Feature',
+        'properties': {
+            'name': f'Synthetic DC {j}',
+            'operator': str(rng.choice(OPERATORS)),
+            'capacity': int(round(float(np.exp(rng.normal(*dc_model['capacity']))), -1)) or 10,
+            'region': split_states(tariff['state'])[0].lower(),
+            'status': status,
+            'year': int(year),
+        },
+        'geometry': {'type': 'Point', 'coordinates': [round(lon + r * np.cos(theta), 5),
+                                                      round(lat + r * np.sin(theta) * 0.8, 5)]},
+    }
+
+
+def tariff_row(t, number=None, excel_row=None):
+    """
+    Tariff Database sheet row for a UTILITIES dict, in SHEET_HEADERS order.
+
+    With excel_row, the calculated columns get the same formulas as
+    create_workbook(); otherwise they are left empty.
+    """
+    yes_no = lambda v: 'Yes' if v else 'No'  # noqa: E731
+    r = excel_row
+    formulas = [None] * 4
+    if r is not None:
+        formulas = [
+            f'=((K{r}*600000)+(L{r}*600000*0.5)+((M{r}+O{r})*140160000)+((N{r}+O{r})*210240000)+500)/350400000',
+            f'=(Y{r}*350400000*12)/1000000',
+            (f'=IF(Q{r}>=90,3,IF(Q{r}>=80,2,IF(Q{r}>=60,1,0)))+IF(P{r}>=15,3,IF(P{r}>=10,2,IF(P{r}>=5,1,0)))'
+             f'+IF(S{r}="Yes",2,0)+IF(T{r}="Yes",2,0)+IF(U{r}="Yes",2,0)+IF(R{r}="Yes",1,0)'
+             f'+IF(V{r}="Yes",1,0)+IF(W{r}="Yes",2,0)+IF(X{r}="Yes",1,0)+IF(J{r}>=50,1,0)'),
+            f'=IF(AA{r}>=14,"High",IF(AA{r}>=8,"Mid","Low"))',
+        ]
+    return [
+        number, t.get('utility', ''), t.get('state', ''), t.get('region', ''), t.get('iso_rto', ''),
+        t.get('tariff_name', ''), t.get('rate_schedule', ''), t.get('effective_date', ''), t.get('status', ''),
+        t.get('min_load_mw', 0), t.get('peak_demand_charge', 0), t.get('off_peak_demand_charge', 0),
+        t.get('energy_rate_peak', 0), t.get('energy_rate_off_peak', 0), t.get('fuel_adjustment', 0),
+        t.get('contract_term_years', 0), t.get('ratchet_pct', 0),
+        yes_no(t.get('demand_ratchet')), yes_no(t.get('ciac_required')), yes_no(t.get('take_or_pay')),
+        yes_no(t.get('exit_fee')), yes_no(t.get('credit_requirements')), yes_no(t.get('dc_specific')),
+        yes_no(t.get('collateral_required')),
+        *formulas,
+        t.get('rate_components', ''), t.get('notes', ''),
+    ]
+
+
+def tariff_record(t):
+    """Tariff Database sheet row as a {header: value} dict (as pandas reads it, formulas unevaluated)."""
+    return dict(zip(SHEET_HEADERS, tariff_row(t)))
+
+
+def write_workbook(tariffs, path):
+    """Stream tariffs into a write-only workbook with the Tariff Database sheet layout."""
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_TITLE)
+    ws.append([SHEET_PARAMETERS])
+    ws.append(SHEET_HEADERS)
+    count = 0
+    for count, t in enumerate(tariffs, 1):
+        ws.append(tariff_row(t, count, count + 2))
+    wb.save(path)
+    return count
+
+
+class JsonArrayWriter:
+    """Writes a JSON array (optionally wrapped in an object) one element at a time."""
+
+    def __init__(self, path, head='[', tail=']'):
+        self.file = open(path, 'w')
+        self.file.write(head + '\n')
+        self.tail = tail
+        self.count = 0
+
+    def write(self, item):
+        if self.count:
+            self.file.write(',\n')
+        self.file.write(json.dumps(item, separators=(',', ':')))
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n' + self.tail + '\n')
+        self.file.close()
+
+
+def geojson_writer(path, metadata):
+    """Streaming FeatureCollection writer."""
+    head = '{"type":"FeatureCollection","metadata":' + json.dumps(metadata) + ',"features":['
+    return JsonArrayWriter(path, head=head, tail=']}')
+
+
+def generate(out, n_tariffs, n_data_centers, seed=DEFAULT_SEED, formats=FORMATS, include_real=False):
+    """
+    Write the synthetic dataset under `out` in the repository layout.
+
+    Returns:
+        Dict of output path -> record count
+    """
+    out = Path(out)
+    model = TariffModel()
+    written = {}
+
+    def tariffs():
+        return iter_tariffs(model, n_tariffs, seed, include_real)
+
+    if 'xlsx' in formats:
+        path = out / 'Large_Load_Tariff_Database_FINAL.xlsx'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        written[path] = write_workbook(tariffs(), path)
+
+    geo_dir = out / GEOJSON_SUBDIR
+    writers = {}
+    if 'json' in formats:
+        out.mkdir(parents=True, exist_ok=True)
+        writers['json'] = JsonArrayWriter(out / 'tariffs.json')
+    if 'geojson' in formats:
+        geo_dir.mkdir(parents=True, exist_ok=True)
+        writers['territories'] = geojson_writer(geo_dir / 'utility_territories.geojson', {
+            'source': 'synthetic_data.py', 'seed': seed, 'utility_count': n_tariffs})
+
+    # One pass over the tariffs feeds the JSON records and the territories
+    if writers:
+        for i, t in enumerate(tariffs()):
+            if 'json' in writers:
+                writers['json'].write(t)
+            if 'territories' in writers:
+                writers['territories'].write(make_territory(model, t, i, seed))
+        for key, writer in writers.items():
+            writer.close()
+            written[Path(writer.file.name)] = writer.count
+
+    if 'geojson' in formats and n_data_centers:
+        dc_model = data_center_model()
+        real = model.utilities if include_real else []
+
+        def tariff_for(i):
+            return real[i] if i < len(real) else make_tariff(model, i, seed)
+
+        writer = geojson_writer(geo_dir / 'data_centers.geojson', {
+            'source': 'synthetic_data.py', 'seed': seed, 'featureCount': n_data_centers})
+        for j in range(n_data_centers):
+            writer.write(make_data_center(model, dc_model, tariff_for, n_tariffs, j, seed))
+        writer.close()
+        written[Path(writer.file.name)] = writer.count
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate seeded synthetic tariffs, territories and data centers')
+    parser.add_argument('--tariffs', type=int, default=1000, help='Number of tariffs (and territories)')
+    parser.add_argument('--data-centers', type=int, default=None,
+                        help='Number of data center points (default: 3 per tariff)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Random seed')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS, help='Outputs to write')
+    parser.add_argument('--include-real', action='store_true',
+                        help='Start with the real UTILITIES entries and fill up with synthetic ones')
+    parser.add_argument('--out', default=str(DEFAULT_OUT), help='Output root (repository layout)')
+    args = parser.parse_args()
+
+    out = Path(args.out).resolve()
+    if (out / '.git').exists():
+        parser.error(f'refusing to overwrite the data of the git checkout {out}; '
+                     'write to a scratch copy of the repository instead')
+    n_data_centers = args.data_centers if args.data_centers is not None else 3 * args.tariffs
+
+    start = time.perf_counter()
+    written = generate(out, args.tariffs, n_data_centers, args.seed, args.formats, args.include_real)
+    elapsed = time.perf_counter() - start
+
+    print(f"Generated with seed {args.seed} in {elapsed:.1f}s:")
+    for path, count in written.items():
+        print(f"  {path.relative_to(out)}: {count:,} records ({path.stat().st_size / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
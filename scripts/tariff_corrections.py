@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Keyed, validated corrections for the tariff workbook.
+
+A correction set is a JSON file of patches (see qaqc_corrections.json):
+    {"table": "tariffs", "key": "we-energies-wi", "field": "Peak Demand ($/kW)",
+     "old": 21.62, "new": 22.59, "reason": "Per 2025/2026 tariff book"}
+
+Rows are found by key, never by position: tariff rows by their tariff ID
+(create_tariff_id of Utility and State, the same ID generatedTariffData.ts
+uses), citation rows by utility name. Fields are column headers. Each patch
+carries the value it expects to replace, so a patch written against another
+version of the data fails loudly instead of overwriting the wrong cell.
+
+A batch is planned before anything is written. One index lookup per patch
+resolves its cell, and the current value decides what happens to it:
+- equal to old: the patch is applied
+- already equal to new: skipped, so re-running a correction set is a no-op
+- anything else, or an unknown key or field: a problem
+If there is any problem, nothing is changed and CorrectionError lists them all.
+
+The same patches apply to the workbook file through XlsxPatcher (XlsxTable;
+only the edited sheets are rewritten, see xlsx_patch.py), to an openpyxl
+workbook (SheetTable), or to the in-memory tariff table from
+read_tariff_sheet() (FrameTable).
+
+Usage:
+    from tariff_corrections import load_corrections, xlsx_tables, apply_patches
+    corrections = load_corrections()
+    patcher = XlsxPatcher(workbook)
+    result = apply_patches(xlsx_tables(patcher), corrections['patches'])
+    patcher.save()
+"""
+
+import json
+import math
+import numbers
+from pathlib import Path
+
+import pandas as pd
+from openpyxl.utils.cell import get_column_letter
+
+from migrate_tariff_excel_to_ts import create_tariff_id
+
+CORRECTIONS_FILE = Path(__file__).parent / 'qaqc_corrections.json'
+
+PATCH_FIELDS = ['table', 'key', 'field', 'old', 'new', 'reason']
+
+
+def tariff_key(record):
+    """Tariff ID of a sheet row, or None for rows without a utility."""
+    utility = record.get('Utility')
+    if utility is None or (isinstance(utility, float) and math.isnan(utility)) or not str(utility).strip():
+        return None
+    state = record.get('State')
+    if state is None or (isinstance(state, float) and math.isnan(state)):
+        state = ''
+    return create_tariff_id(str(utility), state)
+
+
+def citation_key(record):
+    utility = record.get('Utility')
+    return str(utility).strip() if utility else None
+
+
+# table name -> (sheet title, header row, row key function)
+TABLES = {
+    'tariffs': ('Tariff Database', 2, tariff_key),
+    'citations': ('Document Citations', 1, citation_key),
+}
+
+
+class CorrectionError(ValueError):
+    """A correction set that does not apply cleanly; nothing was changed."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__(f"{len(problems)} correction problem(s):\n" + '\n'.join(f"  {p}" for p in problems))
+
+
+class Patch:
+    """One keyed cell edit."""
+
+    def __init__(self, table, key, field, old, new, reason=''):
+        self.table = table
+        self.key = key
+        self.field = field
+        self.old = old
+        self.new = new
+        self.reason = reason
+
+    @classmethod
+    def from_dict(cls, d):
+        missing = [f for f in PATCH_FIELDS[:5] if f not in d]
+        if missing:
+            raise CorrectionError([f"patch {d!r} is missing {', '.join(missing)}"])
+        return cls(**{f: d.get(f, '') for f in PATCH_FIELDS})
+
+    def to_dict(self):
+        return {f: getattr(self, f) for f in PATCH_FIELDS}
+
+    def __repr__(self):
+        return f"{self.table}[{self.key}].{self.field}"
+
+
+def load_corrections(path=CORRECTIONS_FILE):
+    """
+    Read a correction set.
+
+    Returns:
+        Dict with 'patches' (list of Patch) and the file's other keys
+        (audit name, source, summary lines)
+    """
+    with open(path) as f:
+        data = json.load(f)
+    data['patches'] = [Patch.from_dict(p) for p in data.get('patches', [])]
+    return data
+
+
+def blank(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or value == ''
+
+
+def values_equal(a, b):
+    """Cell equality: numbers within rounding error, strings ignoring surrounding space, blanks alike."""
+    if blank(a) or blank(b):
+        return blank(a) and blank(b)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    return str(a).strip() == str(b).strip()
+
+
+class SheetTable:
+    """An openpyxl worksheet addressed by row key and column header."""
+
+    def __init__(self, ws, header_row, key):
+        self.ws = ws
+        self.header_row = header_row
+        self.columns = {}
+        for col, cell in enumerate(ws[header_row], 1):
+            if cell.value is not None:
+                self.columns.setdefault(str(cell.value).strip(), col)
+
+        headers = list(self.columns)
+        self.index = {}
+        self.duplicates = set()
+        first = header_row + 1
+        for offset, values in enumerate(ws.iter_rows(min_row=first, values_only=True)):
+            record = {h: values[self.columns[h] - 1] for h in headers if self.columns[h] <= len(values)}
+            k = key(record)
+            if k is None:
+                continue
+            if k in self.index:
+                self.duplicates.add(k)
+            self.index[k] = first + offset
+
+    def get(self, row, field):
+        return self.ws.cell(row, self.columns[field]).value
+
+    def set(self, row, field, value):
+        self.ws.cell(row, self.columns[field], value=value)
+
+    def location(self, row, field):
+        return f"{self.ws.title}!{self.ws.cell(row, self.columns[field]).coordinate}"
+
+
+class XlsxTable:
+    """A worksheet read and patched through XlsxPatcher (no openpyxl load/save)."""
+
+    def __init__(self, patcher, sheet, header_row, key):
+        self.patcher = patcher
+        self.sheet = sheet
+        self.header_row = header_row
+        rows = patcher.values(sheet)
+        self.columns = {}
+        for col, value in sorted(rows.get(header_row, {}).items()):
+            if value is not None:
+                self.columns.setdefault(str(value).strip(), col)
+
+        self.index = {}
+        self.duplicates = set()
+        for row in sorted(r for r in rows if r > header_row):
+            cells = rows[row]
+            k = key({h: cells.get(col) for h, col in self.columns.items()})
+            if k is None:
+                continue
+            if k in self.index:
+                self.duplicates.add(k)
+            self.index[k] = row
+
+    def get(self, row, field):
+        return self.patcher.get(self.sheet, row, self.columns[field])
+
+    def set(self, row, field, value):
+        self.patcher.set(self.sheet, row, self.columns[field], value)
+
+    def location(self, row, field):
+        return f"{self.sheet}!{get_column_letter(self.columns[field])}{row}"
+
+
+class FrameTable:
+    """A DataFrame (e.g. from read_tariff_sheet) addressed by row key and column name."""
+
+    def __init__(self, df, key):
+        self.df = df
+        self.columns = {str(c).strip(): i for i, c in enumerate(df.columns)}
+        self.index = {}
+        self.duplicates = set()
+        for pos, record in enumerate(df.to_dict('records')):
+            k = key(record)
+            if k is None:
+                continue
+            if k in self.index:
+                self.duplicates.add(k)
+            self.index[k] = pos
+
+    def get(self, pos, field):
+        value = self.df.iat[pos, self.columns[field]]
+        if pd.isna(value):
+            return None
+        return value.item() if hasattr(value, 'item') else value
+
+    def set(self, pos, field, value):
+        col = self.columns[field]
+        try:
+            self.df.iat[pos, col] = value
+        except (TypeError, ValueError):
+            # The column's dtype cannot hold the value (62.5 in an int64 column, a number
+            # in a str column): widen it to float64 for numbers, object otherwise
+            name = self.df.columns[col]
+            number = isinstance(value, numbers.Real) and not isinstance(value, bool)
+            widened = float if number and pd.api.types.is_numeric_dtype(self.df[name]) else object
+            self.df[name] = self.df[name].astype(widened)
+            self.df.iat[pos, col] = value
+
+    def location(self, pos, field):
+        return f"row {pos}"
+
+
+def workbook_tables(wb):
+    """SheetTables for every known table present in an openpyxl workbook."""
+    return {name: SheetTable(wb[sheet], header_row, key)
+            for name, (sheet, header_row, key) in TABLES.items() if sheet in wb.sheetnames}
+
+
+def xlsx_tables(patcher):
+    """XlsxTables for every known table present in a workbook opened with XlsxPatcher."""
+    return {name: XlsxTable(patcher, sheet, header_row, key)
+            for name, (sheet, header_row, key) in TABLES.items() if sheet in patcher.sheetnames}
+
+
+def frame_tables(df):
+    """Tables for the in-memory tariff table from read_tariff_sheet()."""
+    return {'tariffs': FrameTable(df, tariff_key)}
+
+
+def plan_patches(tables, patches):
+    """
+    Resolve and validate patches without changing anything.
+
+    Returns:
+        (pending [(patch, table, row)], applied [patch], problems [str])
+    """
+    pending, applied, problems = [], [], []
+    targets = {}
+    for position, patch in enumerate(patches, 1):
+        table = tables.get(patch.table)
+        if table is None:
+            problems.append(f"{patch!r}: unknown table '{patch.table}'")
+            continue
+        if patch.field not in table.columns:
+            problems.append(f"{patch!r}: unknown field '{patch.field}'")
+            continue
+        row = table.index.get(patch.key)
+        if row is None:
+            problems.append(f"{patch!r}: no row with key '{patch.key}'")
+            continue
+        if patch.key in table.duplicates:
+            problems.append(f"{patch!r}: key '{patch.key}' matches more than one row")
+            continue
+        target = (patch.table, patch.key, patch.field)
+        if target in targets:
+            problems.append(f"{patch!r}: cell is also patched by patch #{targets[target]}")
+            continue
+        targets[target] = position
+
+        current = table.get(row, patch.field)
+        if values_equal(current, patch.old):
+            pending.append((patch, table, row))
+        elif values_equal(current, patch.new):
+            applied.append(patch)
+        else:
+            problems.append(f"{patch!r} at {table.location(row, patch.field)}: "
+                            f"expected {patch.old!r}, found {current!r}")
+    return pending, applied, problems
+
+
+def apply_patches(tables, patches, dry_run=False):
+    """
+    Apply a batch of patches, all or nothing.
+
+    Raises:
+        CorrectionError: listing every patch that does not apply cleanly
+
+    Returns:
+        Dict with 'applied' [(patch, old value, location)] and 'skipped'
+        (patches whose new value was already in place)
+    """
+    pending, already, problems = plan_patches(tables, patches)
+    if problems:
+        raise CorrectionError(problems)
+
+    applied, written = [], []
+    try:
+        for patch, table, row in pending:
+            old = table.get(row, patch.field)
+            if not dry_run:
+                table.set(row, patch.field, patch.new)
+                written.append((table, row, patch.field, old))
+            applied.append((patch, old, table.location(row, patch.field)))
+    except Exception:
+        # Put back the cells written before the failure, so the batch stays all or nothing
+        for table, row, field, old in reversed(written):
+            table.set(row, field, old)
+        raise
+    return {'applied': applied, 'skipped': already}
+
+
+def verify_patches(tables, patches):
+    """Patches whose new value is not in place (empty when a batch fully applied)."""
+    pending, _, problems = plan_patches(tables, patches)
+    return [repr(p) for p, _, _ in pending] + problems
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Append-only change journal for the tariff database.
+
+Every tariff mutation is one journal entry: sequence number, timestamp,
+operation ('set' or 'remove'), tariff ID, field (a Tariff Database column),
+old value, new value, reason and source document. Entries are written by:
+- apply_qaqc_corrections.py: each applied tariff patch, with its reason
+- add_more_utilities.py: the fields of each added utility
+- migrate_tariff_excel_to_ts.py: whatever differs between the workbook it
+  reads and the journal's current state (a regenerated or hand-edited
+  workbook), including tariffs that are no longer in it
+- watch_pipeline.py: the same, whenever it patches generatedTariffData.ts
+
+The field-level writers first record a baseline of the unchanged workbook
+when the journal is empty (TariffJournal.ensure_baseline).
+
+Only input cells are journaled: formulas, row numbers and blank columns are
+left out.
+
+Layout (tariff_journal/ at the repository root):
+    segments/00000000.json   entries stored column-wise; one file per append,
+                             named by its first sequence number, never rewritten
+    snapshots/00001000.json  full state after the first 1000 entries
+    tags.jsonl               named points in the journal (releases)
+
+The state as of a date or tag is the nearest snapshot at or before it plus
+the entries after that snapshot. For a single tariff only its own entries are
+replayed; they are found through a per-tariff index of sequence numbers built
+when the journal is loaded. A snapshot is written every SNAPSHOT_EVERY entries
+and at every tag, so replay never covers more than that many entries.
+
+Usage:
+    python scripts/tariff_journal.py log --tariff we-energies-wi
+    python scripts/tariff_journal.py show florida-power-and-light-fpl-fl --as-of 2026-01-15
+    python scripts/tariff_journal.py changes --since release-2026.02
+    python scripts/tariff_journal.py tag release-2026.02
+    python scripts/tariff_journal.py export tariffs_2026-02.json --as-of release-2026.02
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from diff_tariff_db import ROW_NUMBER_COLUMNS, load_workbook_table, normalize
+from tariff_corrections import tariff_key, values_equal
+
+JOURNAL_DIR = Path(__file__).parent.parent / 'tariff_journal'
+COLUMNS = ['seq', 'ts', 'op', 'tariff_id', 'field', 'old', 'new', 'reason', 'source']
+SNAPSHOT_EVERY = 1000
+
+DATE_RE = re.compile(r'^\d{4}(-\d{2}){0,2}([T ][\d:]+Z?)?$')
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def clean(value):
+    """JSON-safe journal value: numpy scalars unwrapped, dates as ISO strings, blanks as None."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat() if value == value else None
+    if hasattr(value, 'item'):
+        value = value.item()
+    return normalize(value)
+
+
+def record_fields(record):
+    """Journaled fields of a sheet row: input cells only (no row numbers, formulas or unnamed columns)."""
+    fields = {}
+    for field, value in record.items():
+        field = str(field).strip()
+        if field in ROW_NUMBER_COLUMNS or field.startswith('Unnamed:'):
+            continue
+        value = clean(value)
+        if isinstance(value, str) and value.startswith('='):
+            continue
+        fields[field] = value
+    return fields
+
+
+class TariffJournal:
+    """The journal at path, loaded column-wise with a per-tariff index."""
+
+    def __init__(self, path=JOURNAL_DIR):
+        self.path = Path(path)
+        self.columns = {c: [] for c in COLUMNS}
+        self.index = {}
+        self._snapshots = {}
+
+        for segment in sorted((self.path / 'segments').glob('*.json')):
+            with open(segment) as f:
+                columns = json.load(f)['columns']
+            if int(segment.stem) != len(self):
+                raise ValueError(f"{segment}: expected a segment starting at {len(self)}")
+            self._extend(columns)
+
+        self.tags = {}
+        tags_file = self.path / 'tags.jsonl'
+        if tags_file.exists():
+            with open(tags_file) as f:
+                for line in f:
+                    if line.strip():
+                        tag = json.loads(line)
+                        self.tags[tag['label']] = tag
+
+    def __len__(self):
+        return len(self.columns['seq'])
+
+    def _extend(self, columns):
+        start = len(self)
+        for c in COLUMNS:
+            self.columns[c].extend(columns[c])
+        for offset, tariff_id in enumerate(columns['tariff_id']):
+            self.index.setdefault(tariff_id, []).append(start + offset)
+
+    # Writing
+
+    def append(self, entries):
+        """
+        Append entries (dicts with op, tariff_id, field, old, new, reason, source) as one segment.
+
+        Returns:
+            Number of entries written
+        """
+        entries = list(entries)
+        if not entries:
+            return 0
+        start = len(self)
+        # Timestamps never go backwards, so as-of lookups can bisect them
+        ts = max(now(), self.columns['ts'][-1]) if start else now()
+        columns = {c: [] for c in COLUMNS}
+        for offset, entry in enumerate(entries):
+            columns['seq'].append(start + offset)
+            columns['ts'].append(ts)
+            columns['op'].append(entry.get('op', 'set'))
+            for c in ('tariff_id', 'field', 'reason', 'source'):
+                columns[c].append(entry.get(c))
+            columns['old'].append(clean(entry.get('old')))
+            columns['new'].append(clean(entry.get('new')))
+
+        segment = self.path / 'segments' / f'{start:08d}.json'
+        if segment.exists():
+            raise FileExistsError(f"{segment} already exists; the journal changed while loaded")
+        self._write_json(segment, {'columns': columns})
+        self._extend(columns)
+
+        snapshots = self.snapshot_seqs()
+        if len(self) - (snapshots[-1] if snapshots else 0) >= SNAPSHOT_EVERY:
+            self.snapshot()
+        return len(entries)
+
+    def _write_json(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f, separators=(',', ':'), default=str)
+        os.replace(tmp, path)
+
+    def snapshot(self):
+        """Write the full current state as a snapshot; returns its sequence number."""
+        seq = len(self)
+        path = self.path / 'snapshots' / f'{seq:08d}.json'
+        if not path.exists():
+            state = self.state()
+            self._write_json(path, {'seq': seq, 'ts': self.columns['ts'][-1] if seq else None, 'state': state})
+            self._snapshots[seq] = state
+        return seq
+
+    def tag(self, label):
+        """Name the current point of the journal (e.g. a release) and snapshot it."""
+        if label in self.tags:
+            raise ValueError(f"tag '{label}' already exists (seq {self.tags[label]['seq']})")
+        if DATE_RE.match(label):
+            raise ValueError(f"tag '{label}' would be read as a date")
+        seq = self.snapshot()
+        tag = {'label': label, 'seq': seq, 'ts': now()}
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / 'tags.jsonl', 'a') as f:
+            f.write(json.dumps(tag) + '\n')
+        self.tags[label] = tag
+        return tag
+
+    def changes_for(self, records, reason='', source='', complete=True):
+        """
+        Entries that bring the journal's current state to the given sheet rows.
+
+        complete=True means records are the whole table: tariffs missing from
+        them are removed and fields missing from a record are cleared.
+        """
+        state = self.state()
+        entries = []
+        seen = set()
+        for record in records:
+            tariff_id = tariff_key(record)
+            # Rows without a utility are not tariffs; for duplicate IDs the first row wins
+            if tariff_id is None or tariff_id in seen:
+                continue
+            seen.add(tariff_id)
+            current = state.get(tariff_id, {})
+            fields = record_fields(record)
+            if complete:
+                fields.update({f: None for f in current if f not in fields})
+            for field, value in fields.items():
+                if not values_equal(current.get(field), value):
+                    entries.append({'op': 'set', 'tariff_id': tariff_id, 'field': field,
+                                    'old': current.get(field), 'new': value, 'reason': reason, 'source': source})
+        if complete:
+            for tariff_id in sorted(state.keys() - seen):
+                entries.append({'op': 'remove', 'tariff_id': tariff_id, 'field': None,
+                                'old': None, 'new': None, 'reason': reason, 'source': source})
+        return entries
+
+    def sync(self, records, reason='', source='', complete=True):
+        """Journal the differences between the current state and records; returns how many."""
+        return self.append(self.changes_for(records, reason, source, complete))
+
+    def sync_workbook(self, path, reason=''):
+        """Journal the differences between the current state and a workbook's tariff sheet."""
+        table = load_workbook_table(path)
+        return self.sync(table.rows.values(), reason, source=Path(path).name)
+
+    def ensure_baseline(self, path, reason='Baseline before first journaled change'):
+        """
+        On an empty journal, record a workbook's tariffs as they are now.
+
+        Writers that journal single fields (patches, added rows) call this
+        before changing the workbook, so their entries apply to complete
+        tariffs instead of creating tariffs that have only those fields.
+        Returns how many entries were written.
+        """
+        if len(self):
+            return 0
+        return self.sync_workbook(path, reason)
+
+    # Reading
+
+    def snapshot_seqs(self):
+        folder = self.path / 'snapshots'
+        return sorted(int(p.stem) for p in folder.glob('*.json')) if folder.exists() else []
+
+    def _snapshot_state(self, seq):
+        if seq not in self._snapshots:
+            with open(self.path / 'snapshots' / f'{seq:08d}.json') as f:
+                self._snapshots[seq] = json.load(f)['state']
+        return self._snapshots[seq]
+
+    def _base(self, end):
+        """Nearest snapshot at or before end: (seq, its state). Copy before changing the state."""
+        seqs = [s for s in self.snapshot_seqs() if s <= end]
+        if not seqs:
+            return 0, {}
+        return seqs[-1], self._snapshot_state(seqs[-1])
+
+    def _apply(self, state, seq):
+        tariff_id = self.columns['tariff_id'][seq]
+        if self.columns['op'][seq] == 'remove':
+            state.pop(tariff_id, None)
+            return
+        fields = state.setdefault(tariff_id, {})
+        new = self.columns['new'][seq]
+        if new is None:
+            fields.pop(self.columns['field'][seq], None)
+        else:
+            fields[self.columns['field'][seq]] = new
+
+    def resolve(self, point):
+        """Sequence number at a tag, a date or timestamp prefix ('2026-02', '2026-02-01'), or the end (None)."""
+        if point is None:
+            return len(self)
+        if point in self.tags:
+            return self.tags[point]['seq']
+        if not DATE_RE.match(point):
+            raise ValueError(f"'{point}' is neither a tag ({', '.join(self.tags) or 'none'}) nor a date")
+        point = point.replace(' ', 'T')
+        return bisect_right(self.columns['ts'], point, key=lambda ts: ts[:len(point)])
+
+    def state(self, as_of=None):
+        """All tariffs {tariff ID: {field: value}} as of a tag or date."""
+        end = self.resolve(as_of)
+        start, base = self._base(end)
+        state = {tariff_id: dict(fields) for tariff_id, fields in base.items()}
+        for seq in range(start, end):
+            self._apply(state, seq)
+        return state
+
+    def tariff(self, tariff_id, as_of=None):
+        """One tariff's fields as of a tag or date (None if it did not exist)."""
+        end = self.resolve(as_of)
+        start, base = self._base(end)
+        state = {tariff_id: dict(base[tariff_id])} if tariff_id in base else {}
+        positions = self.index.get(tariff_id, [])
+        for seq in positions[bisect_left(positions, start):bisect_left(positions, end)]:
+            self._apply(state, seq)
+        return state.get(tariff_id)
+
+    def entries(self, since=None, until=None, tariff_id=None):
+        """Journal entries after since up to until, optionally for one tariff."""
+        start = self.resolve(since) if since is not None else 0
+        end = self.resolve(until)
+        if tariff_id is not None:
+            positions = self.index.get(tariff_id, [])
+            seqs = positions[bisect_left(positions, start):bisect_left(positions, end)]
+        else:
+            seqs = range(start, end)
+        return [{c: self.columns[c][seq] for c in COLUMNS} for seq in seqs]
+
+    def changes(self, since, until=None):
+        """
+        Net changes between two points, each with the last entry's reason and source.
+
+        Returns:
+            Dict with 'added' and 'removed' tariff IDs and 'changed'
+            [{tariff_id, field, old, new, reason, source, ts}]
+        """
+        before, after = self.state(since), self.state(until)
+        last = {}
+        for entry in self.entries(since, until):
+            last[(entry['tariff_id'], entry['field'])] = entry
+
+        changed = []
+        for tariff_id in sorted(before.keys() & after.keys()):
+            a, b = before[tariff_id], after[tariff_id]
+            for field in sorted(a.keys() | b.keys()):
+                if not values_equal(a.get(field), b.get(field)):
+                    entry = last.get((tariff_id, field), {})
+                    changed.append({'tariff_id': tariff_id, 'field': field, 'old': a.get(field), 'new': b.get(field),
+                                    'reason': entry.get('reason'), 'source': entry.get('source'),
+                                    'ts': entry.get('ts')})
+        return {'added': sorted(after.keys() - before.keys()),
+                'removed': sorted(before.keys() - after.keys()),
+                'changed': changed}
+
+
+def format_entry(entry):
+    if entry['op'] == 'remove':
+        change = 'removed'
+    else:
+        change = f"{entry['field']}: {entry['old']!r} → {entry['new']!r}"
+    note = '; '.join(str(x) for x in (entry['reason'], entry['source']) if x)
+    return f"{entry['seq']:>7} {entry['ts']} {entry['tariff_id']} {change}" + (f"  ({note})" if note else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the tariff change journal')
+    parser.add_argument('--journal', default=str(JOURNAL_DIR), help='Journal directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    log = commands.add_parser('log', help='List journal entries')
+    log.add_argument('--tariff', default=None, help='Only this tariff ID')
+    log.add_argument('--since', default=None, help='Tag or date (exclusive)')
+    log.add_argument('--until', default=None, help='Tag or date (inclusive)')
+
+    show = commands.add_parser('show', help="A tariff's fields as of a tag or date")
+    show.add_argument('tariff')
+    show.add_argument('--as-of', default=None, help='Tag or date (default: now)')
+
+    changes = commands.add_parser('changes', help='Net changes since a tag or date')
+    changes.add_argument('--since', required=True, help='Tag or date')
+    changes.add_argument('--until', default=None, help='Tag or date (default: now)')
+
+    tag = commands.add_parser('tag', help='Name the current point (e.g. a release)')
+    tag.add_argument('label')
+
+    export = commands.add_parser('export', help='Write all tariffs as of a tag or date to JSON')
+    export.add_argument('output')
+    export.add_argument('--as-of', default=None, help='Tag or date (default: now)')
+
+    commands.add_parser('snapshot', help='Write a snapshot of the current state')
+
+    args = parser.parse_args()
+    journal = TariffJournal(args.journal)
+
+    try:
+        if args.command == 'log':
+            for entry in journal.entries(args.since, args.until, args.tariff):
+                print(format_entry(entry))
+        elif args.command == 'show':
+            fields = journal.tariff(args.tariff, args.as_of)
+            if fields is None:
+                print(f"{args.tariff}: no such tariff as of {args.as_of or 'now'}")
+                sys.exit(1)
+            width = max(len(f) for f in fields) if fields else 0
+            for field, value in fields.items():
+                print(f"  {field:<{width}}  {value}")
+        elif args.command == 'changes':
+            result = journal.changes(args.since, args.until)
+            for tariff_id in result['removed']:
+                print(f"- {tariff_id}")
+            for tariff_id in result['added']:
+                print(f"+ {tariff_id}")
+            for c in result['changed']:
+                note = '; '.join(str(x) for x in (c['reason'], c['source']) if x)
+                print(f"~ {c['tariff_id']} {c['field']}: {c['old']!r} → {c['new']!r}" + (f"  ({note})" if note else ''))
+            print(f"\n{len(result['added'])} added, {len(result['removed'])} removed, "
+                  f"{len(result['changed'])} field(s) changed")
+        elif args.command == 'tag':
+            tag = journal.tag(args.label)
+            print(f"Tagged '{tag['label']}' at entry {tag['seq']}")
+        elif args.command == 'export':
+            state = journal.state(args.as_of)
+            with open(args.output, 'w') as f:
+                json.dump([{'id': tariff_id, **fields} for tariff_id, fields in sorted(state.items())], f, indent=2)
+            print(f"Wrote {len(state)} tariffs to {args.output}")
+        elif args.command == 'snapshot':
+            print(f"Snapshot at entry {journal.snapshot()}")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
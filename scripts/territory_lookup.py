@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Point-in-territory lookup: lat/lon -> serving tariff utility and tariff record.
+
+Built on utility_territories.geojson from download_hifld_territories.py. The
+territory polygons are converted once into flat coordinate/offset arrays
+(.npy files under scripts/.cache/territory_lookup) that later starts load
+memory-mapped, rebuild into geometries with shapely.from_ragged_array, prepare,
+and index in an STRtree. Batches of points are answered with one vectorized
+query; overlapping territories resolve to the smallest one, as in
+join_data_centers.py.
+
+The buffers are rebuilt automatically when the territory layer changes.
+
+Usage:
+    python scripts/territory_lookup.py 36.16 -86.78
+    python scripts/territory_lookup.py --serve --port 8765
+
+    from territory_lookup import TerritoryLookup
+    lookup = TerritoryLookup()
+    lookup.lookup(36.16, -86.78)
+    lookup.lookup_many([(36.16, -86.78), (41.26, -95.93)])
+
+HTTP:
+    GET  /lookup?lat=36.16&lon=-86.78
+    POST /lookup  with body [[lat, lon], ...]
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, shape
+
+from generated_tariffs import tariffs_by_utility
+from geo_layers import layer_path, read_layer
+from join_data_centers import assign_points
+
+BUFFER_DIR = Path(__file__).parent / '.cache' / 'territory_lookup'
+
+
+def build_buffers(layer='utility_territories', directory=BUFFER_DIR):
+    """
+    Convert a territory layer into memory-mappable coordinate buffers.
+
+    Writes coords.npy, offsets_0..2.npy and meta.json (utility names, feature
+    IDs, equal-length arrays, and the source layer's size/mtime).
+    """
+    source = layer_path(layer)
+    features = [f for f in read_layer(layer)['features'] if f.get('geometry')]
+
+    geoms = []
+    for f in features:
+        geom = shape(f['geometry'])
+        geoms.append(MultiPolygon([geom]) if geom.geom_type == 'Polygon' else geom)
+    _, coords, offsets = shapely.to_ragged_array(np.array(geoms, dtype=object))
+
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / 'coords.npy', coords)
+    for i, offset in enumerate(offsets):
+        np.save(directory / f'offsets_{i}.npy', offset)
+
+    stat = source.stat()
+    meta = {
+        'layer': layer,
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+        'offset_levels': len(offsets),
+        'utilities': [f['properties'].get('tariff_utility') for f in features],
+        'names': [f['properties'].get('NAME') for f in features],
+    }
+    with open(directory / 'meta.json', 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def buffers_current(layer='utility_territories', directory=BUFFER_DIR):
+    """True if the buffers exist and were built from the layer as it is now."""
+    meta_path = directory / 'meta.json'
+    if not meta_path.exists():
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    stat = layer_path(layer).stat()
+    return (meta.get('layer') == layer and meta.get('source_size') == stat.st_size
+            and meta.get('source_mtime') == stat.st_mtime)
+
+
+class TerritoryLookup:
+    """
+    Serving-utility lookups against prepared territory polygons.
+
+    Loads the buffers once (memory-mapped), so constructing a lookup costs a
+    few milliseconds and each query touches only the candidate polygons.
+    """
+
+    def __init__(self, layer='utility_territories', directory=BUFFER_DIR, tariffs=None):
+        if not buffers_current(layer, directory):
+            build_buffers(layer, directory)
+
+        with open(directory / 'meta.json') as f:
+            meta = json.load(f)
+        coords = np.load(directory / 'coords.npy', mmap_mode='r')
+        offsets = tuple(np.load(directory / f'offsets_{i}.npy', mmap_mode='r')
+                        for i in range(meta['offset_levels']))
+
+        geoms = shapely.from_ragged_array(shapely.GeometryType.MULTIPOLYGON, coords, offsets)
+        shapely.prepare(geoms)
+
+        self.utilities = np.array(meta['utilities'], dtype=object)
+        self.names = meta['names']
+        self.index = (shapely.STRtree(geoms), self.utilities, shapely.area(geoms))
+        self.tariffs = tariffs if tariffs is not None else tariffs_by_utility()
+
+    def lookup_many(self, points):
+        """
+        Resolve a batch of (lat, lon) points.
+
+        Returns:
+            List of dicts with tariff_utility, hifld_name and tariff (None when
+            the point is outside every territory)
+        """
+        latlon = np.asarray(points, dtype=float).reshape(-1, 2)
+        assigned = assign_points(self.index, latlon[:, ::-1])
+
+        results = []
+        for i in assigned:
+            if i < 0:
+                results.append({'tariff_utility': None, 'hifld_name': None, 'tariff': None})
+                continue
+            utility = self.utilities[i]
+            results.append({
+                'tariff_utility': utility,
+                'hifld_name': self.names[i],
+                'tariff': self.tariffs.get(utility),
+            })
+        return results
+
+    def lookup(self, lat, lon):
+        """Resolve a single point."""
+        return self.lookup_many([(lat, lon)])[0]
+
+
+def make_handler(lookup):
+    """HTTP handler class bound to a TerritoryLookup."""
+
+    class LookupHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/lookup':
+                return self.send_json(404, {'error': 'not found'})
+            params = parse_qs(url.query)
+            try:
+                lat, lon = float(params['lat'][0]), float(params['lon'][0])
+            except (KeyError, ValueError):
+                return self.send_json(400, {'error': 'lat and lon query parameters are required'})
+            self.send_json(200, lookup.lookup(lat, lon))
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/lookup':
+                return self.send_json(404, {'error': 'not found'})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                points = json.loads(self.rfile.read(length))
+                results = lookup.lookup_many(points) if points else []
+            except (ValueError, TypeError) as e:
+                return self.send_json(400, {'error': f'expected a JSON list of [lat, lon] pairs: {e}'})
+            self.send_json(200, results)
+
+        def log_message(self, format, *args):
+            pass
+
+    return LookupHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Look up the serving utility and tariff for a location')
+    parser.add_argument('lat', type=float, nargs='?', help='Latitude')
+    parser.add_argument('lon', type=float, nargs='?', help='Longitude')
+    parser.add_argument('--layer', default='utility_territories', help='Territory layer name')
+    parser.add_argument('--serve', action='store_true', help='Run a local HTTP lookup service')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind with --serve')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind with --serve')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the coordinate buffers first')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build_buffers(args.layer)
+
+    start = time.perf_counter()
+    lookup = TerritoryLookup(args.layer)
+    print(f"Loaded {len(lookup.utilities)} territories in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(lookup))
+        print(f"Serving on http://{args.host}:{args.port}/lookup")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+        return
+
+    if args.lat is None or args.lon is None:
+        parser.error('lat and lon are required unless --serve is given')
+
+    result = lookup.lookup(args.lat, args.lon)
+    if result['tariff_utility'] is None:
+        print(f"No mapped utility territory at ({args.lat}, {args.lon})")
+        return
+    tariff = result['tariff'] or {}
+    print(f"{result['tariff_utility']} ({result['hifld_name']})")
+    if tariff:
+        print(f"  Tariff: {tariff.get('id')} - {tariff.get('tariff_name')}")
+        print(f"  Blended rate: ${tariff.get('blendedRatePerKWh')}/kWh, ISO/RTO: {tariff.get('iso_rto')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Data-quality checks for the Tariff Database sheet, run before codegen.
+
+Errors like the We Energies demand charge ($305/kW instead of $21.62/kW) and
+missing fuel riders were only caught by external review (see the header of
+create_corrected_tariff_db.py). This runs the whole table through a few
+vectorized passes over the sheet DataFrame (read_tariff_sheet()):
+
+- schema: required columns, non-numeric values in numeric columns, blank
+  states, duplicate tariff IDs (errors)
+- ranges: each numeric field and the computed blended rate against
+  plausible bounds (errors)
+- outliers: robust z-score, 0.6745 * (x - median) / MAD, of demand
+  charges, energy rates and the blended rate, compared within the tariff's
+  region and ISO/RTO. Groups smaller than MIN_GROUP_SIZE fall back to the
+  region, then the ISO/RTO, then all tariffs. Zeros (energy-only or
+  demand-only tariffs) are left out. |z| > OUTLIER_Z is a warning when the
+  value is also at least MIN_RELATIVE_DEVIATION away from the median.
+- cross-field rules: TOU rates ordered (peak >= off-peak), Ratchet % only
+  with a demand ratchet, a fuel rider listed in Rate Components but no
+  Fuel/Rider Adj, an Active tariff without an effective date (warnings)
+
+The report is ranked: errors first, then by score (|z| for outliers, the
+relative size of the violation otherwise). migrate_tariff_excel_to_ts.py
+refuses to generate code while there are errors, and build.py runs this as
+the 'validate' stage ahead of tariff_ts.
+
+Usage:
+    python scripts/validate_tariffs.py
+    python scripts/validate_tariffs.py --json report.json --strict
+    python scripts/validate_tariffs.py --workbook other.xlsx --limit 50
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from migrate_tariff_excel_to_ts import EXCEL_FILE, calculate_blended_rate, create_tariff_id, read_tariff_sheet
+
+# Spreadsheet row of the first data row (header on row 2)
+FIRST_DATA_ROW = 3
+
+REQUIRED_COLUMNS = ['Utility', 'State', 'Region', 'ISO/RTO', 'Status', 'Effective Date',
+                    'Peak Demand ($/kW)', 'Off-Peak Demand', 'Energy Peak ($/kWh)', 'Energy Off-Peak',
+                    'Fuel/Rider Adj', 'Contract (Yrs)', 'Ratchet %', 'Demand Ratchet']
+
+# field -> (min, max); values outside are errors
+RANGES = {
+    'Min Load (MW)': (0, 2000),
+    'Peak Demand ($/kW)': (0, 50),
+    'Off-Peak Demand': (0, 30),
+    'Energy Peak ($/kWh)': (0, 0.30),
+    'Energy Off-Peak': (0, 0.30),
+    'Fuel/Rider Adj': (0, 0.08),
+    'Contract (Yrs)': (0, 40),
+    'Ratchet %': (0, 100),
+    'Blended Rate': (0.01, 0.40),
+}
+
+OUTLIER_FIELDS = ['Peak Demand ($/kW)', 'Off-Peak Demand', 'Energy Peak ($/kWh)', 'Energy Off-Peak', 'Blended Rate']
+OUTLIER_GROUPS = [['Region', 'ISO/RTO'], ['Region'], ['ISO/RTO'], []]
+OUTLIER_Z = 3.5
+MIN_GROUP_SIZE = 5
+# Tight groups have tiny MADs; an outlier must also be this far from the median (0.5: 1.5x or 1/1.5x)
+MIN_RELATIVE_DEVIATION = 0.5
+
+# Rate Components wording that means a fuel or power-cost rider is part of the rate
+FUEL_RIDER_PATTERN = r'\b(?:Fuel|FAC|FAR|FCA|PCA|PPFAC|FPPAC|PSA)\b'
+
+SEVERITY_RANK = {'error': 0, 'warning': 1}
+REPORT_COLUMNS = ['severity', 'rule', 'row', 'field', 'value', 'score', 'message']
+
+
+def numeric(df, column):
+    if column not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+
+
+def text(df, column):
+    """A column as stripped strings, blanks as ''."""
+    if column not in df:
+        return np.full(len(df), '', dtype=object)
+    return df[column].fillna('').astype(str).str.strip().to_numpy(dtype=object)
+
+
+def flagged(mask, severity, rule, field, value, score, message):
+    """
+    Report rows for the positions selected by mask.
+
+    value and score are arrays or scalars; message is a string or a function
+    of the selected positions returning one string per position, so messages
+    are only formatted for flagged rows.
+    """
+    if not mask.any():
+        return None
+    picked = np.flatnonzero(mask)
+    pick = lambda x: x[picked] if isinstance(x, np.ndarray) else x
+    return pd.DataFrame({'severity': severity, 'rule': rule, 'row': picked, 'field': field,
+                         'value': pick(value), 'score': pick(score),
+                         'message': message(picked) if callable(message) else message})
+
+
+def prepare(df):
+    """Tariff rows only (non-blank Utility) as numpy arrays: numeric fields, blended rate, groups, IDs."""
+    utility = text(df, 'Utility')
+    keep = (utility != '') & (utility != 'nan')
+    df = df[keep]
+    table = {'utility': utility[keep], 'sheet_row': df.index.to_numpy() + FIRST_DATA_ROW}
+    for column in RANGES:
+        if column != 'Blended Rate':
+            table[column] = numeric(df, column)
+    rates = [np.nan_to_num(table[c]) for c in ['Peak Demand ($/kW)', 'Off-Peak Demand', 'Energy Peak ($/kWh)',
+                                                'Energy Off-Peak', 'Fuel/Rider Adj']]
+    table['Blended Rate'] = calculate_blended_rate(*rates)
+    for column in ['Region', 'ISO/RTO']:
+        values = text(df, column)
+        table[column] = np.where(values == '', 'None', values)
+    table['State'] = text(df, 'State')
+    return df, table
+
+
+def tariff_ids(table, positions):
+    """create_tariff_id for the given row positions (IDs are only needed for a few rows)."""
+    return np.array([create_tariff_id(table['utility'][i], table['State'][i]) for i in positions], dtype=object)
+
+
+def duplicate_ids(table):
+    """Positions of rows whose tariff ID is shared with another row."""
+    # Rows can only share an ID if they share this key (the ID without its dashes),
+    # so exact IDs are computed just for rows with a repeated key
+    state = pd.Series(table['State']).str.split('/').str[0].str.strip().str.lower()
+    key = (pd.Series(table['utility']).str.lower().str.replace('&', 'and', regex=False)
+           .str.replace(r'[\W_]+', '', regex=True) + '|' + state)
+    candidates = np.flatnonzero(key.duplicated(keep=False).to_numpy())
+    ids = pd.Series(tariff_ids(table, candidates))
+    return candidates[ids.duplicated(keep=False).to_numpy()], dict(zip(candidates, ids))
+
+
+def check_schema(df, table):
+    missing = [c for c in REQUIRED_COLUMNS if c not in df]
+    reports = [pd.DataFrame({'severity': 'error', 'rule': 'schema', 'row': None, 'field': missing, 'value': None,
+                             'score': np.inf, 'message': 'required column is missing'})]
+    for column in RANGES:
+        if column in df:
+            raw = df[column].to_numpy()
+            reports.append(flagged(pd.notna(raw) & np.isnan(table[column]), 'error', 'schema', column, raw, 1.0,
+                                   'not a number'))
+    if 'State' in df:
+        reports.append(flagged(table['State'] == '', 'error', 'schema', 'State', None, 1.0, 'no state'))
+    positions, ids = duplicate_ids(table)
+    duplicated = np.zeros(len(table['utility']), dtype=bool)
+    duplicated[positions] = True
+    reports.append(flagged(duplicated, 'error', 'schema', 'Utility', table['utility'], 1.0,
+                           lambda rows: [f"tariff ID {ids[r]} is used by more than one row" for r in rows]))
+    return reports
+
+
+def check_ranges(table):
+    reports = []
+    for column, (low, high) in RANGES.items():
+        values = table[column]
+        span = high - low
+        with np.errstate(invalid='ignore'):
+            below, above = values < low, values > high
+        reports.append(flagged(below, 'error', 'range', column, values, (low - values) / span, f'below {low}'))
+        reports.append(flagged(above, 'error', 'range', column, values, (values - high) / span, f'above {high}'))
+    return reports
+
+
+def group_median(codes, values, n_groups):
+    """Median of values (NaN ignored) per group code, and the number of values per group."""
+    valid = ~np.isnan(values)
+    c, v = codes[valid], values[valid]
+    order = np.lexsort((v, c))
+    c, v = c[order], v[order]
+    counts = np.bincount(c, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    median = np.full(n_groups, np.nan)
+    has = counts > 0
+    median[has] = (v[(starts + (counts - 1) // 2)[has]] + v[(starts + counts // 2)[has]]) / 2
+    return median, counts
+
+
+def robust_z(values, codes, n_groups):
+    """Robust z-scores of values within groups, with each value's group median and group size."""
+    median, counts = group_median(codes, values, n_groups)
+    deviation = np.abs(values - median[codes])
+    mad, _ = group_median(codes, deviation, n_groups)
+    valid = ~np.isnan(deviation)
+    mean_ad = np.bincount(codes[valid], deviation[valid], minlength=n_groups) / np.maximum(counts, 1)
+    # MAD is 0 when most of a group shares one value; fall back to the mean absolute deviation
+    sigma = np.where(mad > 0, 1.4826 * mad, 1.2533 * mean_ad)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(sigma[codes] > 0, (values - median[codes]) / sigma[codes], 0.0)
+    return z, median[codes], counts[codes]
+
+
+def check_outliers(table):
+    # Group codes per level, computed once for all fields
+    levels = []
+    for keys in OUTLIER_GROUPS:
+        label = np.full(len(table['utility']), 'all tariffs', dtype=object)
+        if keys:
+            label = table[keys[0]]
+            for k in keys[1:]:
+                label = label + ' / ' + table[k]
+        codes, uniques = pd.factorize(label)
+        levels.append((codes, len(uniques), label))
+
+    reports = []
+    for column in OUTLIER_FIELDS:
+        x = table[column]
+        # Zeros are structural (energy-only or demand-only tariffs), not low outliers
+        x = np.where(x > 0, x, np.nan)
+        z = np.full(len(x), np.nan)
+        median = np.full(len(x), np.nan)
+        group = np.full(len(x), '', dtype=object)
+        # Each row uses the most specific grouping with at least MIN_GROUP_SIZE tariffs
+        for i, (codes, n_groups, label) in enumerate(levels):
+            level_z, level_median, size = robust_z(x, codes, n_groups)
+            use = np.isnan(z) & ~np.isnan(x) & ((size >= MIN_GROUP_SIZE) | (i == len(levels) - 1))
+            z[use], median[use], group[use] = level_z[use], level_median[use], label[use]
+            if not (np.isnan(z) & ~np.isnan(x)).any():
+                break
+
+        with np.errstate(invalid='ignore'):
+            ratio = np.maximum(x / median, median / x)
+            outliers = (np.abs(z) > OUTLIER_Z) & (ratio >= 1 + MIN_RELATIVE_DEVIATION)
+        reports.append(flagged(outliers, 'warning', 'outlier', column, x, np.abs(z),
+                               lambda rows: [f"robust z {z[r]:.1f} vs {group[r]} median {median[r]:.4g}"
+                                             for r in rows]))
+    return reports
+
+
+def check_cross_fields(df, table):
+    reports = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for peak, off_peak in [('Energy Peak ($/kWh)', 'Energy Off-Peak'), ('Peak Demand ($/kW)', 'Off-Peak Demand')]:
+            p, o = table[peak], table[off_peak]
+            reports.append(flagged((o > p) & (p > 0), 'warning', 'tou_order', off_peak, o, (o - p) / p,
+                                   lambda rows: [f"off-peak {o[r]} above peak {p[r]}" for r in rows]))
+
+        if 'Demand Ratchet' in df:
+            has_ratchet = np.isin(np.char.lower(text(df, 'Demand Ratchet').astype(str)), ['yes', 'true', '1'])
+            ratchet = table['Ratchet %']
+            reports.append(flagged((ratchet > 0) & ~has_ratchet, 'warning', 'ratchet', 'Ratchet %', ratchet,
+                                   ratchet / 100, 'Ratchet % set but Demand Ratchet is not Yes'))
+
+        if 'Rate Components' in df:
+            components = text(df, 'Rate Components')
+            mentions_fuel = df['Rate Components'].astype(str).str.contains(
+                FUEL_RIDER_PATTERN, case=False, regex=True).to_numpy()
+            fuel = table['Fuel/Rider Adj']
+            reports.append(flagged(mentions_fuel & ~(fuel > 0), 'warning', 'fuel_rider', 'Fuel/Rider Adj', fuel, 1.0,
+                                   lambda rows: [f'Rate Components lists a fuel rider ("{components[r]}") '
+                                                 'but Fuel/Rider Adj is 0' for r in rows]))
+
+    if 'Status' in df and 'Effective Date' in df:
+        dated = df['Effective Date'].astype(str).str.match(r'^\s*\d{4}-\d{2}-\d{2}').to_numpy()
+        reports.append(flagged((text(df, 'Status') == 'Active') & ~dated, 'warning', 'effective_date',
+                               'Effective Date', text(df, 'Effective Date'), 0.5,
+                               'Active tariff without an effective date'))
+    return reports
+
+
+def validate_tariffs(df):
+    """
+    Run every check over a Tariff Database DataFrame.
+
+    Returns:
+        Ranked report DataFrame: severity, rule, tariff_id, utility, sheet row,
+        field, value, score, message
+    """
+    df, table = prepare(df)
+    reports = check_schema(df, table) + check_ranges(table) + check_outliers(table) + check_cross_fields(df, table)
+    reports = [r for r in reports if r is not None and len(r)]
+    if not reports:
+        return pd.DataFrame(columns=['tariff_id', 'utility'] + REPORT_COLUMNS)
+    report = pd.concat(reports, ignore_index=True)
+
+    # Positions in the tariff rows -> tariff ID, utility and spreadsheet row
+    positions = report['row']
+    known = positions.notna().to_numpy()
+    at = positions[known].astype(int).to_numpy()
+    unique = np.unique(at)
+    ids = dict(zip(unique, tariff_ids(table, unique)))
+    report['tariff_id'] = ''
+    report['utility'] = ''
+    report['row'] = np.nan
+    report.loc[known, 'tariff_id'] = [ids[r] for r in at]
+    report.loc[known, 'utility'] = table['utility'][at]
+    report.loc[known, 'row'] = table['sheet_row'][at]
+    report['rank'] = report['severity'].map(SEVERITY_RANK)
+    report = report.sort_values(['rank', 'score'], ascending=[True, False], kind='stable')
+    return report.drop(columns='rank').reset_index(drop=True)[['tariff_id', 'utility'] + REPORT_COLUMNS]
+
+
+def format_report(report, limit=None):
+    lines = []
+    shown = report if limit is None else report.head(limit)
+    for issue in shown.itertuples(index=False):
+        where = f" (row {int(issue.row)})" if pd.notna(issue.row) else ''
+        value = '' if issue.value is None or (isinstance(issue.value, float) and np.isnan(issue.value)) \
+            else f" = {issue.value}"
+        lines.append(f"{issue.severity.upper():<8}{issue.rule:<15}{issue.tariff_id or '-'}{where}: "
+                     f"{issue.field}{value}: {issue.message}")
+    if limit is not None and len(report) > limit:
+        lines.append(f"... {len(report) - limit} more")
+    return '\n'.join(lines)
+
+
+def summary(report):
+    counts = report['severity'].value_counts()
+    return f"{counts.get('error', 0)} error(s), {counts.get('warning', 0)} warning(s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate the Tariff Database sheet before codegen')
+    parser.add_argument('--workbook', default=str(EXCEL_FILE), help='Tariff workbook')
+    parser.add_argument('--json', default=None, metavar='PATH', help='Write the ranked report as JSON')
+    parser.add_argument('--limit', type=int, default=None, help='Print at most this many issues')
+    parser.add_argument('--strict', action='store_true', help='Fail on warnings as well as errors')
+    args = parser.parse_args()
+
+    df = read_tariff_sheet(args.workbook)
+    start = time.perf_counter()
+    report = validate_tariffs(df)
+    elapsed = time.perf_counter() - start
+
+    if len(report):
+        print(format_report(report, args.limit))
+    print(f"\n{summary(report)} in {len(df)} rows ({elapsed * 1000:.1f} ms)")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({'workbook': args.workbook, 'rows': len(df), 'seconds': round(elapsed, 4),
+                       'issues': json.loads(report.to_json(orient='records'))}, f, indent=2)
+
+    failing = report['severity'].isin(['error', 'warning'] if args.strict else ['error'])
+    sys.exit(1 if failing.any() else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Watch the tariff and geo sources and rebuild only what an edit affects.
+
+Polls the files the build DAG depends on (see build.py): the tariff workbook,
+the scripts that generate and correct it (the UTILITIES lists live there),
+and the geo layers. A burst of saves is collapsed into one rebuild once the
+files have been quiet for --debounce seconds. Each rebuild:
+1. Runs the workbook stages (tariff_db, qaqc) if their code or inputs changed
+2. Patches generatedTariffData.ts in process: workbook rows are hashed, and
+   only new or edited rows go through row_to_tariff and the TypeScript
+   renderer again; unchanged tariffs reuse their rendered object literal.
+   When any row changed, the workbook is synced to the change journal
+   (tariff_journal.py), as a regular tariff_ts run does
+3. Runs the remaining stale stages (data center join, ISO regions, hex bins,
+   clusters, ...) through the normal fingerprinted build
+
+If migrate_tariff_excel_to_ts.py itself changes, the in-process copy is out of
+date, so the tariff_ts stage falls back to a regular subprocess run.
+
+Usage:
+    python scripts/watch_pipeline.py
+    python scripts/watch_pipeline.py --skip territories --debounce 0.5
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+import build
+from migrate_tariff_excel_to_ts import (
+    EXCEL_FILE, OUTPUT_FILE, has_utility, read_tariff_sheet, render_typescript, row_to_tariff,
+    tariff_to_typescript, write_typescript,
+)
+from tariff_journal import TariffJournal
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_DEBOUNCE = 0.3
+# Keep waiting for quiet files at most this long before rebuilding anyway
+MAX_DEBOUNCE = 5.0
+
+
+class TariffPatcher:
+    """
+    Incremental workbook -> generatedTariffData.ts conversion.
+
+    Converted tariffs and their rendered TypeScript are kept per row hash, so
+    an update after a single-row edit converts and renders that row only.
+    """
+
+    def __init__(self, workbook=EXCEL_FILE, output=OUTPUT_FILE):
+        self.workbook = workbook
+        self.output = output
+        self.rows = {}
+        self.ids = set()
+
+    def update(self):
+        """
+        Re-read the workbook and rewrite the TypeScript module if it changed.
+
+        Returns:
+            Dict with the converted, added and removed tariff IDs, whether
+            the output file was written and how many changes were journaled
+        """
+        df = read_tariff_sheet(self.workbook)
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+        rows = {}
+        entries = []
+        converted = []
+        for idx, row_hash in zip(df.index, hashes):
+            if row_hash in self.rows:
+                entry = self.rows[row_hash]
+            else:
+                row = df.loc[idx]
+                entry = None
+                if has_utility(row):
+                    tariff = row_to_tariff(row, idx)
+                    entry = (tariff, tariff_to_typescript(tariff))
+                    converted.append(tariff['id'])
+            rows[row_hash] = entry
+            if entry is not None:
+                entries.append(entry)
+        self.rows = rows
+
+        # Same order as convert_rows(): stable sort of sheet order by blended rate
+        entries.sort(key=lambda e: e[0]['blendedRatePerKWh'])
+        tariffs = [tariff for tariff, _ in entries]
+        ts_code = render_typescript(tariffs, [ts for _, ts in entries])
+        written = write_typescript(ts_code, self.output)
+
+        ids = {t['id'] for t in tariffs}
+        removed = sorted(self.ids - ids)
+        journaled = 0
+        if converted or removed:
+            journaled = TariffJournal().sync_workbook(self.workbook, reason='Regenerated from workbook')
+        changes = {
+            'converted': converted,
+            'added': sorted(ids - self.ids),
+            'removed': removed,
+            'written': written,
+            'journaled': journaled,
+        }
+        self.ids = ids
+        return changes
+
+
+def watched_files(stages):
+    """Every input file and code file of the given stages."""
+    paths = set()
+    for stage in stages:
+        paths.update(stage.inputs)
+        paths.update(build.stage_code(stage))
+    return sorted(paths)
+
+
+def snapshot(paths):
+    """(size, mtime) per path, None for missing files."""
+    stats = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+            stats[path] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            stats[path] = None
+    return stats
+
+
+def wait_for_changes(paths, baseline, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+    """
+    Block until a watched file changes and the burst of changes settles.
+
+    Returns:
+        (changed paths, new snapshot)
+    """
+    while True:
+        time.sleep(interval)
+        current = snapshot(paths)
+        if current != baseline:
+            break
+
+    first = time.monotonic()
+    last_change = first
+    while True:
+        time.sleep(interval)
+        latest = snapshot(paths)
+        now = time.monotonic()
+        if latest != current:
+            current, last_change = latest, now
+        elif now - last_change >= debounce or now - first >= MAX_DEBOUNCE:
+            break
+
+    changed = [p for p in paths if current.get(p) != baseline.get(p)]
+    return changed, current
+
+
+def code_digest(stage, hasher):
+    """Hash of a stage's script and local imports, to detect edits to the loaded module."""
+    return tuple(hasher.digest(p) for p in sorted(build.stage_code(stage)))
+
+
+class Watcher:
+    """One rebuild cycle per settled burst of edits."""
+
+    def __init__(self, skip=(), jobs=4, verbose=False):
+        self.skip = set(skip)
+        self.jobs = jobs
+        self.verbose = verbose
+        self.deps = build.resolve_dependencies(build.STAGES)
+        self.tariff_stage = next(s for s in build.STAGES if s.name == 'tariff_ts')
+        self.patcher = TariffPatcher(self.tariff_stage.inputs[0], self.tariff_stage.outputs[0])
+
+        state = build.load_state()
+        self.loaded_code = code_digest(self.tariff_stage, build.FileHasher(state.setdefault('files', {})))
+
+    def patch_tariffs(self):
+        """Update generatedTariffData.ts in process if the tariff_ts stage is stale."""
+        state = build.load_state()
+        hasher = build.FileHasher(state.setdefault('files', {}))
+        stage = self.tariff_stage
+        stale, reason = build.is_stale(stage, state, hasher, (), self.skip)
+        if not stale:
+            return True
+        if code_digest(stage, hasher) != self.loaded_code:
+            # The converter itself was edited; the regular build reruns it
+            return True
+        if not stage.inputs[0].exists():
+            print(f"[fail]  {stage.name}: {stage.inputs[0].name} not found")
+            return False
+
+        start = time.perf_counter()
+        try:
+            changes = self.patcher.update()
+        except Exception as e:
+            print(f"[fail]  {stage.name}: {e}")
+            return False
+        elapsed = time.perf_counter() - start
+
+        build.record_run(stage, self.deps, state, hasher, elapsed)
+        build.save_state(state)
+
+        detail = [f"{len(changes['converted'])} row(s) converted"]
+        if changes['added']:
+            detail.append(f"added {', '.join(changes['added'])}")
+        if changes['removed']:
+            detail.append(f"removed {', '.join(changes['removed'])}")
+        if not changes['written']:
+            detail.append('output unchanged')
+        if changes['journaled']:
+            detail.append(f"journaled {changes['journaled']} change(s)")
+        print(f"[patch] {stage.name}: {reason}; {'; '.join(detail)} ({elapsed * 1000:.0f} ms)")
+        return True
+
+    def rebuild(self):
+        """Bring every stage up to date; returns True if nothing failed."""
+        workbook_stages = sorted(self.deps[self.tariff_stage.name])
+        ok = build.build(workbook_stages, jobs=self.jobs, verbose=self.verbose, skip=self.skip, quiet=True)
+        if ok:
+            ok = self.patch_tariffs()
+        return build.build(jobs=self.jobs, verbose=self.verbose, skip=self.skip, quiet=True) and ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild tariff and geo outputs as their sources change')
+    parser.add_argument('--skip', nargs='+', default=[], metavar='STAGE',
+                        help='Stages never to run (e.g. territories when offline)')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help='Seconds of quiet after a save before rebuilding')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='Polling interval in seconds')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='Stages to run in parallel')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show stage output')
+    args = parser.parse_args()
+
+    names = {s.name for s in build.STAGES}
+    unknown = [n for n in args.skip if n not in names]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(sorted(names))})")
+
+    watcher = Watcher(args.skip, args.jobs, args.verbose)
+    paths = watched_files(build.STAGES)
+
+    # Initial pass brings everything up to date and fills the row cache
+    start = time.perf_counter()
+    watcher.rebuild()
+    if watcher.patcher.workbook.exists():
+        watcher.patcher.update()
+    print(f"Up to date in {time.perf_counter() - start:.2f}s; watching {len(paths)} files (Ctrl-C to stop)")
+
+    # Files the pipeline writes are re-read after each rebuild so its own writes
+    # do not trigger another one; pure sources keep their pre-rebuild state, so
+    # an edit saved during a rebuild still triggers the next one
+    generated = {p for stage in build.STAGES for p in stage.outputs}
+    baseline = snapshot(paths)
+    try:
+        while True:
+            changed, current = wait_for_changes(paths, baseline, args.interval, args.debounce)
+            names = ', '.join(p.name for p in changed[:5]) + (' ...' if len(changed) > 5 else '')
+            print(f"\nChanged: {names}")
+            start = time.perf_counter()
+            ok = watcher.rebuild()
+            print(f"{'Rebuilt' if ok else 'Rebuild failed'} in {time.perf_counter() - start:.2f}s")
+            after = snapshot(paths)
+            baseline = {p: after[p] if p in generated else current[p] for p in paths}
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Cell-level xlsx patching without loading the workbook into openpyxl.
+
+An .xlsx file is a zip of XML parts, one per worksheet. XlsxPatcher reads
+only the worksheets it is asked about, collects cell edits, and on save
+rewrites only the worksheet parts that contain edits:
+- rows without edits are copied as they are, byte for byte; edited rows get
+  their changed cells replaced or inserted in column order (keeping each
+  cell's style) and new rows are inserted in row order
+- strings are written inline, so sharedStrings.xml is never rewritten
+- every other part (styles, theme, other sheets, relationships, ...) is
+  copied as stored, compressed bytes included
+- workbook.xml gets fullCalcOnLoad="1" (only if it is not already set), so
+  Excel recalculates formulas whose inputs changed; if a formula cell is
+  overwritten or added, calcChain.xml is dropped and rebuilt by Excel
+
+Save time therefore depends on the size of the edited sheets and the number
+of edits, not on the rest of the workbook, and features openpyxl does not
+round-trip (charts, data validation, pivot caches, ...) survive.
+
+Values follow openpyxl conventions: str, int, float, bool or None (clears
+the cell but keeps its style); strings starting with '=' are formulas.
+
+Usage:
+    from xlsx_patch import XlsxPatcher
+    patcher = XlsxPatcher('Large_Load_Tariff_Database_FINAL.xlsx')
+    patcher.get('Tariff Database', 41, 11)          # -> 21.62
+    patcher.set('Tariff Database', 41, 11, 22.59)
+    patcher.save()
+
+    python scripts/xlsx_patch.py workbook.xlsx "Tariff Database" K41 22.59
+"""
+
+import argparse
+import copy
+import math
+import os
+import posixpath
+import re
+import stat
+import struct
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string, get_column_letter
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+CALC_CHAIN = 'xl/calcChain.xml'
+
+ROW_START_RE = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+CELL_RE = re.compile(rb'<c\b[^>]*?(?:/>|>.*?</c>)', re.S)
+ATTR_RE = {name: re.compile(rb'\s' + name.encode() + rb'="([^"]*)"') for name in ('r', 's', 'spans')}
+DIMENSION_RE = re.compile(rb'<dimension\s+ref="([^"]*)"\s*/>')
+CALC_PR_RE = re.compile(rb'<calcPr\b[^>]*?/>')
+
+
+def attribute(tag, name):
+    """Value of attribute `name` in a start tag (bytes), or None."""
+    match = ATTR_RE[name].search(tag)
+    return match.group(1).decode() if match else None
+
+
+def start_tag(element):
+    return element[:element.index(b'>') + 1]
+
+
+def column_index(ref, _cache={}):
+    """'AB12' -> 28"""
+    letters = ref.rstrip('0123456789')
+    if letters not in _cache:
+        _cache[letters] = column_index_from_string(letters)
+    return _cache[letters]
+
+
+def parse_ref(ref):
+    """'AB12' -> (12, 28)"""
+    letters, row = coordinate_from_string(ref)
+    return row, column_index_from_string(letters)
+
+
+def cell_xml(row, col, value, style=None):
+    """A <c> element for value, in the style openpyxl writes."""
+    ref = f'{get_column_letter(col)}{row}'
+    s = f' s="{style}"' if style else ''
+    if hasattr(value, 'item'):
+        # numpy scalars (np.float64, np.int64, np.bool_) -> Python values
+        value = value.item()
+    if value is None:
+        return f'<c r="{ref}"{s}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{s} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"{ref}: cannot store {value} in a cell")
+        return f'<c r="{ref}"{s} t="n"><v>{value!r}</v></c>'
+    if isinstance(value, str):
+        if value.startswith('='):
+            return f'<c r="{ref}"{s}><f>{escape(value[1:])}</f><v/></c>'
+        space = ' xml:space="preserve"' if value != value.strip() else ''
+        return f'<c r="{ref}"{s} t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+    raise TypeError(f"{ref}: unsupported cell value {value!r} ({type(value).__name__})")
+
+
+def cell_value(element, shared_strings):
+    """Value of a parsed <c> element, as openpyxl would return it (formulas as '=...')."""
+    formula = element.find(f'{NS}f')
+    if formula is not None and formula.text:
+        return '=' + formula.text
+    kind = element.get('t', 'n')
+    if kind == 'inlineStr':
+        inline = element.find(f'{NS}is')
+        return ''.join(t.text or '' for t in inline.iter(f'{NS}t')) if inline is not None else None
+    v = element.find(f'{NS}v')
+    if v is None or v.text is None:
+        return None
+    if kind == 's':
+        return shared_strings[int(v.text)]
+    if kind == 'b':
+        return v.text == '1'
+    if kind in ('str', 'e'):
+        return v.text
+    number = float(v.text)
+    return int(number) if number.is_integer() and not any(c in v.text for c in '.eE') else number
+
+
+def copy_member(zin, zout, info):
+    """Copy a zip member's compressed bytes as they are (no decompress/recompress)."""
+    zin.fp.seek(info.header_offset)
+    header = zin.fp.read(30)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    zin.fp.seek(info.header_offset + 30 + name_length + extra_length)
+    raw = zin.fp.read(info.compress_size)
+
+    copied = copy.copy(info)
+    # Sizes and CRC go into the local header instead of a trailing data descriptor
+    copied.flag_bits &= ~0x08
+    copied.header_offset = zout.fp.tell()
+    zout.fp.write(copied.FileHeader())
+    zout.fp.write(raw)
+    zout.filelist.append(copied)
+    zout.NameToInfo[copied.filename] = copied
+    zout.start_dir = zout.fp.tell()
+
+
+class XlsxPatcher:
+    """Reads worksheets of an xlsx file on demand and writes back only the edited ones."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with zipfile.ZipFile(self.path) as zf:
+            self.names = zf.namelist()
+            workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+            rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+
+        targets = {}
+        for rel in rels.iter(f'{PKG_REL_NS}Relationship'):
+            target = rel.get('Target')
+            targets[rel.get('Id')] = (target.lstrip('/') if target.startswith('/')
+                                      else posixpath.normpath(posixpath.join('xl', target)))
+        self.parts = {sheet.get('name'): targets[sheet.get(f'{REL_NS}id')]
+                      for sheet in workbook.iter(f'{NS}sheet')}
+        self.sheetnames = list(self.parts)
+
+        self._shared_strings = None
+        self._values = {}
+        self.edits = {}
+
+    def _part(self, sheet):
+        if sheet not in self.parts:
+            raise KeyError(f"Worksheet '{sheet}' does not exist in {self.path.name}")
+        return self.parts[sheet]
+
+    def shared_strings(self):
+        if self._shared_strings is None:
+            self._shared_strings = []
+            if 'xl/sharedStrings.xml' in self.names:
+                with zipfile.ZipFile(self.path) as zf, zf.open('xl/sharedStrings.xml') as f:
+                    for _, element in ET.iterparse(f):
+                        if element.tag == f'{NS}si':
+                            self._shared_strings.append(''.join(t.text or '' for t in element.iter(f'{NS}t')))
+                            element.clear()
+        return self._shared_strings
+
+    def values(self, sheet):
+        """{row: {col: value}} of a worksheet as stored in the file (parsed once, streaming)."""
+        if sheet not in self._values:
+            part = self._part(sheet)
+            shared = self.shared_strings()
+            rows = {}
+            cell_tag, row_tag = f'{NS}c', f'{NS}row'
+            with zipfile.ZipFile(self.path) as zf, zf.open(part) as f:
+                row_number, cells, col = 0, {}, 0
+                for _, element in ET.iterparse(f):
+                    if element.tag == cell_tag:
+                        ref = element.get('r')
+                        col = column_index(ref) if ref else col + 1
+                        cells[col] = cell_value(element, shared)
+                    elif element.tag == row_tag:
+                        row_number = int(element.get('r') or row_number + 1)
+                        rows[row_number] = cells
+                        cells, col = {}, 0
+                        element.clear()
+            self._values[sheet] = rows
+        return self._values[sheet]
+
+    def get(self, sheet, row, col):
+        """Current value of a cell, including pending edits."""
+        edits = self.edits.get(sheet, {})
+        if (row, col) in edits:
+            return edits[(row, col)]
+        return self.values(sheet).get(row, {}).get(col)
+
+    def set(self, sheet, row, col, value):
+        """Queue a cell edit (written by save())."""
+        self._part(sheet)
+        cell_xml(row, col, value)  # validate now rather than at save time
+        self.edits.setdefault(sheet, {})[(row, col)] = value
+
+    def max_row(self, sheet):
+        """Last row with a cell, including pending edits."""
+        rows = [r for r, cells in self.values(sheet).items() if cells]
+        rows += [r for r, _ in self.edits.get(sheet, {})]
+        return max(rows, default=0)
+
+    def rewrite_sheet(self, data, edits):
+        """
+        Apply {(row, col): value} edits to worksheet XML.
+
+        Edited rows are found by searching for their start tags in row order,
+        so the untouched rows in between are never parsed.
+
+        Returns:
+            (new XML, True if a formula cell was overwritten or written)
+        """
+        by_row = {}
+        for (row, col), value in edits.items():
+            by_row.setdefault(row, {})[col] = value
+        formulas = any(isinstance(v, str) and v.startswith('=') for v in edits.values())
+
+        start = data.find(b'<sheetData')
+        if start < 0:
+            raise ValueError('worksheet has no <sheetData>')
+        tag_end = data.index(b'>', start) + 1
+        head = self.update_dimension(data[:start], edits)
+        if data[tag_end - 2:tag_end] == b'/>':
+            rows = ''.join(self.row_xml(n, by_row[n]) for n in sorted(by_row)).encode()
+            return head + b'<sheetData>' + rows + b'</sheetData>' + data[tag_end:], formulas
+
+        body_end = data.rindex(b'</sheetData>')
+        last = data.rfind(b'<row', tag_end, body_end)
+        last_row = int(attribute(data[last:data.index(b'>', last) + 1], 'r')) if last >= 0 else 0
+
+        out = [head, data[start:tag_end]]
+        position = tag_end
+        for number in sorted(by_row):
+            found = None
+            if number <= last_row:
+                found = re.compile(rb'<row\b[^>]*?\sr="%d"' % number).search(data, position, body_end)
+            if found is None:
+                insert_at = self.insertion_point(data, number, position, body_end) if number <= last_row else body_end
+                out += [data[position:insert_at], self.row_xml(number, by_row[number]).encode()]
+                position = insert_at
+                continue
+            close = data.index(b'>', found.start())
+            row_end = close + 1 if data[close - 1:close] == b'/' else data.index(b'</row>', close) + len(b'</row>')
+            rewritten, had_formula = self.rewrite_row(data[found.start():row_end], number, by_row[number])
+            formulas = formulas or had_formula
+            out += [data[position:found.start()], rewritten]
+            position = row_end
+        out.append(data[position:])
+        return b''.join(out), formulas
+
+    @staticmethod
+    def insertion_point(data, number, start, end):
+        """Offset of the first row after row `number` (rows are stored in order)."""
+        for match in ROW_START_RE.finditer(data, start, end):
+            if int(match.group(1)) > number:
+                return match.start()
+        return end
+
+    @staticmethod
+    def row_xml(number, cells):
+        return (f'<row r="{number}">'
+                + ''.join(cell_xml(number, col, cells[col]) for col in sorted(cells)) + '</row>')
+
+    def rewrite_row(self, element, number, cells):
+        """Replace or insert cells in one <row> element; returns (XML, overwrote a formula)."""
+        if element.endswith(b'/>') and b'</row>' not in element:
+            tag = element[:-2].rstrip() + b'>'
+            content, end = b'', b'</row>'
+        else:
+            tag = start_tag(element)
+            content, end = element[len(tag):-len(b'</row>')], b'</row>'
+        # spans are an optional hint and may no longer cover the row
+        tag = ATTR_RE['spans'].sub(b'', tag)
+
+        out = []
+        pending = sorted(cells)
+        position = 0
+        overwrote_formula = False
+        col = 0
+        for cell_match in CELL_RE.finditer(content):
+            cell = cell_match.group(0)
+            ref = attribute(start_tag(cell), 'r')
+            col = parse_ref(ref)[1] if ref else col + 1
+            while pending and pending[0] < col:
+                out.append(content[position:cell_match.start()])
+                position = cell_match.start()
+                new_col = pending.pop(0)
+                out.append(cell_xml(number, new_col, cells[new_col]).encode())
+            if pending and pending[0] == col:
+                pending.pop(0)
+                out.append(content[position:cell_match.start()])
+                if b'<f' in cell:
+                    if b't="shared"' in cell and b'ref="' in cell:
+                        raise ValueError(f"{get_column_letter(col)}{number} is the master cell of a shared "
+                                         "formula; edit it in Excel")
+                    overwrote_formula = True
+                style = attribute(start_tag(cell), 's')
+                out.append(cell_xml(number, col, cells[col], style).encode())
+                position = cell_match.end()
+        out.append(content[position:])
+        for new_col in pending:
+            out.append(cell_xml(number, new_col, cells[new_col]).encode())
+        return tag + b''.join(out) + end, overwrote_formula
+
+    @staticmethod
+    def update_dimension(data, edits):
+        """Grow the <dimension> ref to cover the edited cells."""
+        match = DIMENSION_RE.search(data)
+        if match is None:
+            return data
+        ref = match.group(1).decode()
+        first, _, last = ref.partition(':')
+        last = last or first
+        (r1, c1), (r2, c2) = parse_ref(first), parse_ref(last)
+        max_row = max([r2] + [r for r, _ in edits])
+        max_col = max([c2] + [c for _, c in edits])
+        new_ref = f'{get_column_letter(c1)}{r1}:{get_column_letter(max_col)}{max_row}'
+        if new_ref == ref:
+            return data
+        return data[:match.start(1)] + new_ref.encode() + data[match.end(1):]
+
+    @staticmethod
+    def force_recalculation(workbook_xml):
+        """workbook.xml with fullCalcOnLoad="1", or None if it is already set."""
+        match = CALC_PR_RE.search(workbook_xml)
+        if match is None:
+            # calcPr follows sheets/definedNames; put it right before anything that may come after
+            anchor = re.search(rb'<(oleSize|customWorkbookViews|pivotCaches|smartTagPr|smartTagTypes|webPublishing'
+                               rb'|fileRecoveryPr|webPublishObjects|extLst)\b|</workbook>', workbook_xml)
+            return workbook_xml[:anchor.start()] + b'<calcPr fullCalcOnLoad="1"/>' + workbook_xml[anchor.start():]
+        tag = match.group(0)
+        if b'fullCalcOnLoad="1"' in tag:
+            return None
+        if b'fullCalcOnLoad=' in tag:
+            new_tag = re.sub(rb'fullCalcOnLoad="[^"]*"', b'fullCalcOnLoad="1"', tag)
+        else:
+            new_tag = tag[:-2].rstrip() + b' fullCalcOnLoad="1"/>'
+        return workbook_xml[:match.start()] + new_tag + workbook_xml[match.end():]
+
+    def save(self, output=None):
+        """
+        Write the workbook with all queued edits (in place by default, atomically).
+
+        Returns:
+            List of the parts that were rewritten
+        """
+        output = Path(output) if output else self.path
+        edited = {self._part(sheet): edits for sheet, edits in self.edits.items() if edits}
+        rewritten = {}
+        drop_calc_chain = False
+
+        with zipfile.ZipFile(self.path) as zin:
+            for part, edits in edited.items():
+                rewritten[part], formulas = self.rewrite_sheet(zin.read(part), edits)
+                drop_calc_chain = drop_calc_chain or formulas
+            if edited:
+                workbook_xml = self.force_recalculation(zin.read('xl/workbook.xml'))
+                if workbook_xml is not None:
+                    rewritten['xl/workbook.xml'] = workbook_xml
+            if drop_calc_chain and CALC_CHAIN in self.names:
+                rewritten['[Content_Types].xml'] = re.sub(
+                    rb'<Override[^>]*PartName="/xl/calcChain.xml"[^>]*/>', b'', zin.read('[Content_Types].xml'))
+                rewritten['xl/_rels/workbook.xml.rels'] = re.sub(
+                    rb'<Relationship[^>]*Target="[^"]*calcChain.xml"[^>]*/>', b'',
+                    zin.read('xl/_rels/workbook.xml.rels'))
+            else:
+                drop_calc_chain = False
+
+            fd, tmp = tempfile.mkstemp(suffix='.xlsx', dir=output.parent)
+            os.close(fd)
+            try:
+                # mkstemp creates the file 0600; keep the workbook's own permissions
+                mode_source = output if output.exists() else self.path
+                os.chmod(tmp, stat.S_IMODE(os.stat(mode_source).st_mode))
+                with zipfile.ZipFile(tmp, 'w') as zout:
+                    for info in zin.infolist():
+                        if drop_calc_chain and info.filename == CALC_CHAIN:
+                            continue
+                        data = rewritten.get(info.filename)
+                        if data is not None:
+                            zout.writestr(info, data, compress_type=info.compress_type)
+                        else:
+                            copy_member(zin, zout, info)
+                os.replace(tmp, output)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+        # The file now holds the edits
+        if output == self.path:
+            for sheet, edits in self.edits.items():
+                values = self._values.get(sheet)
+                if values is not None:
+                    for (row, col), value in edits.items():
+                        values.setdefault(row, {})[col] = value
+            self.edits = {}
+        return sorted(rewritten) + ([f'-{CALC_CHAIN}'] if drop_calc_chain else [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Set cells of an xlsx file without rewriting the rest of it')
+    parser.add_argument('workbook', help='xlsx file to patch in place')
+    parser.add_argument('sheet', help='Worksheet name')
+    parser.add_argument('edits', nargs='+', metavar='CELL VALUE',
+                        help='Cell reference and value pairs (numbers are stored as numbers)')
+    args = parser.parse_args()
+    if len(args.edits) % 2:
+        parser.error('edits must be CELL VALUE pairs')
+
+    patcher = XlsxPatcher(args.workbook)
+    for ref, text in zip(args.edits[::2], args.edits[1::2]):
+        try:
+            value = float(text) if any(c in text for c in '.eE') else int(text)
+        except ValueError:
+            value = text
+        row, col = parse_ref(ref)
+        print(f"  {args.sheet}!{ref}: {patcher.get(args.sheet, row, col)!r} -> {value!r}")
+        patcher.set(args.sheet, row, col, value)
+
+    start = time.perf_counter()
+    parts = patcher.save()
+    print(f"Rewrote {', '.join(parts)} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()